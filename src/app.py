@@ -1,44 +1,115 @@
 from fastapi import FastAPI, Depends
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, contextmanager
+import time
 
 from src.helpers.logger import config_logger, get_struct_logger
+from src.helpers.settings import Settings, get_settings
 
-from src.db.account_db import AccountDB
-from src.db.item_db import ItemDB
+from src.db.backends import build_account_db, build_item_db, build_index_manager, build_revocation_db, build_idempotency_db
+from src.db.cached_item_db import CachedItemDB
 from src.helpers.sessions import SessionManager
 from src.helpers.plaid.client import Plaid
 
 from src.routers import account, linked_plaid
 
-from src.helpers.dependencies import require_user
-from src.helpers.request_context_middleware import RequestContextMiddleware
+from src.helpers.dependencies import rate_limited_user
+from src.helpers.request_context_middleware import RequestContextMiddleware, AuthError, auth_error_handler
+from src.helpers.compression_middleware import GZipMiddleware
+from src.helpers.idempotency_middleware import IdempotencyMiddleware
+from src.helpers.load_shedding import ConcurrencyLimiter, ConcurrencyLimitMiddleware, TokenBucket
+from src.helpers.metrics import MetricsRegistry, MetricsMiddleware, register_cache_metrics, register_limiter_metrics
+from src.requests.responses import MessageResponse
 
+# records how long a startup step took, in ms, under timings[step]
+@contextmanager
+def _timed(timings: dict, step: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[step] = round((time.perf_counter() - start) * 1000, 2)
+
+# every in-process cache of the app's resources by name, for the cache_* metrics
+def _cache_stats(state) -> dict:
+    stats = {f"sessions_{name}": cache for name, cache in state.sessionManager.cache_stats().items()}
+    if isinstance(state.itemDB, CachedItemDB):
+        stats["items"] = state.itemDB.cache_stats()
+    return stats
+
+# Builds every resource from the app's settings (one parsed config, see src/helpers/settings.py), each
+# component gets the Settings object itself so a create_app(settings) app never reads its env again, and
+# reports how long each step took, startup time is what decides how fast new workers can take traffic.
 @asynccontextmanager
 async def lifespan(app: FastAPI): #pragma: no cover
-    config_logger("uvicorn.error", file_name = "app.logs", backup = False)
-    logger = get_struct_logger("uvicorn.error")
+    started = time.perf_counter()
+    timings = {}
+    settings = getattr(app.state, "settings", None) or get_settings()
+    env = settings.env
+
+    with _timed(timings, "logger"):
+        config_logger("uvicorn.error", file_name = settings.log_file, backup = settings.log_backup)
+        logger = get_struct_logger("uvicorn.error")
 
-    logger.info("Initializing application resources...")
-    logger.info("Setting up SessionManager and AccountDB...")
-    logger.info("Debugging information: Application is starting up.")
+    logger.info("Initializing application resources...", env=env)
 
-    app.state.sessionManager = SessionManager("sandbox", logger)
-    app.state.accountDB = AccountDB("sandbox", logger)
-    app.state.itemDB = ItemDB("sandbox", logger)
-    app.state.plaid = Plaid("sandbox", logger)
+    if settings.ensure_indexes:
+        with _timed(timings, "indexes"):
+            index_manager = build_index_manager(settings, logger)
+            built = await index_manager.ensure_indexes()
+            logger.info("Index provisioning complete", built=built)
+            await index_manager.close()
+
+    with _timed(timings, "sessions"):
+        app.state.sessionManager = SessionManager(settings, logger, revocations=build_revocation_db(settings, logger))
+        app.state.sessionManager.start_cleanup()
+    with _timed(timings, "databases"):
+        app.state.accountDB = build_account_db(settings, logger)
+        app.state.itemDB = build_item_db(settings, logger)
+        app.state.idempotencyDB = build_idempotency_db(settings, logger)
+    with _timed(timings, "plaid"):
+        app.state.plaid = Plaid(settings, logger)
     app.state.logger = logger
+    register_cache_metrics(app.state.metrics, lambda: _cache_stats(app.state))
+
+    app.state.startup_timings = timings
+    logger.info("Startup complete", env=env, total_ms=round((time.perf_counter() - started) * 1000, 2), steps_ms=timings)
     yield
-    app.state.accountDB.close()
-    app.state.itemDB.close()
+    await app.state.sessionManager.close()
+    await app.state.accountDB.close()
+    await app.state.itemDB.close()
     await app.state.plaid.close()
+    await app.state.idempotencyDB.close()
 
-app = FastAPI(lifespan=lifespan)
-
-app.add_middleware(RequestContextMiddleware)
-
-@app.get('/ping')
 async def ping():
     return {"message": "pong"}
 
-app.include_router(account.router, prefix="/account")
-app.include_router(linked_plaid.router, prefix="/plaid", dependencies=[Depends(require_user)])
\ No newline at end of file
+# Without settings the env comes from APP_ENV (default sandbox) and is only read when the app starts,
+# so importing the module stays cheap. Run a factory built app with uvicorn src.app:create_app --factory
+def create_app(settings: Settings|None = None) -> FastAPI:
+    # keep the default response class: routes with a response_model are then serialized straight to bytes by pydantic
+    app = FastAPI(lifespan=lifespan)
+    app.state.settings = settings
+    app.state.metrics = MetricsRegistry()
+    app.state.rateLimiter = TokenBucket(rate=5, burst=20) # per user, on the /plaid routes
+
+    # retried Plaid mutations replay the stored response instead of calling Plaid again
+    app.add_middleware(IdempotencyMiddleware, routes={("POST", "/plaid/exchange_public_token"), ("PUT", "/plaid/accounts/delete")},
+                       rate_limited=True)
+    app.add_middleware(RequestContextMiddleware)
+    app.add_middleware(GZipMiddleware, minimum_size=1024, level=6)
+    # routes waiting on Plaid get bounded concurrency and a 2s queue budget, the rest are not limited
+    limiters = {
+        "/account/login": ConcurrencyLimiter(max_concurrent=32, max_queue=64, queue_timeout=2.0),
+        "/plaid": ConcurrencyLimiter(max_concurrent=64, max_queue=128, queue_timeout=2.0),
+    }
+    app.add_middleware(ConcurrencyLimitMiddleware, groups=limiters)
+    register_limiter_metrics(app.state.metrics, limiters)
+    app.add_middleware(MetricsMiddleware, registry=app.state.metrics) # outermost, times the whole request and serves /metrics
+    app.add_exception_handler(AuthError, auth_error_handler)
+
+    app.add_api_route('/ping', ping, methods=["GET"], response_model=MessageResponse)
+    app.include_router(account.router, prefix="/account")
+    app.include_router(linked_plaid.router, prefix="/plaid", dependencies=[Depends(rate_limited_user)])
+    return app
+
+app = create_app()
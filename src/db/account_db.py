@@ -1,8 +1,10 @@
-from src.db.mongo import DB
+from src.db.mongo import DB, AsyncDB
+from src.helpers.settings import Settings
 
 class AccountDB:
-    def __init__(self, env: str, logger, db_factory = DB):
-        self.collection = db_factory(env).get_db().accounts
+    def __init__(self, env: str|Settings, logger, db_factory = DB):
+        self.connection = db_factory(env)
+        self.collection = self.connection.get_db().accounts
         self.logger = logger
         self.logger.debug("AccountDB initialized.")
 
@@ -37,4 +39,44 @@ class AccountDB:
         return None
     
     def close(self):
-        self.collection.database.client.close()
\ No newline at end of file
+        self.connection.close()
+
+class AsyncAccountDB:
+    def __init__(self, env: str|Settings, logger, db_factory = AsyncDB):
+        self.connection = db_factory(env)
+        self.collection = self.connection.get_db().accounts
+        self.logger = logger
+        self.logger.debug("AsyncAccountDB initialized.")
+
+    async def insert(self, account_data: dict):
+        if account_data is None or not isinstance(account_data, dict):
+            raise ValueError("Invalid account data provided for insertion.")
+
+        self.logger.debug("Inserting new account...")
+        await self.collection.insert_one(account_data)
+        self.logger.debug("Insertion complete.")
+
+    async def find_by_field(self, field: str, val: str):
+        if not field or not val or not isinstance(field, str) or not isinstance(val, str):
+            raise ValueError("Invalid field or value provided for search.")
+
+        entry = await self.collection.find_one({field: val})
+        if not entry:
+            return None
+        del entry['_id']
+        del entry['password']
+        return entry
+
+    async def validate_credentials(self, username: str, password: str) -> dict | None:
+        if not username or not password or not isinstance(username, str) or not isinstance(password, str):
+            raise ValueError("Invalid username or password provided for validation.")
+
+        account = await self.collection.find_one({"user": username})
+        if account and account['password'] == password:
+            del account['_id']
+            del account['password']
+            return account
+        return None
+
+    async def close(self):
+        await self.connection.close()
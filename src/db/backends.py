@@ -0,0 +1,80 @@
+from typing import Protocol
+
+from src.helpers.settings import Settings, resolve_settings
+
+from src.db.account_db import AsyncAccountDB
+from src.db.item_db import AsyncItemDB
+from src.db.normalized_item_db import AsyncNormalizedItemDB
+from src.db.cached_item_db import CachedItemDB
+from src.db.indexes import IndexManager
+from src.db.revocation_db import RevocationDB
+from src.db.idempotency_db import IdempotencyDB, MemoryIdempotencyDB
+from src.db.sqlite import SQLiteAccountDB, SQLiteItemDB, SQLiteIndexManager, SQLiteRevocationDB
+from src.helpers.cache import LRUCache
+
+# Storage backends the service can run on, picked with "BACKEND" in the db env config:
+#   "mongo" (default) - AsyncAccountDB and the item layout chosen by ITEM_LAYOUT
+#   "sqlite"          - embedded single node storage in SQLITE_PATH, see src/db/sqlite.py
+# Anything passed around as app.state.accountDB / app.state.itemDB implements these interfaces.
+# Builders take an env name or the app's Settings, whichever they get is what the store is built from.
+
+class AccountStore(Protocol):
+    async def insert(self, account_data: dict) -> None: ...
+    async def find_by_field(self, field: str, val: str) -> dict | None: ...
+    async def validate_credentials(self, username: str, password: str) -> dict | None: ...
+    async def close(self) -> None: ...
+
+class ItemStore(Protocol):
+    async def insert(self, user_id: str) -> None: ...
+    async def append_item(self, user_id: str, item_id: str, access_token: str, data: dict|None = None) -> None: ...
+    async def get_items(self, user_id: str, fields: list[str]|None = None) -> list: ...
+    async def get_item(self, user_id: str, item_id: str, fields: list[str]|None = None) -> dict | None: ...
+    async def remove_item(self, user_id: str, item_id: str) -> None: ...
+    async def update_item_field(self, user_id: str, item_id: str, field: str, new_value: str|dict) -> None: ...
+    async def update_item_fields(self, user_id: str, item_id: str, fields: dict) -> None: ...
+    async def close(self) -> None: ...
+
+BACKENDS = ("mongo", "sqlite")
+
+def backend_name(config: dict) -> str:
+    backend = config.get("BACKEND", "mongo")
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown db backend: {backend}")
+    return backend
+
+def build_account_db(env: str|Settings, logger) -> AccountStore:
+    if backend_name(resolve_settings(env)['db']) == "sqlite":
+        return SQLiteAccountDB(env, logger)
+    return AsyncAccountDB(env, logger)
+
+# the per-user read cache (db.ITEM_CACHE) goes in front of whichever backend/layout is selected
+def build_item_db(env: str|Settings, logger) -> ItemStore:
+    config = resolve_settings(env)['db']
+    if backend_name(config) == "sqlite":
+        item_db = SQLiteItemDB(env, logger)
+    elif config.get("ITEM_LAYOUT", "embedded") == "normalized":
+        item_db = AsyncNormalizedItemDB(env, logger, legacy_fallback=config.get("ITEM_LEGACY_FALLBACK", False))
+    else:
+        item_db = AsyncItemDB(env, logger)
+
+    cache_config = config.get("ITEM_CACHE")
+    if cache_config:
+        cache = LRUCache(cache_config.get("MAX_USERS", 10000), cache_config.get("TTL_SECONDS", 60))
+        return CachedItemDB(item_db, cache)
+    return item_db
+
+def build_index_manager(env: str|Settings, logger):
+    if backend_name(resolve_settings(env)['db']) == "sqlite":
+        return SQLiteIndexManager(env, logger)
+    return IndexManager(env, logger)
+
+def build_revocation_db(env: str|Settings, logger):
+    if backend_name(resolve_settings(env)['db']) == "sqlite":
+        return SQLiteRevocationDB(env, logger)
+    return RevocationDB(env, logger)
+
+# the sqlite backend keeps idempotent responses in the process
+def build_idempotency_db(env: str|Settings, logger):
+    if backend_name(resolve_settings(env)['db']) == "sqlite":
+        return MemoryIdempotencyDB(logger)
+    return IdempotencyDB(env, logger)
@@ -0,0 +1,131 @@
+import copy
+
+from src.db.item_db import BULK_BATCH_SIZE, _batches, _check_bulk_options, _skipped
+from src.helpers.cache import LRUCache
+
+# only what the read routes ask for is cached, encrypted access tokens are never kept in memory
+CACHED_FIELDS = ["item_id", "item_data"]
+
+def _cacheable(fields) -> bool:
+    return bool(fields) and isinstance(fields, list) and all(field in CACHED_FIELDS for field in fields)
+
+# Read-through cache of each user's items, projected to CACHED_FIELDS, in front of an async item db (either layout).
+# Reads needing any other field go straight to the wrapped db. Writes go straight to the wrapped db and drop the
+# user's entry, the TTL bounds how stale another worker's copy can get. Callers always get their own copy, so
+# mutating a result never touches the cache.
+class CachedItemDB:
+    def __init__(self, item_db, cache: LRUCache):
+        self._item_db = item_db
+        self.cache = cache
+        self.logger = item_db.logger
+        # user_id -> [reads in flight, writes since the first of them], a read only caches what it fetched if
+        # no write for that user happened meanwhile. Entries go away with the last read, so this stays small
+        self._pending: dict[str, list[int]] = {}
+        self.logger.info("CachedItemDB initialized.", max_size=cache.max_size, ttl_seconds=cache.ttl_seconds)
+
+    def __getattr__(self, name):
+        return getattr(self._item_db, name)
+
+    async def _cached_items(self, user_id: str) -> list:
+        items = self.cache.get(user_id)
+        if items is None:
+            pending = self._pending.setdefault(user_id, [0, 0])
+            pending[0] += 1
+            writes = pending[1]
+            try:
+                items = await self._item_db.get_items(user_id, fields=CACHED_FIELDS) or []
+            finally:
+                pending[0] -= 1
+                if pending[0] == 0:
+                    del self._pending[user_id]
+            if writes == pending[1]:
+                self.cache.set(user_id, items)
+        return copy.deepcopy(items)
+
+    def _invalidate(self, user_id: str) -> None:
+        pending = self._pending.get(user_id)
+        if pending is not None:
+            pending[1] += 1
+        self.cache.invalidate(user_id)
+
+    def cache_stats(self) -> dict:
+        return self.cache.stats()
+
+    async def get_items(self, user_id: str, fields: list[str]|None = None) -> list:
+        if not _cacheable(fields):
+            return await self._item_db.get_items(user_id, fields=fields)
+        return [{field: item[field] for field in fields if field in item} for item in await self._cached_items(user_id)]
+
+    async def get_item(self, user_id: str, item_id: str, fields: list[str]|None = None):
+        if not item_id or not isinstance(item_id, str):
+            raise ValueError("Invalid item_id provided for retrieving item")
+        if not _cacheable(fields):
+            return await self._item_db.get_item(user_id, item_id, fields=fields)
+
+        for item in await self._cached_items(user_id):
+            if item.get("item_id") == item_id:
+                return {field: item[field] for field in fields if field in item}
+        self.logger.warning("Item not found")
+        return None
+
+    async def insert(self, user_id: str) -> None:
+        try:
+            await self._item_db.insert(user_id)
+        finally:
+            self._invalidate(user_id)
+
+    async def append_item(self, user_id: str, item_id: str, access_token: str, data: dict|None = None) -> None:
+        try:
+            await self._item_db.append_item(user_id, item_id, access_token, data=data)
+        finally:
+            self._invalidate(user_id)
+
+    async def remove_item(self, user_id: str, item_id: str) -> None:
+        try:
+            await self._item_db.remove_item(user_id, item_id)
+        finally:
+            self._invalidate(user_id)
+
+    async def update_item_field(self, user_id: str, item_id: str, field: str, new_value: str|dict) -> None:
+        try:
+            await self._item_db.update_item_field(user_id, item_id, field, new_value)
+        finally:
+            self._invalidate(user_id)
+
+    async def update_item_fields(self, user_id: str, item_id: str, fields: dict) -> None:
+        try:
+            await self._item_db.update_item_fields(user_id, item_id, fields)
+        finally:
+            self._invalidate(user_id)
+
+    # bulk writes are handed to the wrapped db one batch at a time, so the input stays lazy and each batch
+    # drops the users it touched (whatever the outcome) as soon as it's written
+    async def _bulk(self, method, operations, user_id, batch_size: int = BULK_BATCH_SIZE, ordered: bool = False) -> list[dict]:
+        _check_bulk_options(batch_size, ordered)
+
+        outcomes, stopped = [], False
+        for batch in _batches(operations, batch_size):
+            if stopped:
+                outcomes.extend(_skipped(batch))
+                continue
+            try:
+                written = await method(batch, batch_size=batch_size, ordered=ordered)
+            finally:
+                for op in batch:
+                    self._invalidate(user_id(op))
+            outcomes.extend(written)
+            stopped = ordered and any(not outcome["ok"] for outcome in written)
+        return outcomes
+
+    async def bulk_insert(self, user_ids, **options) -> list[dict]:
+        return await self._bulk(self._item_db.bulk_insert, user_ids, lambda op: op, **options)
+
+    async def bulk_append_items(self, items, **options) -> list[dict]:
+        return await self._bulk(self._item_db.bulk_append_items, items, lambda op: op.get("user_id") if isinstance(op, dict) else None, **options)
+
+    async def bulk_update_item_fields(self, updates, **options) -> list[dict]:
+        return await self._bulk(self._item_db.bulk_update_item_fields, updates, lambda op: op.get("user_id") if isinstance(op, dict) else None, **options)
+
+    async def close(self):
+        self.cache.clear()
+        await self._item_db.close()
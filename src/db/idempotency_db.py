@@ -0,0 +1,130 @@
+from datetime import datetime, UTC
+from pymongo.errors import DuplicateKeyError
+import heapq
+import time
+
+from src.db.mongo import AsyncDB
+from src.helpers.settings import Settings
+
+# Responses of requests sent with an Idempotency-Key (see src/helpers/idempotency_middleware.py), keyed by
+# the middleware's scoped key. A request first claims its key with a pending record ({"fingerprint",
+# "pending": True}) that only lives for a short lease, so whichever worker inserts it runs the route and the
+# others wait. put() then finishes it: a dict with the fingerprint and the response's status_code, headers
+# and body, replayed to retries until it expires. release() drops a claim whose response isn't stored.
+
+# Shared across workers and restarts, the TTL index (src/db/indexes.py) has mongo drop expired records and
+# the expires_at filter covers the TTL monitor's lag.
+class IdempotencyDB:
+    def __init__(self, env: str|Settings, logger, db_factory = AsyncDB):
+        self.connection = db_factory(env)
+        self.collection = self.connection.get_db().idempotency_keys
+        self.logger = logger
+        self.logger.debug("IdempotencyDB initialized.")
+
+    async def get(self, key: str) -> dict|None:
+        return await self.collection.find_one({"_id": key, "expires_at": {"$gt": datetime.now(UTC)}}, {"_id": 0, "expires_at": 0})
+
+    # (True, None) when this caller now holds key, otherwise (False, the live record holding it).
+    # (False, None) means the holder's record went away between the insert and the read, claim again.
+    async def claim(self, key: str, fingerprint: str, ttl_seconds: int) -> tuple[bool, dict|None]:
+        if not key or not isinstance(key, str) or not isinstance(fingerprint, str) or not isinstance(ttl_seconds, int):
+            raise ValueError("Invalid key, fingerprint or ttl_seconds provided for idempotency")
+
+        now = time.time()
+        pending = {"fingerprint": fingerprint, "pending": True, "expires_at": datetime.fromtimestamp(now + ttl_seconds, UTC)}
+        try:
+            await self.collection.insert_one({"_id": key, **pending})
+            return True, None
+        except DuplicateKeyError:
+            pass
+        except Exception as e:
+            self.logger.error("Failed to claim idempotency key: %s", e)
+            raise
+
+        record = await self.get(key)
+        if record is not None:
+            return False, record
+        # expired but not yet dropped by the TTL monitor
+        result = await self.collection.replace_one({"_id": key, "expires_at": {"$lte": datetime.fromtimestamp(now, UTC)}}, pending)
+        return result.modified_count == 1, None
+
+    async def put(self, key: str, record: dict, ttl_seconds: int) -> None:
+        if not key or not isinstance(key, str) or not isinstance(record, dict) or not isinstance(ttl_seconds, int):
+            raise ValueError("Invalid key, record or ttl_seconds provided for idempotency")
+
+        try:
+            expires_at = datetime.fromtimestamp(time.time() + ttl_seconds, UTC)
+            await self.collection.replace_one({"_id": key}, {**record, "expires_at": expires_at}, upsert=True)
+        except Exception as e:
+            self.logger.error("Failed to store idempotent response: %s", e)
+            raise
+
+    async def release(self, key: str) -> None:
+        try:
+            await self.collection.delete_one({"_id": key, "pending": True})
+        except Exception as e:
+            self.logger.error("Failed to release idempotency key: %s", e)
+            raise
+
+    async def close(self):
+        await self.connection.close()
+
+# Local stand-in for tests and single process runs, records live only as long as the process.
+# A heap ordered by expiry sits next to the lookup dict (like MemoryRevocationDB): every put drops the
+# records that expired, and past max_records the ones closest to expiring go first, so memory stays bounded.
+class MemoryIdempotencyDB:
+    def __init__(self, logger = None, clock = time.time, max_records: int = 100000):
+        if not isinstance(max_records, int) or max_records < 1:
+            raise ValueError("Invalid max_records provided for idempotency")
+        self.records: dict[str, tuple[float, dict]] = {} # key -> (expires_at, record)
+        self._expiries: list[tuple[float, str]] = [] # (expires_at, key) min-heap, may hold stale entries for re-stored keys
+        self._clock = clock
+        self.max_records = max_records
+        self.logger = logger
+
+    async def get(self, key: str) -> dict|None:
+        expires_at, record = self.records.get(key, (0, None))
+        if record is not None and expires_at <= self._clock():
+            del self.records[key]
+            return None
+        return record
+
+    async def put(self, key: str, record: dict, ttl_seconds: int) -> None:
+        if not key or not isinstance(key, str) or not isinstance(record, dict) or not isinstance(ttl_seconds, int):
+            raise ValueError("Invalid key, record or ttl_seconds provided for idempotency")
+        now = self._clock()
+        self._drop(lambda expires_at: expires_at <= now)
+        self.records[key] = (now + ttl_seconds, record)
+        heapq.heappush(self._expiries, (now + ttl_seconds, key))
+        self._drop(lambda _: len(self.records) > self.max_records)
+
+    async def claim(self, key: str, fingerprint: str, ttl_seconds: int) -> tuple[bool, dict|None]:
+        if not key or not isinstance(key, str) or not isinstance(fingerprint, str) or not isinstance(ttl_seconds, int):
+            raise ValueError("Invalid key, fingerprint or ttl_seconds provided for idempotency")
+        record = await self.get(key)
+        if record is not None:
+            return False, record
+        await self.put(key, {"fingerprint": fingerprint, "pending": True}, ttl_seconds)
+        return True, None
+
+    async def release(self, key: str) -> None:
+        if self.records.get(key, (0, {}))[1].get("pending"):
+            del self.records[key]
+
+    # pops heap entries while should_drop(their expiry) holds, returns how many live records went with them
+    def _drop(self, should_drop) -> int:
+        removed = 0
+        while self._expiries and should_drop(self._expiries[0][0]):
+            expires_at, key = heapq.heappop(self._expiries)
+            if self.records.get(key, (None,))[0] == expires_at:
+                del self.records[key]
+                removed += 1
+        return removed
+
+    async def cleanup(self) -> int:
+        now = self._clock()
+        return self._drop(lambda expires_at: expires_at <= now)
+
+    async def close(self):
+        self.records.clear()
+        self._expiries.clear()
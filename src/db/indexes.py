@@ -0,0 +1,63 @@
+from pymongo import ASCENDING, IndexModel
+
+from src.db.mongo import AsyncDB
+from src.helpers.settings import Settings
+
+# collection name -> indexes that must exist on it
+INDEXES = {
+    "accounts": [
+        IndexModel([("user", ASCENDING)], name="user_unique", unique=True),
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+        IndexModel([("user_id", ASCENDING)], name="user_id_unique", unique=True),
+    ],
+    "items": [
+        IndexModel([("user_id", ASCENDING)], name="user_id_unique", unique=True),
+        IndexModel([("items.item_id", ASCENDING)], name="items_item_id"), # multikey over the embedded array
+    ],
+    # normalized item layout, one document per item
+    "linked_items": [
+        IndexModel([("user_id", ASCENDING), ("item_id", ASCENDING)], name="user_id_item_id_unique", unique=True),
+    ],
+    # session revocations, mongo removes each one once its token has expired
+    "revoked_sessions": [
+        IndexModel([("expires_at", ASCENDING)], name="revoked_sessions_ttl", expireAfterSeconds=0),
+    ],
+    # per-user "sessions valid after" epochs, removed once every token they cover has expired
+    "session_epochs": [
+        IndexModel([("expires_at", ASCENDING)], name="session_epochs_ttl", expireAfterSeconds=0),
+    ],
+    # claims and stored responses for Idempotency-Key retries, removed once their TTL runs out
+    "idempotency_keys": [
+        IndexModel([("expires_at", ASCENDING)], name="idempotency_keys_ttl", expireAfterSeconds=0),
+    ],
+}
+
+class IndexManager:
+    def __init__(self, env: str|Settings, logger, db_factory = AsyncDB, indexes: dict[str, list[IndexModel]]|None = None):
+        self.connection = db_factory(env)
+        self.db = self.connection.get_db()
+        self.indexes = indexes if indexes is not None else INDEXES
+        self.logger = logger
+        self.logger.debug("IndexManager initialized.")
+
+    # safe to run on every startup, mongo treats creating an identical existing index as a no-op
+    # returns collection name -> names of the indexes this call actually built
+    async def ensure_indexes(self) -> dict[str, list[str]]:
+        built = {}
+        for collection_name, models in self.indexes.items():
+            collection = self.db[collection_name]
+            existing = set((await collection.index_information()).keys())
+
+            try:
+                names = await collection.create_indexes(models)
+            except Exception as e:
+                self.logger.error("Failed to create indexes on %s: %s", collection_name, e)
+                raise
+
+            built[collection_name] = [name for name in names if name not in existing]
+            self.logger.info("Indexes ensured for %s", collection_name, built=built[collection_name], existing=sorted(existing))
+
+        return built
+
+    async def close(self):
+        await self.connection.close()
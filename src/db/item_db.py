@@ -1,11 +1,205 @@
-from src.db.mongo import DB
+from src.db.mongo import DB, AsyncDB
+from src.helpers.settings import Settings
 from src.helpers.encryption import encrypt
 
+from pymongo import ReturnDocument, InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
 from datetime import datetime, UTC
+from itertools import islice
+from typing import Iterable
+
+# Single round-trip append: a pipeline update that only concatenates the new item when its item_id
+# is not already present, paired with a projection of the pre-update document that shows whether
+# it was. Values are wrapped in $literal so strings starting with "$" are not read as field paths.
+def _append_item_update(item_id: str, access_token: str, data: dict|None) -> tuple[list, dict]:
+    item = {
+        "item_id": item_id,
+        "access_token": access_token,
+        "last_updatated": None,
+        "item_data": data
+    }
+    items = {"$ifNull": ["$items", []]}
+    pipeline = [{"$set": {"items": {"$cond": [
+        {"$in": [{"$literal": item_id}, {"$ifNull": ["$items.item_id", []]}]},
+        items,
+        {"$concatArrays": [items, [{"$literal": item}]]}
+    ]}}}]
+    projection = {"_id": 0, "items": {"$elemMatch": {"item_id": item_id}}}
+    return pipeline, projection
+
+# Build the positional $set for one item: every field plus last_updated in a single write,
+# with the access token encrypted before it is stored. Dotted keys (item_data.nickname) set sub-fields
+# and an empty dict only touches last_updated.
+def _item_fields_update(fields: dict, prefix: str = "items.$.") -> dict:
+    update = {}
+    for field, value in fields.items():
+        if field == "access_token":
+            value = encrypt(value)
+        update[f"{prefix}{field}"] = value
+    update[f"{prefix}last_updated"] = datetime.now(UTC).isoformat()
+    return update
+
+# Projection for listing a user's items, optionally limited to the given item sub-fields
+# (e.g. ["item_id", "item_data"] to skip encrypted access tokens)
+def _items_projection(fields: list[str]|None) -> dict:
+    if not fields:
+        return {"_id": 0, "items": 1}
+    return {"_id": 0, **{f"items.{field}": 1 for field in fields}}
+
+def _valid_fields(fields) -> bool:
+    return fields is None or (isinstance(fields, list) and all(isinstance(f, str) and f for f in fields))
+
+# $elemMatch can't also trim the element it returns, so with fields the matching item is filtered and
+# trimmed server side and only the requested sub-fields leave mongo
+def _item_pipeline(user_id: str, item_id: str, fields: list[str]) -> list:
+    return [
+        {"$match": {"user_id": user_id}},
+        {"$project": {"_id": 0, "items": {"$filter": {"input": "$items", "as": "item", "cond": {"$eq": ["$$item.item_id", item_id]}}}}},
+        {"$project": {f"items.{field}": 1 for field in fields}},
+    ]
+
+# Bulk operations: inputs are consumed lazily in batches of batch_size, each batch costs one read of the
+# owners it touches plus one bulk_write. Every input gets an outcome, in input order:
+#   {"user_id": ..., "item_id": ..., "ok": True/False, "error": None or the message the single-item method raises}
+# ordered=True stops at the first failure (later operations report NOT_ATTEMPTED), unordered keeps going.
+BULK_BATCH_SIZE = 1000
+NOT_ATTEMPTED = "Not attempted, an earlier operation failed"
+_OWNED_ITEMS_PROJECTION = {"_id": 0, "user_id": 1, "items.item_id": 1}
+
+def _check_bulk_options(batch_size: int, ordered: bool) -> None:
+    if not isinstance(batch_size, int) or isinstance(batch_size, bool) or batch_size < 1:
+        raise ValueError("Invalid batch_size provided for bulk operation")
+    if not isinstance(ordered, bool):
+        raise ValueError("Invalid ordered flag provided for bulk operation")
+
+def _batches(operations: Iterable, batch_size: int):
+    operations = iter(operations)
+    while batch := list(islice(operations, batch_size)):
+        yield batch
+
+def _outcome(op) -> dict:
+    op = op if isinstance(op, dict) else {"user_id": op}
+    outcome = {"user_id": op.get("user_id"), "ok": False, "error": None}
+    if "item_id" in op:
+        outcome["item_id"] = op.get("item_id")
+    return outcome
+
+def _skipped(batch: list) -> list[dict]:
+    return [{**_outcome(op), "error": NOT_ATTEMPTED} for op in batch]
+
+def _owner_ids(batch: list) -> list[str]:
+    return list({op["user_id"] for op in batch if isinstance(op, dict) and isinstance(op.get("user_id"), str)})
+
+def _owned_items(records: list[dict]) -> dict[str, set]:
+    return {record["user_id"]: {item.get("item_id") for item in record.get("items") or []} for record in records}
+
+def _bulk_insert_error(user_id) -> str|None:
+    if not user_id or not isinstance(user_id, str):
+        return "Invalid user_id provided for insertion."
+    return None
+
+def _bulk_append_error(op, owned: dict[str, set]) -> str|None:
+    if not isinstance(op, dict) or not all(op.get(k) and isinstance(op.get(k), str) for k in ("user_id", "item_id", "access_token")):
+        return "Invalid user_id, item_id, or access_token provided for appending item"
+    if op["user_id"] not in owned:
+        return "User_id not found"
+    if op["item_id"] in owned[op["user_id"]]:
+        return "Item already exists"
+    return None
+
+def _bulk_update_error(op, owned: dict[str, set]) -> str|None:
+    if not isinstance(op, dict) or not all(op.get(k) and isinstance(op.get(k), str) for k in ("user_id", "item_id")) \
+            or not isinstance(op.get("fields"), dict) or not all(isinstance(k, str) and k for k in op["fields"]):
+        return "Invalid user_id, item_id, or fields provided for updating item fields"
+    if "access_token" in op["fields"] and not isinstance(op["fields"]["access_token"], str):
+        return "New access token must be a string"
+    if op["item_id"] not in owned.get(op["user_id"], ()):
+        return "Item not found"
+    return None
+
+# Checks every operation of a batch and builds the writes for the ones that can go through.
+# Returns (outcomes, requests, positions): positions[i] is the outcome index of requests[i].
+# The write filters repeat the checks, so anything that changed since the owners were read simply doesn't match.
+def _plan_batch(kind: str, batch: list, owned: dict[str, set], ordered: bool) -> tuple[list[dict], list, list[int]]:
+    outcomes = [_outcome(op) for op in batch]
+    requests, positions = [], []
+    for i, op in enumerate(batch):
+        if kind == "insert":
+            error = _bulk_insert_error(op)
+        elif kind == "append":
+            error = _bulk_append_error(op, owned)
+        else:
+            error = _bulk_update_error(op, owned)
+
+        if error:
+            outcomes[i]["error"] = error
+            if ordered:
+                outcomes[i + 1:] = _skipped(batch[i + 1:])
+                break
+            continue
+
+        if kind == "insert":
+            requests.append(InsertOne({"user_id": op, "items": []}))
+        elif kind == "append":
+            owned[op["user_id"]].add(op["item_id"]) # a repeat later in the same batch is a duplicate
+            item = {"item_id": op["item_id"], "access_token": encrypt(op["access_token"]), "last_updatated": None, "item_data": op.get("data")}
+            requests.append(UpdateOne({"user_id": op["user_id"], "items.item_id": {"$ne": op["item_id"]}}, {"$push": {"items": item}}))
+        else:
+            requests.append(UpdateOne({"user_id": op["user_id"], "items.item_id": op["item_id"]}, {"$set": _item_fields_update(op["fields"])}))
+        positions.append(i)
+    return outcomes, requests, positions
+
+UNCONFIRMED = "Not confirmed, the item changed while the batch was written"
+
+# writes bulk_write reports as applied, from its result or from a BulkWriteError's details
+def _applied(result) -> int:
+    if isinstance(result, dict):
+        return result.get("nInserted", 0) + result.get("nMatched", 0)
+    return result.inserted_count + result.matched_count
+
+# bulk_write only counts writes whose filter matched nothing (the item or its owner changed after the owners
+# were read), it doesn't say which. With owned re-read after the write, sent operations whose effect is missing
+# fail, and if that doesn't account for every miss the rest of the batch's sent operations are unconfirmed.
+def _reconcile_batch(kind: str, batch: list, outcomes: list[dict], positions: list[int], owned: dict[str, set], missed: int) -> None:
+    sent = [position for position in positions if outcomes[position]["ok"]]
+    for position in sent:
+        op = batch[position]
+        items = owned.get(op["user_id"])
+        if items is not None and op["item_id"] in items:
+            continue
+        if kind == "update":
+            error = "Item not found"
+        else:
+            error = "User_id not found" if items is None else UNCONFIRMED
+        outcomes[position].update(ok=False, error=error)
+        missed -= 1
+
+    if missed > 0:
+        for position in sent:
+            if outcomes[position]["ok"]:
+                outcomes[position].update(ok=False, error=UNCONFIRMED)
+
+# Fills in the outcomes of the writes that were sent, returns whether an ordered run has to stop
+def _settle_batch(outcomes: list[dict], positions: list[int], write_errors: list[dict], ordered: bool) -> bool:
+    for position in positions:
+        outcomes[position]["ok"] = True
+
+    for write_error in write_errors:
+        outcome = outcomes[positions[write_error["index"]]]
+        outcome["ok"] = False
+        outcome["error"] = "User_id already exists" if write_error.get("code") == 11000 else write_error.get("errmsg", "Write failed")
+
+    if ordered and write_errors:
+        first = min(write_error["index"] for write_error in write_errors)
+        for position in positions[first + 1:]:
+            outcomes[position].update(ok=False, error=NOT_ATTEMPTED)
+
+    return ordered and any(not outcome["ok"] for outcome in outcomes)
 
 class ItemDB:
-    def __init__(self, env: str, logger, db_factory = DB):
-        self.collection = db_factory(env).get_db().items
+    def __init__(self, env: str|Settings, logger, db_factory = DB):
+        self.connection = db_factory(env)
+        self.collection = self.connection.get_db().items
         self.logger = logger
         self.logger.info("ItemDB initialized.")
 
@@ -24,59 +218,57 @@ class ItemDB:
         if not user_id or not item_id or not access_token or not isinstance(user_id, str) or not isinstance(item_id, str) or not isinstance(access_token, str):
             raise ValueError("Invalid user_id, item_id, or access_token provided for appending item")
         
-        if not self.collection.find_one({"user_id": user_id}):
-            raise ValueError("User_id not found")
-
-        if self.collection.find_one({"user_id": user_id, "items": {"$elemMatch": {"item_id": item_id}}}):
-            raise ValueError("Item already exists")
-
+        pipeline, projection = _append_item_update(item_id, encrypt(access_token), data)
         try:
-            self.collection.update_one({"user_id": user_id}, 
-                                   {"$push": 
-                                        {"items": 
-                                            {
-                                                "item_id": item_id, 
-                                                "access_token": encrypt(access_token),
-                                                "last_updatated": None,  
-                                                "item_data": data
-                                            }
-                                        }
-                                    })
+            before = self.collection.find_one_and_update({"user_id": user_id}, pipeline,
+                                                        projection=projection,
+                                                        return_document=ReturnDocument.BEFORE)
         except Exception as e:
             self.logger.error("Failed to append item: %s", e)
             raise
-        
-    def get_items(self, user_id: str) -> list:
+
+        # before is the pre-update document: missing -> no user, matching item -> nothing was appended
+        if before is None:
+            raise ValueError("User_id not found")
+        if before.get("items"):
+            raise ValueError("Item already exists")
+
+    def get_items(self, user_id: str, fields: list[str]|None = None) -> list:
         if not user_id or not isinstance(user_id, str):
             raise ValueError("Invalid user_id provided for retrieving items")
+        if fields is not None and (not isinstance(fields, list) or not all(isinstance(f, str) and f for f in fields)):
+            raise ValueError("Invalid fields provided for retrieving items")
 
         self.logger.debug("Retrieving items for user_id: %s", user_id)
-        record = self.collection.find_one({"user_id": user_id})
+        record = self.collection.find_one({"user_id": user_id}, _items_projection(fields))
         if record:
             return record.get("items")
         else:
             self.logger.warning("No user found")
             return []
-        
-    def get_item(self, user_id: str, item_id: str):
+
+    def get_item(self, user_id: str, item_id: str, fields: list[str]|None = None):
         if not user_id or not isinstance(user_id, str):
             raise ValueError("Invalid user_id provided for retrieving item")
         if not item_id or not isinstance(item_id, str):
             raise ValueError("Invalid item_id provided for retrieving item")
-        
+        if not _valid_fields(fields):
+            raise ValueError("Invalid fields provided for retrieving item")
+
         self.logger.debug(f"Retrieving item {item_id} for user: {user_id}")
-        record = self.collection.find_one({"user_id": user_id})
-        if record and "items" in record:
-            for item in record["items"]:
-                if item.get("item_id") == item_id:
-                    return item
-            self.logger.warning("Item not found")
-            return None
+        if fields:
+            record = next(iter(self.collection.aggregate(_item_pipeline(user_id, item_id, fields))), None)
         else:
+            # $elemMatch projection returns only the matching array element (and omits items when none match)
+            record = self.collection.find_one({"user_id": user_id}, {"_id": 0, "items": {"$elemMatch": {"item_id": item_id}}})
+        if record is None:
             self.logger.warning("User not found")
             return None
+        if record.get("items"):
+            return record["items"][0]
+        self.logger.warning("Item not found")
+        return None
 
-        
     def remove_item(self, user_id: str, item_id: str) -> None:
         if not user_id or not item_id or not isinstance(user_id, str) or not isinstance(item_id, str):
             raise ValueError("Invalid user_id or item_id provided for removing item")
@@ -94,26 +286,199 @@ class ItemDB:
             raise ValueError("Invalid user_id, item_id, or new_access_token provided for updating access token")
 
         self.logger.debug("Updating %s for item_id: %s of user_id: %s", field, item_id, user_id)
+        self.update_item_fields(user_id, item_id, {field: new_value})
 
-        if field == "access_token":
-            if not isinstance(new_value, str):
-                self.logger.error("New access token must be a string", new_value=new_value)
-                raise ValueError("New access token must be a string")
-            new_value = encrypt(new_value)
+    def update_item_fields(self, user_id: str, item_id: str, fields: dict) -> None:
+        if not user_id or not item_id or not isinstance(user_id, str) or not isinstance(item_id, str) or not isinstance(fields, dict) or not all(isinstance(k, str) and k for k in fields):
+            self.logger.error("Invalid input provided for updating item fields", user_id=user_id, item_id=item_id, fields=fields)
+            raise ValueError("Invalid user_id, item_id, or fields provided for updating item fields")
+
+        if "access_token" in fields and not isinstance(fields["access_token"], str):
+            self.logger.error("New access token must be a string", new_value=fields["access_token"])
+            raise ValueError("New access token must be a string")
+
+        self.logger.debug("Updating fields %s for item_id: %s of user_id: %s", list(fields), item_id, user_id)
 
         try:
-            self.collection.update_one(
+            result = self.collection.update_one(
                 {"user_id": user_id, "items.item_id": item_id},
-                {"$set": {f"items.$.{field}": new_value}}
+                {"$set": _item_fields_update(fields)}
             )
         except Exception as e:
-            self.logger.error("Failed to update access token: %s", e)
+            self.logger.error("Failed to update item fields: %s", e)
             raise
 
-        self.collection.update_one(
-            {"user_id": user_id, "items.item_id": item_id},
-            {"$set": {"items.$.last_updated": datetime.now(UTC).isoformat()}}
-        )
+        if result.matched_count == 0:
+            self.logger.warning("Item not found")
+            raise ValueError("Item not found")
 
     def close(self):
-        self.collection.database.client.close()
\ No newline at end of file
+        self.connection.close()
+
+class AsyncItemDB:
+    def __init__(self, env: str|Settings, logger, db_factory = AsyncDB):
+        self.connection = db_factory(env)
+        self.collection = self.connection.get_db().items
+        self.logger = logger
+        self.logger.info("AsyncItemDB initialized.")
+
+    async def insert(self, user_id: str) -> None:
+        if not user_id or not isinstance(user_id, str):
+            raise ValueError("Invalid user_id provided for insertion.")
+
+        self.logger.debug("Inserting new item...")
+        try:
+            await self.collection.insert_one({"user_id": user_id, "items": []})
+        except Exception as e:
+            self.logger.error("Failed to insert new item: %s", e)
+            raise
+
+    async def append_item(self, user_id: str, item_id: str, access_token: str, data: dict|None = None) -> None:
+        if not user_id or not item_id or not access_token or not isinstance(user_id, str) or not isinstance(item_id, str) or not isinstance(access_token, str):
+            raise ValueError("Invalid user_id, item_id, or access_token provided for appending item")
+
+        pipeline, projection = _append_item_update(item_id, encrypt(access_token), data)
+        try:
+            before = await self.collection.find_one_and_update({"user_id": user_id}, pipeline,
+                                                        projection=projection,
+                                                        return_document=ReturnDocument.BEFORE)
+        except Exception as e:
+            self.logger.error("Failed to append item: %s", e)
+            raise
+
+        # before is the pre-update document: missing -> no user, matching item -> nothing was appended
+        if before is None:
+            raise ValueError("User_id not found")
+        if before.get("items"):
+            raise ValueError("Item already exists")
+
+    async def get_items(self, user_id: str, fields: list[str]|None = None) -> list:
+        if not user_id or not isinstance(user_id, str):
+            raise ValueError("Invalid user_id provided for retrieving items")
+        if fields is not None and (not isinstance(fields, list) or not all(isinstance(f, str) and f for f in fields)):
+            raise ValueError("Invalid fields provided for retrieving items")
+
+        self.logger.debug("Retrieving items for user_id: %s", user_id)
+        record = await self.collection.find_one({"user_id": user_id}, _items_projection(fields))
+        if record:
+            return record.get("items")
+        else:
+            self.logger.warning("No user found")
+            return []
+
+    async def get_item(self, user_id: str, item_id: str, fields: list[str]|None = None):
+        if not user_id or not isinstance(user_id, str):
+            raise ValueError("Invalid user_id provided for retrieving item")
+        if not item_id or not isinstance(item_id, str):
+            raise ValueError("Invalid item_id provided for retrieving item")
+        if not _valid_fields(fields):
+            raise ValueError("Invalid fields provided for retrieving item")
+
+        self.logger.debug(f"Retrieving item {item_id} for user: {user_id}")
+        if fields:
+            records = await (await self.collection.aggregate(_item_pipeline(user_id, item_id, fields))).to_list(1)
+            record = records[0] if records else None
+        else:
+            # $elemMatch projection returns only the matching array element (and omits items when none match)
+            record = await self.collection.find_one({"user_id": user_id}, {"_id": 0, "items": {"$elemMatch": {"item_id": item_id}}})
+        if record is None:
+            self.logger.warning("User not found")
+            return None
+        if record.get("items"):
+            return record["items"][0]
+        self.logger.warning("Item not found")
+        return None
+
+    async def remove_item(self, user_id: str, item_id: str) -> None:
+        if not user_id or not item_id or not isinstance(user_id, str) or not isinstance(item_id, str):
+            raise ValueError("Invalid user_id or item_id provided for removing item")
+
+        self.logger.debug("Removing item_id: %s from user_id: %s", item_id, user_id)
+        try:
+            await self.collection.update_one({"user_id": user_id}, {"$pull": {"items": {"item_id": item_id}}})
+        except Exception as e:
+            self.logger.error("Failed to remove item: %s", e)
+            raise
+
+    async def update_item_field(self, user_id: str, item_id: str, field: str, new_value: str|dict) -> None:
+        if not user_id or not item_id or not field or not new_value or not isinstance(user_id, str) or not isinstance(item_id, str) or not isinstance(field, str) or not isinstance(new_value, (str, dict)):
+            self.logger.error("Invalid input provided for updating item field", user_id=user_id, item_id=item_id, field=field, new_value=new_value)
+            raise ValueError("Invalid user_id, item_id, or new_access_token provided for updating access token")
+
+        self.logger.debug("Updating %s for item_id: %s of user_id: %s", field, item_id, user_id)
+        await self.update_item_fields(user_id, item_id, {field: new_value})
+
+    async def update_item_fields(self, user_id: str, item_id: str, fields: dict) -> None:
+        if not user_id or not item_id or not isinstance(user_id, str) or not isinstance(item_id, str) or not isinstance(fields, dict) or not all(isinstance(k, str) and k for k in fields):
+            self.logger.error("Invalid input provided for updating item fields", user_id=user_id, item_id=item_id, fields=fields)
+            raise ValueError("Invalid user_id, item_id, or fields provided for updating item fields")
+
+        if "access_token" in fields and not isinstance(fields["access_token"], str):
+            self.logger.error("New access token must be a string", new_value=fields["access_token"])
+            raise ValueError("New access token must be a string")
+
+        self.logger.debug("Updating fields %s for item_id: %s of user_id: %s", list(fields), item_id, user_id)
+
+        try:
+            result = await self.collection.update_one(
+                {"user_id": user_id, "items.item_id": item_id},
+                {"$set": _item_fields_update(fields)}
+            )
+        except Exception as e:
+            self.logger.error("Failed to update item fields: %s", e)
+            raise
+
+        if result.matched_count == 0:
+            self.logger.warning("Item not found")
+            raise ValueError("Item not found")
+
+    async def _bulk(self, kind: str, operations: Iterable, batch_size: int, ordered: bool) -> list[dict]:
+        _check_bulk_options(batch_size, ordered)
+
+        outcomes, stopped = [], False
+        for batch in _batches(operations, batch_size):
+            if stopped:
+                outcomes.extend(_skipped(batch))
+                continue
+
+            owned = {}
+            if kind != "insert":
+                owned = _owned_items(await self.collection.find({"user_id": {"$in": _owner_ids(batch)}}, _OWNED_ITEMS_PROJECTION).to_list())
+            planned, requests, positions = _plan_batch(kind, batch, owned, ordered)
+
+            write_errors, applied = [], 0
+            if requests:
+                try:
+                    applied = _applied(await self.collection.bulk_write(requests, ordered=ordered))
+                except BulkWriteError as e:
+                    write_errors = e.details.get("writeErrors", [])
+                    applied = _applied(e.details)
+                except Exception as e:
+                    self.logger.error("Failed to run bulk %s: %s", kind, e)
+                    raise
+
+            stopped = _settle_batch(planned, positions, write_errors, ordered)
+            missed = sum(planned[position]["ok"] for position in positions) - applied
+            if missed > 0 and kind != "insert":
+                self.logger.warning("Bulk %s writes changed concurrently and matched nothing", kind, missed=missed)
+                owned = _owned_items(await self.collection.find({"user_id": {"$in": _owner_ids(batch)}}, _OWNED_ITEMS_PROJECTION).to_list())
+                _reconcile_batch(kind, batch, planned, positions, owned, missed)
+                stopped = ordered and any(not outcome["ok"] for outcome in planned)
+            outcomes.extend(planned)
+            self.logger.debug("Bulk %s batch complete", kind, size=len(batch), written=applied)
+        return outcomes
+
+    # user_ids: iterable of user_id strings
+    async def bulk_insert(self, user_ids: Iterable[str], batch_size: int = BULK_BATCH_SIZE, ordered: bool = False) -> list[dict]:
+        return await self._bulk("insert", user_ids, batch_size, ordered)
+
+    # items: iterable of {"user_id", "item_id", "access_token", "data" (optional)}
+    async def bulk_append_items(self, items: Iterable[dict], batch_size: int = BULK_BATCH_SIZE, ordered: bool = False) -> list[dict]:
+        return await self._bulk("append", items, batch_size, ordered)
+
+    # updates: iterable of {"user_id", "item_id", "fields"}, fields as in update_item_fields
+    async def bulk_update_item_fields(self, updates: Iterable[dict], batch_size: int = BULK_BATCH_SIZE, ordered: bool = False) -> list[dict]:
+        return await self._bulk("update", updates, batch_size, ordered)
+
+    async def close(self):
+        await self.connection.close()
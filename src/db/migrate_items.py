@@ -0,0 +1,81 @@
+import argparse
+
+from pymongo import DeleteMany
+
+from src.db.mongo import DB
+from src.helpers.settings import Settings
+from src.db.normalized_item_db import _legacy_copy_ops, _stale_legacy_filter
+from src.helpers.logger import config_logger, get_struct_logger
+
+# Copies embedded item documents (items collection) into the normalized layout (linked_items collection)
+# in batches while the service keeps running. Every migrated source document is marked with migrated: true,
+# so an interrupted run resumes where it stopped simply by running it again.
+#
+#   python -m src.db.migrate_items sandbox --batch-size 500
+class ItemLayoutMigration:
+    def __init__(self, env: str|Settings, logger, db_factory = DB, batch_size: int = 500):
+        if not isinstance(batch_size, int) or batch_size < 1:
+            raise ValueError("Invalid batch_size provided for migration")
+
+        self.connection = db_factory(env)
+        db = self.connection.get_db()
+        self.source = db.items
+        self.target = db.linked_items
+        self.batch_size = batch_size
+        self.logger = logger
+        self.logger.info("ItemLayoutMigration initialized.")
+
+    # returns how many source documents were migrated and the _id to continue after
+    def run_batch(self, after_id = None) -> tuple[int, object]:
+        query = {"migrated": {"$ne": True}}
+        if after_id is not None:
+            query["_id"] = {"$gt": after_id}
+
+        records = list(self.source.find(query, {"user_id": 1, "items": 1}).sort("_id", 1).limit(self.batch_size))
+        if not records:
+            return 0, after_id
+
+        ops = [op for record in records for op in _legacy_copy_ops(record)]
+        if ops:
+            self.target.bulk_write(ops, ordered=False)
+
+        ids = [record["_id"] for record in records]
+        self.source.update_many({"_id": {"$in": ids}}, {"$set": {"migrated": True}})
+
+        # re-read the sources: anything removed by the service while this batch was being copied must not come back
+        stale = [DeleteMany(_stale_legacy_filter(record)) for record in self.source.find({"_id": {"$in": ids}}, {"user_id": 1, "items.item_id": 1})]
+        if stale:
+            self.target.bulk_write(stale, ordered=False)
+
+        return len(records), ids[-1]
+
+    def run(self) -> int:
+        total = 0
+        after_id = None
+        while True:
+            count, after_id = self.run_batch(after_id)
+            if count == 0:
+                break
+            total += count
+            self.logger.info("Migrated item documents", batch=count, total=total)
+
+        self.logger.info("Item layout migration complete", total=total)
+        return total
+
+def main(): #pragma: no cover
+    parser = argparse.ArgumentParser(description="Migrate embedded item documents to one document per item")
+    parser.add_argument("env", help="env config to load, e.g. sandbox")
+    parser.add_argument("--batch-size", type=int, default=500, help="source documents migrated per batch")
+    args = parser.parse_args()
+
+    config_logger("migrate_items")
+    logger = get_struct_logger("migrate_items")
+
+    migration = ItemLayoutMigration(args.env, logger, batch_size=args.batch_size)
+    try:
+        migration.run()
+    finally:
+        migration.connection.close()
+
+if __name__ == "__main__": #pragma: no cover
+    main()
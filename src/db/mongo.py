@@ -1,13 +1,108 @@
-from pymongo import MongoClient
-from env.envs import Env
+from pymongo import MongoClient, AsyncMongoClient
+from src.helpers.settings import Settings, resolve_settings, env_name
+
+from dataclasses import dataclass
+import threading
+
+# pool/timeout settings accepted from the "POOL" object of the db env config, passed straight to the client
+POOL_OPTIONS = (
+    "maxPoolSize",
+    "minPoolSize",
+    "maxIdleTimeMS",
+    "waitQueueTimeoutMS",
+    "connectTimeoutMS",
+    "socketTimeoutMS",
+    "serverSelectionTimeoutMS",
+)
+
+def client_options(config: dict) -> dict:
+    pool = config.get("POOL") or {}
+    unknown = set(pool) - set(POOL_OPTIONS)
+    if unknown:
+        raise ValueError(f"Unknown db pool options: {sorted(unknown)}")
+    return {option: pool[option] for option in POOL_OPTIONS if option in pool}
+
+@dataclass
+class PooledClient:
+    client: object
+    db_name: str
+    refs: int = 0
+
+# One client (and so one connection pool) per env and database for the whole process, shared by every DB
+# handle. Each handle holds a reference and the client is only closed once the last one is released.
+class ClientRegistry:
+    def __init__(self, client_cls):
+        self._client_cls = client_cls
+        self._clients: dict[str, PooledClient] = {}
+        self._lock = threading.Lock()
+
+    # settings built by hand for an env (e.g. create_app(settings)) don't share a pool with another db section
+    @staticmethod
+    def _key(env: str|Settings, config: dict|None = None) -> tuple:
+        config = config or resolve_settings(env)['db']
+        return (env_name(env), config['URI'], config['DB_NAME'])
+
+    def acquire(self, env: str|Settings):
+        config = resolve_settings(env)['db']
+        key = self._key(env, config)
+        with self._lock:
+            pooled = self._clients.get(key)
+            if pooled is None:
+                client = self._client_cls(config['URI'], **client_options(config))
+                pooled = self._clients[key] = PooledClient(client, config['DB_NAME'])
+            pooled.refs += 1
+            return pooled.client[pooled.db_name]
+
+    # returns the client once its last reference is released so the caller can close it
+    def release(self, env: str|Settings):
+        key = self._key(env)
+        with self._lock:
+            pooled = self._clients.get(key)
+            if pooled is None:
+                return None
+            pooled.refs -= 1
+            if pooled.refs > 0:
+                return None
+            del self._clients[key]
+            return pooled.client
+
+    def refs(self, env: str|Settings) -> int:
+        pooled = self._clients.get(self._key(env))
+        return pooled.refs if pooled else 0
+
+clients = ClientRegistry(MongoClient)
+async_clients = ClientRegistry(AsyncMongoClient)
 
 class DB: #pragma: no cover
-    def __init__(self, env: str):
-        config = Env(env)['db']
-        client = MongoClient(config['URI'])
-        self._db = client[config['DB_NAME']]
-        
+    def __init__(self, env: str|Settings):
+        self._env = env
+        self._db = clients.acquire(env)
+        self._released = False
+
+    def get_db(self):
+        return self._db
+
+    def close(self):
+        if self._released:
+            return
+        self._released = True
+        client = clients.release(self._env)
+        if client is not None:
+            client.close()
+
+class AsyncDB: #pragma: no cover
+    def __init__(self, env: str|Settings):
+        self._env = env
+        self._db = async_clients.acquire(env)
+        self._released = False
 
     def get_db(self):
         return self._db
 
+    async def close(self):
+        if self._released:
+            return
+        self._released = True
+        client = async_clients.release(self._env)
+        if client is not None:
+            await client.close()
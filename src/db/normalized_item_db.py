@@ -0,0 +1,172 @@
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from src.db.mongo import AsyncDB
+from src.helpers.settings import Settings
+from src.db.item_db import _item_fields_update
+from src.helpers.encryption import encrypt
+
+# Normalized layout: one document per linked item in the linked_items collection, keyed by (user_id, item_id),
+# instead of the embedded items array on a per-user document in the items collection.
+#
+# While existing users are being migrated (see src/db/migrate_items.py) the classes can run with legacy_fallback,
+# which copies a user's embedded items over the first time that user is touched and mirrors removals
+# into the embedded document so a concurrent batch copy cannot bring a removed item back.
+# The copy runs in the same order as ItemLayoutMigration.run_batch: idempotent upserts first, then the legacy
+# document is marked migrated, so a failed copy is simply retried by the next request.
+
+# Upserts copying a legacy document's items; $setOnInsert never overwrites an item already written in this layout
+def _legacy_copy_ops(record: dict) -> list[UpdateOne]:
+    ops = []
+    for item in record.get("items") or []:
+        ops.append(UpdateOne(
+            {"user_id": record["user_id"], "item_id": item["item_id"]},
+            {"$setOnInsert": {
+                "access_token": item.get("access_token"),
+                "last_updated": item.get("last_updated"),
+                "item_data": item.get("item_data"),
+                "legacy": True
+            }},
+            upsert=True
+        ))
+    return ops
+
+# Copied items that no longer exist in the legacy document they were copied from
+def _stale_legacy_filter(record: dict) -> dict:
+    item_ids = [item["item_id"] for item in record.get("items") or []]
+    return {"user_id": record["user_id"], "legacy": True, "item_id": {"$nin": item_ids}}
+
+def _normalized_projection(fields: list[str]|None) -> dict:
+    if not fields:
+        return {"_id": 0, "user_id": 0, "legacy": 0}
+    return {"_id": 0, **{field: 1 for field in fields}}
+
+_LEGACY_MIGRATED = {"$set": {"migrated": True}}
+_LEGACY_PROJECTION = {"_id": 0, "user_id": 1, "items": 1}
+_LEGACY_ITEM_IDS_PROJECTION = {"_id": 0, "user_id": 1, "items.item_id": 1}
+
+class AsyncNormalizedItemDB:
+    def __init__(self, env: str|Settings, logger, db_factory = AsyncDB, legacy_fallback: bool = False):
+        self.connection = db_factory(env)
+        db = self.connection.get_db()
+        self.collection = db.linked_items
+        self.legacy = db.items if legacy_fallback else None
+        self.logger = logger
+        self.logger.info("AsyncNormalizedItemDB initialized.")
+
+    async def _ensure_migrated(self, user_id: str) -> None:
+        if self.legacy is None:
+            return
+
+        record = await self.legacy.find_one({"user_id": user_id, "migrated": {"$ne": True}}, _LEGACY_PROJECTION)
+        if record:
+            ops = _legacy_copy_ops(record)
+            if ops:
+                await self.collection.bulk_write(ops, ordered=False)
+            await self.legacy.update_one({"user_id": user_id}, _LEGACY_MIGRATED)
+
+            # re-read the source: an item removed while this copy was running must not come back
+            current = await self.legacy.find_one({"user_id": user_id}, _LEGACY_ITEM_IDS_PROJECTION)
+            if current:
+                await self.collection.delete_many(_stale_legacy_filter(current))
+            self.logger.debug("Migrated legacy items for user_id: %s", user_id, count=len(ops))
+
+    async def insert(self, user_id: str) -> None:
+        if not user_id or not isinstance(user_id, str):
+            raise ValueError("Invalid user_id provided for insertion.")
+
+        self.logger.debug("No container document needed for user_id: %s", user_id)
+
+    async def append_item(self, user_id: str, item_id: str, access_token: str, data: dict|None = None) -> None:
+        if not user_id or not item_id or not access_token or not isinstance(user_id, str) or not isinstance(item_id, str) or not isinstance(access_token, str):
+            raise ValueError("Invalid user_id, item_id, or access_token provided for appending item")
+
+        await self._ensure_migrated(user_id)
+        try:
+            await self.collection.insert_one({
+                "user_id": user_id,
+                "item_id": item_id,
+                "access_token": encrypt(access_token),
+                "last_updated": None,
+                "item_data": data
+            })
+        except DuplicateKeyError:
+            raise ValueError("Item already exists")
+        except Exception as e:
+            self.logger.error("Failed to append item: %s", e)
+            raise
+
+    async def get_items(self, user_id: str, fields: list[str]|None = None) -> list:
+        if not user_id or not isinstance(user_id, str):
+            raise ValueError("Invalid user_id provided for retrieving items")
+        if fields is not None and (not isinstance(fields, list) or not all(isinstance(f, str) and f for f in fields)):
+            raise ValueError("Invalid fields provided for retrieving items")
+
+        await self._ensure_migrated(user_id)
+        self.logger.debug("Retrieving items for user_id: %s", user_id)
+        return await self.collection.find({"user_id": user_id}, _normalized_projection(fields)).to_list()
+
+    async def get_item(self, user_id: str, item_id: str, fields: list[str]|None = None):
+        if not user_id or not isinstance(user_id, str):
+            raise ValueError("Invalid user_id provided for retrieving item")
+        if not item_id or not isinstance(item_id, str):
+            raise ValueError("Invalid item_id provided for retrieving item")
+        if fields is not None and (not isinstance(fields, list) or not all(isinstance(f, str) and f for f in fields)):
+            raise ValueError("Invalid fields provided for retrieving item")
+
+        await self._ensure_migrated(user_id)
+        self.logger.debug(f"Retrieving item {item_id} for user: {user_id}")
+        item = await self.collection.find_one({"user_id": user_id, "item_id": item_id}, _normalized_projection(fields))
+        if item is None:
+            self.logger.warning("Item not found")
+        return item
+
+    async def remove_item(self, user_id: str, item_id: str) -> None:
+        if not user_id or not item_id or not isinstance(user_id, str) or not isinstance(item_id, str):
+            raise ValueError("Invalid user_id or item_id provided for removing item")
+
+        await self._ensure_migrated(user_id)
+        self.logger.debug("Removing item_id: %s from user_id: %s", item_id, user_id)
+        try:
+            if self.legacy is not None:
+                await self.legacy.update_one({"user_id": user_id}, {"$pull": {"items": {"item_id": item_id}}})
+            await self.collection.delete_one({"user_id": user_id, "item_id": item_id})
+        except Exception as e:
+            self.logger.error("Failed to remove item: %s", e)
+            raise
+
+    async def update_item_field(self, user_id: str, item_id: str, field: str, new_value: str|dict) -> None:
+        if not user_id or not item_id or not field or not new_value or not isinstance(user_id, str) or not isinstance(item_id, str) or not isinstance(field, str) or not isinstance(new_value, (str, dict)):
+            self.logger.error("Invalid input provided for updating item field", user_id=user_id, item_id=item_id, field=field, new_value=new_value)
+            raise ValueError("Invalid user_id, item_id, or new_access_token provided for updating access token")
+
+        self.logger.debug("Updating %s for item_id: %s of user_id: %s", field, item_id, user_id)
+        await self.update_item_fields(user_id, item_id, {field: new_value})
+
+    async def update_item_fields(self, user_id: str, item_id: str, fields: dict) -> None:
+        if not user_id or not item_id or not isinstance(user_id, str) or not isinstance(item_id, str) or not isinstance(fields, dict) or not all(isinstance(k, str) and k for k in fields):
+            self.logger.error("Invalid input provided for updating item fields", user_id=user_id, item_id=item_id, fields=fields)
+            raise ValueError("Invalid user_id, item_id, or fields provided for updating item fields")
+
+        if "access_token" in fields and not isinstance(fields["access_token"], str):
+            self.logger.error("New access token must be a string", new_value=fields["access_token"])
+            raise ValueError("New access token must be a string")
+
+        await self._ensure_migrated(user_id)
+        self.logger.debug("Updating fields %s for item_id: %s of user_id: %s", list(fields), item_id, user_id)
+
+        try:
+            result = await self.collection.update_one(
+                {"user_id": user_id, "item_id": item_id},
+                {"$set": _item_fields_update(fields, prefix="")}
+            )
+        except Exception as e:
+            self.logger.error("Failed to update item fields: %s", e)
+            raise
+
+        if result.matched_count == 0:
+            self.logger.warning("Item not found")
+            raise ValueError("Item not found")
+
+    async def close(self):
+        await self.connection.close()
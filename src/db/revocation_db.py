@@ -0,0 +1,127 @@
+from datetime import datetime, UTC
+import heapq
+import time
+
+from pymongo.errors import DuplicateKeyError
+
+from src.db.mongo import AsyncDB
+from src.helpers.settings import Settings
+
+# Revoked sessions, keyed by session id (see SessionManager) with the token's own expiry, plus one
+# "valid after" epoch per user for logging out everywhere. Once a token has expired it is rejected on its
+# exp claim anyway, so a record only has to outlive the tokens it covers.
+
+# Shared across workers and restarts. The TTL indexes (src/db/indexes.py) have mongo drop entries once
+# they expire, the expires_at filters cover the up to a minute the TTL monitor lags behind.
+class RevocationDB:
+    def __init__(self, env: str|Settings, logger, db_factory = AsyncDB):
+        self.connection = db_factory(env)
+        db = self.connection.get_db()
+        self.collection = db.revoked_sessions
+        self.epochs = db.session_epochs
+        self.logger = logger
+        self.logger.debug("RevocationDB initialized.")
+
+    async def revoke(self, key: str, exp: int) -> None:
+        if not key or not isinstance(key, str) or not isinstance(exp, int):
+            raise ValueError("Invalid key or exp provided for revocation")
+
+        try:
+            await self.collection.update_one({"_id": key}, {"$set": {"expires_at": datetime.fromtimestamp(exp, UTC)}}, upsert=True)
+        except Exception as e:
+            self.logger.error("Failed to revoke session: %s", e)
+            raise
+
+    async def is_revoked(self, key: str) -> bool:
+        return await self.collection.find_one({"_id": key, "expires_at": {"$gt": datetime.now(UTC)}}, {"_id": 1}) is not None
+
+    # revoke only if not already revoked, True for the one caller that did (single use tokens)
+    async def claim(self, key: str, exp: int) -> bool:
+        if not key or not isinstance(key, str) or not isinstance(exp, int):
+            raise ValueError("Invalid key or exp provided for revocation")
+
+        try:
+            await self.collection.insert_one({"_id": key, "expires_at": datetime.fromtimestamp(exp, UTC)})
+            return True
+        except DuplicateKeyError:
+            return False
+        except Exception as e:
+            self.logger.error("Failed to claim session: %s", e)
+            raise
+
+    # $max keeps the latest epoch if two logouts race
+    async def set_valid_after(self, user_id: str, epoch: int, exp: int) -> None:
+        if not user_id or not isinstance(user_id, str) or not isinstance(epoch, int) or not isinstance(exp, int):
+            raise ValueError("Invalid user_id, epoch or exp provided for revocation")
+
+        try:
+            await self.epochs.update_one({"_id": user_id}, {"$max": {"valid_after": epoch, "expires_at": datetime.fromtimestamp(exp, UTC)}}, upsert=True)
+        except Exception as e:
+            self.logger.error("Failed to revoke user sessions: %s", e)
+            raise
+
+    async def get_valid_after(self, user_id: str) -> int|None:
+        record = await self.epochs.find_one({"_id": user_id, "expires_at": {"$gt": datetime.now(UTC)}}, {"_id": 0, "valid_after": 1})
+        return record["valid_after"] if record else None
+
+    # expiry is handled by the TTL index
+    async def cleanup(self) -> int:
+        return 0
+
+    async def close(self):
+        await self.connection.close()
+
+# Local stand-in for tests and single process runs, revocations live only as long as the process.
+# A heap ordered by exp sits next to the lookup dict, so cleanup only touches the entries that expired.
+class MemoryRevocationDB:
+    def __init__(self, logger = None, clock = time.time):
+        self.revoked: dict[str, int] = {} # key -> exp
+        self.valid_after: dict[str, tuple[int, int]] = {} # user_id -> (epoch, exp)
+        self._expiries: list[tuple[int, bool, str]] = [] # (exp, is user epoch, key) min-heap, may hold stale entries for re-revoked keys
+        self._clock = clock
+        self.logger = logger
+
+    async def revoke(self, key: str, exp: int) -> None:
+        if not key or not isinstance(key, str) or not isinstance(exp, int):
+            raise ValueError("Invalid key or exp provided for revocation")
+        self.revoked[key] = exp
+        heapq.heappush(self._expiries, (exp, False, key))
+
+    async def is_revoked(self, key: str) -> bool:
+        exp = self.revoked.get(key)
+        return exp is not None and exp >= self._clock()
+
+    async def claim(self, key: str, exp: int) -> bool:
+        if await self.is_revoked(key):
+            return False
+        await self.revoke(key, exp)
+        return True
+
+    async def set_valid_after(self, user_id: str, epoch: int, exp: int) -> None:
+        if not user_id or not isinstance(user_id, str) or not isinstance(epoch, int) or not isinstance(exp, int):
+            raise ValueError("Invalid user_id, epoch or exp provided for revocation")
+        current = self.valid_after.get(user_id, (epoch, exp))
+        self.valid_after[user_id] = (max(epoch, current[0]), max(exp, current[1]))
+        heapq.heappush(self._expiries, (self.valid_after[user_id][1], True, user_id))
+
+    async def get_valid_after(self, user_id: str) -> int|None:
+        epoch, exp = self.valid_after.get(user_id, (None, 0))
+        return epoch if exp >= self._clock() else None
+
+    async def cleanup(self) -> int:
+        now = self._clock()
+        removed = 0
+        while self._expiries and self._expiries[0][0] < now:
+            exp, is_epoch, key = heapq.heappop(self._expiries)
+            if is_epoch and self.valid_after.get(key, (None, None))[1] == exp:
+                del self.valid_after[key]
+                removed += 1
+            elif not is_epoch and self.revoked.get(key) == exp:
+                del self.revoked[key]
+                removed += 1
+        return removed
+
+    async def close(self):
+        self.revoked.clear()
+        self.valid_after.clear()
+        self._expiries.clear()
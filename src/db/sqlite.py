@@ -0,0 +1,383 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, UTC
+import asyncio
+import json
+import sqlite3
+import time
+
+from src.helpers.settings import Settings, resolve_settings
+from src.helpers.encryption import encrypt
+
+# Embedded storage backend for single node deployments, selected with "BACKEND": "sqlite" in the db env config.
+# Every statement is a constant parameterized string so sqlite3's per-connection statement cache keeps them prepared.
+# Queries run on one dedicated thread per connection so the event loop never blocks on disk I/O.
+
+SCHEMA = {
+    "accounts": """CREATE TABLE IF NOT EXISTS accounts (
+        user_id TEXT PRIMARY KEY,
+        user TEXT NOT NULL,
+        email TEXT,
+        password TEXT NOT NULL,
+        extra TEXT NOT NULL DEFAULT '{}'
+    )""",
+    "accounts_user_unique": "CREATE UNIQUE INDEX IF NOT EXISTS accounts_user_unique ON accounts (user)",
+    "accounts_email_unique": "CREATE UNIQUE INDEX IF NOT EXISTS accounts_email_unique ON accounts (email)",
+    "item_owners": """CREATE TABLE IF NOT EXISTS item_owners (
+        user_id TEXT PRIMARY KEY
+    )""",
+    "items": """CREATE TABLE IF NOT EXISTS items (
+        user_id TEXT NOT NULL REFERENCES item_owners (user_id),
+        item_id TEXT NOT NULL,
+        access_token TEXT NOT NULL,
+        last_updated TEXT,
+        item_data TEXT,
+        PRIMARY KEY (user_id, item_id)
+    )""",
+    "revoked_sessions": """CREATE TABLE IF NOT EXISTS revoked_sessions (
+        key TEXT PRIMARY KEY,
+        expires_at INTEGER NOT NULL
+    )""",
+    "revoked_sessions_expiry": "CREATE INDEX IF NOT EXISTS revoked_sessions_expiry ON revoked_sessions (expires_at)",
+    "session_epochs": """CREATE TABLE IF NOT EXISTS session_epochs (
+        user_id TEXT PRIMARY KEY,
+        valid_after INTEGER NOT NULL,
+        expires_at INTEGER NOT NULL
+    )""",
+}
+
+ACCOUNT_COLUMNS = ("user_id", "user", "email", "password")
+ITEM_COLUMNS = ("item_id", "access_token", "last_updated", "item_data")
+
+INSERT_ACCOUNT = "INSERT INTO accounts (user_id, user, email, password, extra) VALUES (?, ?, ?, ?, ?)"
+FIND_ACCOUNT = {field: f"SELECT user_id, user, email, password, extra FROM accounts WHERE {field} = ?" for field in ("user_id", "user", "email")}
+INSERT_OWNER = "INSERT INTO item_owners (user_id) VALUES (?)"
+# only inserts when the owner exists, a duplicate (user_id, item_id) raises IntegrityError
+APPEND_ITEM = """INSERT INTO items (user_id, item_id, access_token, last_updated, item_data)
+    SELECT ?, ?, ?, NULL, ? WHERE EXISTS (SELECT 1 FROM item_owners WHERE user_id = ?)"""
+GET_ITEMS = "SELECT item_id, access_token, last_updated, item_data FROM items WHERE user_id = ? ORDER BY rowid"
+GET_ITEM = "SELECT item_id, access_token, last_updated, item_data FROM items WHERE user_id = ? AND item_id = ?"
+OWNER_EXISTS = "SELECT 1 FROM item_owners WHERE user_id = ?"
+REMOVE_ITEM = "DELETE FROM items WHERE user_id = ? AND item_id = ?"
+UPDATE_ITEM = """UPDATE items SET
+    access_token = COALESCE(?, access_token),
+    item_data = CASE WHEN ? THEN ? ELSE item_data END,
+    last_updated = ?
+    WHERE user_id = ? AND item_id = ?"""
+SET_ITEM_DATA_PATH = "UPDATE items SET item_data = json_set(COALESCE(item_data, '{}'), ?, json(?)) WHERE user_id = ? AND item_id = ?"
+# re-revoking a key moves its expiry, claiming only takes a key nobody holds (or whose revocation ran out)
+REVOKE_SESSION = """INSERT INTO revoked_sessions (key, expires_at) VALUES (?, ?)
+    ON CONFLICT (key) DO UPDATE SET expires_at = excluded.expires_at"""
+CLAIM_SESSION = """INSERT INTO revoked_sessions (key, expires_at) VALUES (?, ?)
+    ON CONFLICT (key) DO UPDATE SET expires_at = excluded.expires_at WHERE revoked_sessions.expires_at < ?"""
+IS_REVOKED = "SELECT 1 FROM revoked_sessions WHERE key = ? AND expires_at >= ?"
+# max() keeps the latest epoch if two logouts race
+SET_VALID_AFTER = """INSERT INTO session_epochs (user_id, valid_after, expires_at) VALUES (?, ?, ?)
+    ON CONFLICT (user_id) DO UPDATE SET valid_after = max(valid_after, excluded.valid_after), expires_at = max(expires_at, excluded.expires_at)"""
+GET_VALID_AFTER = "SELECT valid_after FROM session_epochs WHERE user_id = ? AND expires_at >= ?"
+CLEANUP_REVOKED = "DELETE FROM revoked_sessions WHERE expires_at < ?"
+CLEANUP_EPOCHS = "DELETE FROM session_epochs WHERE expires_at < ?"
+
+def ensure_schema(conn: sqlite3.Connection) -> list[str]:
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'index')")}
+    for statement in SCHEMA.values():
+        conn.execute(statement)
+    return [name for name in SCHEMA if name not in existing]
+
+class SQLiteDB:
+    def __init__(self, env: str|Settings, path: str|None = None):
+        self.path = path or resolve_settings(env)['db'].get("SQLITE_PATH", "budget.db")
+        self.conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, cached_statements=128)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.execute("PRAGMA busy_timeout=5000")
+        self.built = ensure_schema(self.conn)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+
+    async def run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def close(self):
+        await self.run(self.conn.close)
+        self._executor.shutdown()
+
+def _account_from_row(row: sqlite3.Row) -> dict:
+    account = json.loads(row["extra"])
+    account.update({column: row[column] for column in ACCOUNT_COLUMNS})
+    return account
+
+def _item_from_row(row: sqlite3.Row) -> dict:
+    item = {column: row[column] for column in ITEM_COLUMNS}
+    item["item_data"] = json.loads(item["item_data"]) if item["item_data"] is not None else None
+    return item
+
+# same shape as a mongo projection of item sub-fields, "item_data.name" keeps only that key of item_data
+def _project_item(item: dict, fields: list[str]) -> dict:
+    projected = {}
+    for field in fields:
+        top, _, sub = field.partition(".")
+        if top not in item:
+            continue
+        if not sub:
+            projected[top] = item[top]
+        elif isinstance(item[top], dict) and sub in item[top]:
+            projected.setdefault(top, {})[sub] = item[top][sub]
+    return projected
+
+class SQLiteAccountDB:
+    def __init__(self, env: str|Settings, logger, db_factory = SQLiteDB):
+        self.connection = db_factory(env)
+        self.logger = logger
+        self.logger.debug("SQLiteAccountDB initialized.")
+
+    async def insert(self, account_data: dict):
+        if account_data is None or not isinstance(account_data, dict):
+            raise ValueError("Invalid account data provided for insertion.")
+
+        extra = {k: v for k, v in account_data.items() if k not in ACCOUNT_COLUMNS}
+        params = (account_data.get("user_id"), account_data.get("user"), account_data.get("email"), account_data.get("password"), json.dumps(extra))
+
+        self.logger.debug("Inserting new account...")
+        await self.connection.run(self.connection.conn.execute, INSERT_ACCOUNT, params)
+        self.logger.debug("Insertion complete.")
+
+    async def _find(self, field: str, val: str):
+        if field not in FIND_ACCOUNT:
+            raise ValueError("Invalid field or value provided for search.")
+        return await self.connection.run(lambda: self.connection.conn.execute(FIND_ACCOUNT[field], (val,)).fetchone())
+
+    async def find_by_field(self, field: str, val: str):
+        if not field or not val or not isinstance(field, str) or not isinstance(val, str):
+            raise ValueError("Invalid field or value provided for search.")
+
+        row = await self._find(field, val)
+        if not row:
+            return None
+        entry = _account_from_row(row)
+        del entry['password']
+        return entry
+
+    async def validate_credentials(self, username: str, password: str) -> dict | None:
+        if not username or not password or not isinstance(username, str) or not isinstance(password, str):
+            raise ValueError("Invalid username or password provided for validation.")
+
+        row = await self._find("user", username)
+        if row and row['password'] == password:
+            account = _account_from_row(row)
+            del account['password']
+            return account
+        return None
+
+    async def close(self):
+        await self.connection.close()
+
+class SQLiteItemDB:
+    def __init__(self, env: str|Settings, logger, db_factory = SQLiteDB):
+        self.connection = db_factory(env)
+        self.logger = logger
+        self.logger.info("SQLiteItemDB initialized.")
+
+    async def _execute(self, sql: str, params: tuple) -> sqlite3.Cursor:
+        return await self.connection.run(self.connection.conn.execute, sql, params)
+
+    async def _fetch(self, sql: str, params: tuple, one: bool = False):
+        cursor = await self._execute(sql, params)
+        return await self.connection.run(cursor.fetchone if one else cursor.fetchall)
+
+    async def insert(self, user_id: str) -> None:
+        if not user_id or not isinstance(user_id, str):
+            raise ValueError("Invalid user_id provided for insertion.")
+
+        self.logger.debug("Inserting new item...")
+        try:
+            await self._execute(INSERT_OWNER, (user_id,))
+        except Exception as e:
+            self.logger.error("Failed to insert new item: %s", e)
+            raise
+
+    async def append_item(self, user_id: str, item_id: str, access_token: str, data: dict|None = None) -> None:
+        if not user_id or not item_id or not access_token or not isinstance(user_id, str) or not isinstance(item_id, str) or not isinstance(access_token, str):
+            raise ValueError("Invalid user_id, item_id, or access_token provided for appending item")
+
+        item_data = json.dumps(data) if data is not None else None
+        try:
+            cursor = await self._execute(APPEND_ITEM, (user_id, item_id, encrypt(access_token), item_data, user_id))
+        except sqlite3.IntegrityError:
+            raise ValueError("Item already exists")
+        except Exception as e:
+            self.logger.error("Failed to append item: %s", e)
+            raise
+
+        if cursor.rowcount == 0:
+            raise ValueError("User_id not found")
+
+    async def get_items(self, user_id: str, fields: list[str]|None = None) -> list:
+        if not user_id or not isinstance(user_id, str):
+            raise ValueError("Invalid user_id provided for retrieving items")
+        if fields is not None and (not isinstance(fields, list) or not all(isinstance(f, str) and f for f in fields)):
+            raise ValueError("Invalid fields provided for retrieving items")
+
+        self.logger.debug("Retrieving items for user_id: %s", user_id)
+        rows = await self._fetch(GET_ITEMS, (user_id,))
+        if not rows and not await self._fetch(OWNER_EXISTS, (user_id,), one=True):
+            self.logger.warning("No user found")
+            return []
+
+        items = [_item_from_row(row) for row in rows]
+        return [_project_item(item, fields) for item in items] if fields else items
+
+    async def get_item(self, user_id: str, item_id: str, fields: list[str]|None = None):
+        if not user_id or not isinstance(user_id, str):
+            raise ValueError("Invalid user_id provided for retrieving item")
+        if not item_id or not isinstance(item_id, str):
+            raise ValueError("Invalid item_id provided for retrieving item")
+        if fields is not None and (not isinstance(fields, list) or not all(isinstance(f, str) and f for f in fields)):
+            raise ValueError("Invalid fields provided for retrieving item")
+
+        self.logger.debug(f"Retrieving item {item_id} for user: {user_id}")
+        row = await self._fetch(GET_ITEM, (user_id, item_id), one=True)
+        if row is None:
+            self.logger.warning("Item not found")
+            return None
+        item = _item_from_row(row)
+        return _project_item(item, fields) if fields else item
+
+    async def remove_item(self, user_id: str, item_id: str) -> None:
+        if not user_id or not item_id or not isinstance(user_id, str) or not isinstance(item_id, str):
+            raise ValueError("Invalid user_id or item_id provided for removing item")
+
+        self.logger.debug("Removing item_id: %s from user_id: %s", item_id, user_id)
+        try:
+            await self._execute(REMOVE_ITEM, (user_id, item_id))
+        except Exception as e:
+            self.logger.error("Failed to remove item: %s", e)
+            raise
+
+    async def update_item_field(self, user_id: str, item_id: str, field: str, new_value: str|dict) -> None:
+        if not user_id or not item_id or not field or not new_value or not isinstance(user_id, str) or not isinstance(item_id, str) or not isinstance(field, str) or not isinstance(new_value, (str, dict)):
+            self.logger.error("Invalid input provided for updating item field", user_id=user_id, item_id=item_id, field=field, new_value=new_value)
+            raise ValueError("Invalid user_id, item_id, or new_access_token provided for updating access token")
+
+        self.logger.debug("Updating %s for item_id: %s of user_id: %s", field, item_id, user_id)
+        await self.update_item_fields(user_id, item_id, {field: new_value})
+
+    def _update_item(self, user_id: str, item_id: str, fields: dict) -> int:
+        access_token = encrypt(fields["access_token"]) if "access_token" in fields else None
+        item_data = fields.get("item_data")
+        paths = [(f"$.{field.partition('.')[2]}", json.dumps(value)) for field, value in fields.items() if field.startswith("item_data.")]
+
+        # one transaction, so the item and last_updated change together
+        with self.connection.conn:
+            self.connection.conn.execute("BEGIN")
+            cursor = self.connection.conn.execute(UPDATE_ITEM, (access_token, "item_data" in fields, json.dumps(item_data) if item_data is not None else None,
+                                                                datetime.now(UTC).isoformat(), user_id, item_id))
+            for path, value in paths:
+                self.connection.conn.execute(SET_ITEM_DATA_PATH, (path, value, user_id, item_id))
+        return cursor.rowcount
+
+    async def update_item_fields(self, user_id: str, item_id: str, fields: dict) -> None:
+        if not user_id or not item_id or not isinstance(user_id, str) or not isinstance(item_id, str) or not isinstance(fields, dict) or not all(isinstance(k, str) and k for k in fields):
+            self.logger.error("Invalid input provided for updating item fields", user_id=user_id, item_id=item_id, fields=fields)
+            raise ValueError("Invalid user_id, item_id, or fields provided for updating item fields")
+
+        if "access_token" in fields and not isinstance(fields["access_token"], str):
+            self.logger.error("New access token must be a string", new_value=fields["access_token"])
+            raise ValueError("New access token must be a string")
+
+        unsupported = [field for field in fields if field not in ("access_token", "item_data") and not field.startswith("item_data.")]
+        if unsupported:
+            self.logger.error("Unsupported item fields for sqlite backend", fields=unsupported)
+            raise ValueError("Invalid user_id, item_id, or fields provided for updating item fields")
+
+        self.logger.debug("Updating fields %s for item_id: %s of user_id: %s", list(fields), item_id, user_id)
+
+        try:
+            matched = await self.connection.run(self._update_item, user_id, item_id, fields)
+        except Exception as e:
+            self.logger.error("Failed to update item fields: %s", e)
+            raise
+
+        if matched == 0:
+            self.logger.warning("Item not found")
+            raise ValueError("Item not found")
+
+    async def close(self):
+        await self.connection.close()
+
+# Same contract as RevocationDB (src/db/revocation_db.py), kept in the sqlite file so revocations are shared by
+# every worker on the node and survive restarts. Expired rows are filtered on read and deleted by cleanup().
+class SQLiteRevocationDB:
+    def __init__(self, env: str|Settings, logger, db_factory = SQLiteDB, clock = time.time):
+        self.connection = db_factory(env)
+        self.logger = logger
+        self._clock = clock
+        self.logger.debug("SQLiteRevocationDB initialized.")
+
+    async def _execute(self, sql: str, params: tuple) -> sqlite3.Cursor:
+        return await self.connection.run(self.connection.conn.execute, sql, params)
+
+    async def revoke(self, key: str, exp: int) -> None:
+        if not key or not isinstance(key, str) or not isinstance(exp, int):
+            raise ValueError("Invalid key or exp provided for revocation")
+
+        try:
+            await self._execute(REVOKE_SESSION, (key, exp))
+        except Exception as e:
+            self.logger.error("Failed to revoke session: %s", e)
+            raise
+
+    async def is_revoked(self, key: str) -> bool:
+        cursor = await self._execute(IS_REVOKED, (key, self._clock()))
+        return await self.connection.run(cursor.fetchone) is not None
+
+    # revoke only if not already revoked, True for the one caller that did (single use tokens)
+    async def claim(self, key: str, exp: int) -> bool:
+        if not key or not isinstance(key, str) or not isinstance(exp, int):
+            raise ValueError("Invalid key or exp provided for revocation")
+
+        try:
+            cursor = await self._execute(CLAIM_SESSION, (key, exp, self._clock()))
+        except Exception as e:
+            self.logger.error("Failed to claim session: %s", e)
+            raise
+        return cursor.rowcount == 1
+
+    async def set_valid_after(self, user_id: str, epoch: int, exp: int) -> None:
+        if not user_id or not isinstance(user_id, str) or not isinstance(epoch, int) or not isinstance(exp, int):
+            raise ValueError("Invalid user_id, epoch or exp provided for revocation")
+
+        try:
+            await self._execute(SET_VALID_AFTER, (user_id, epoch, exp))
+        except Exception as e:
+            self.logger.error("Failed to revoke user sessions: %s", e)
+            raise
+
+    async def get_valid_after(self, user_id: str) -> int|None:
+        cursor = await self._execute(GET_VALID_AFTER, (user_id, self._clock()))
+        row = await self.connection.run(cursor.fetchone)
+        return row["valid_after"] if row else None
+
+    async def cleanup(self) -> int:
+        now = self._clock()
+        revoked = await self._execute(CLEANUP_REVOKED, (now,))
+        epochs = await self._execute(CLEANUP_EPOCHS, (now,))
+        return revoked.rowcount + epochs.rowcount
+
+    async def close(self):
+        await self.connection.close()
+
+# Schema is created whenever a connection opens, this reports what opening it had to build
+class SQLiteIndexManager:
+    def __init__(self, env: str|Settings, logger, db_factory = SQLiteDB):
+        self.connection = db_factory(env)
+        self.logger = logger
+        self.logger.debug("SQLiteIndexManager initialized.")
+
+    async def ensure_indexes(self) -> dict[str, list[str]]:
+        built = self.connection.built + await self.connection.run(ensure_schema, self.connection.conn)
+        self.logger.info("Schema ensured for sqlite", built=built)
+        return {"sqlite": built}
+
+    async def close(self):
+        await self.connection.close()
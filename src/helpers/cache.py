@@ -0,0 +1,71 @@
+from collections import OrderedDict
+import time
+
+_MISSING = object()
+
+# Bounded LRU cache where every entry also expires after a TTL. Not thread safe, meant to be used
+# from the event loop. Hit/miss/eviction counters are kept for stats().
+class LRUCache:
+    def __init__(self, max_size: int, ttl_seconds: float, clock = time.monotonic):
+        if not isinstance(max_size, int) or max_size < 1:
+            raise ValueError("Invalid max_size provided for cache")
+        if not isinstance(ttl_seconds, (int, float)) or ttl_seconds <= 0:
+            raise ValueError("Invalid ttl_seconds provided for cache")
+
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: OrderedDict = OrderedDict() # key -> (expires_at, value), least recently used first
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default = None):
+        entry = self._entries.get(key, _MISSING)
+        if entry is _MISSING:
+            self.misses += 1
+            return default
+
+        expires_at, value = entry
+        if expires_at <= self._clock():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return default
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    # ttl_seconds overrides the default TTL for this entry
+    def set(self, key, value, ttl_seconds: float|None = None) -> None:
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        self._entries[key] = (self._clock() + ttl, value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key) -> bool:
+        return self._entries.pop(key, _MISSING) is not _MISSING
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
@@ -0,0 +1,100 @@
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+import zlib
+
+# True when the Accept-Encoding header allows gzip (explicitly or through *) with a non-zero q value
+def accepts_gzip(accept_encoding: str) -> bool:
+    if "gzip" not in accept_encoding and "*" not in accept_encoding:
+        return False
+    allowed = {}
+    for part in accept_encoding.split(','):
+        coding, _, params = part.strip().partition(';')
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        allowed[coding.strip().lower()] = q > 0
+    return allowed.get("gzip", allowed.get("*", False))
+
+# Plain ASGI gzip middleware. Only responses to requests accepting gzip are looked at, and of those a
+# response whose Content-Length is below minimum_size is passed on untouched right away. Otherwise the
+# start message is held until the first body chunk: a complete body under minimum_size goes out as is,
+# anything else is compressed chunk by chunk (sync-flushed so streamed responses keep streaming).
+class GZipMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, level: int = 6,
+                 exclude_media_types: tuple = ("text/event-stream", "application/gzip")):
+        if not isinstance(minimum_size, int) or minimum_size < 0:
+            raise ValueError("Invalid minimum_size provided for gzip")
+        if not isinstance(level, int) or not 1 <= level <= 9:
+            raise ValueError("Invalid level provided for gzip")
+        self.app = app
+        self.minimum_size = minimum_size
+        self.level = level
+        self.exclude_media_types = exclude_media_types
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not accepts_gzip(Headers(scope=scope).get("accept-encoding", "")):
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor = None
+        passthrough = False
+
+        async def send_compressed(message: Message):
+            nonlocal start_message, compressor, passthrough
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                content_length = headers.get("content-length")
+                if ("content-encoding" in headers
+                        or headers.get("content-type", "").startswith(self.exclude_media_types)
+                        or (content_length is not None and int(content_length) < self.minimum_size)):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start_message = message
+                return
+
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if compressor is None:
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+
+                compressor = zlib.compressobj(self.level, zlib.DEFLATED, 31) # wbits 31 -> gzip container
+                headers = MutableHeaders(scope=start_message)
+                headers["Content-Encoding"] = "gzip"
+                headers.add_vary_header("Accept-Encoding")
+                if more_body:
+                    del headers["Content-Length"]
+                else:
+                    body = compressor.compress(body) + compressor.flush()
+                    headers["Content-Length"] = str(len(body))
+                    await send(start_message)
+                    await send({"type": "http.response.body", "body": body, "more_body": False})
+                    return
+                await send(start_message)
+
+            if more_body:
+                body = compressor.compress(body) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            else:
+                body = compressor.compress(body) + compressor.flush()
+            await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
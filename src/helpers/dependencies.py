@@ -1,5 +1,6 @@
-from fastapi import Request, HTTPException, status
-from src.helpers.request_context_middleware import request_ctx
+from fastapi import Depends, Request, HTTPException, status
+from src.helpers.request_context_middleware import authenticate
+from src.helpers.load_shedding import retry_after_header
 
 def get_session_manager(request: Request):
     return request.app.state.sessionManager
@@ -16,9 +17,21 @@ def get_logger(request: Request):
 def get_plaid_client(request: Request):
     return request.app.state.plaid
 
-def require_user():
-    ctx = request_ctx.get()
-    if not ctx or not ctx.user_id:
+# the user of a request that may or may not carry a token, None without an Authorization header
+async def optional_user(request: Request):
+    return await authenticate(request)
+
+async def require_user(request: Request):
+    user_id = await authenticate(request)
+    if not user_id:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, 
                             detail={"error": "Protected route requires valid authentication"})
-    return ctx.user_id
\ No newline at end of file
+    return user_id
+
+# require_user plus the per-user token bucket in app.state.rateLimiter
+async def rate_limited_user(request: Request, user_id = Depends(require_user)):
+    retry_after = request.app.state.rateLimiter.take(user_id)
+    if retry_after:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                            detail={"error": "Too many requests"}, headers=retry_after_header(retry_after))
+    return user_id
\ No newline at end of file
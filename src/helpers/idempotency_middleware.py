@@ -0,0 +1,180 @@
+from starlette.datastructures import Headers
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from fastapi.responses import JSONResponse
+
+from src.helpers.request_context_middleware import AuthError, authenticate
+from src.helpers.load_shedding import retry_after_header
+
+import asyncio
+import hashlib
+
+IDEMPOTENCY_TTL_SECONDS = 24 * 60 * 60
+PENDING_TTL_SECONDS = 60 # lease on a claimed key, another worker can take it over if the one running the request dies
+WAIT_SECONDS = 10
+MAX_KEY_LENGTH = 255
+REPLAYED_HEADER = "idempotent-replayed"
+
+# Plain ASGI middleware giving the listed (method, path) routes Idempotency-Key semantics. The first
+# request with a key claims it in app.state.idempotencyDB with a pending record and runs normally. If it
+# succeeded (2xx) its response finishes the record, retries with the same key get the stored response back
+# without the route running again. Otherwise the claim is released and a retry runs the route.
+# A duplicate on another worker polls the store until the response is there, or gets a 409 after
+# wait_seconds. Duplicates in this process wait on the first one without polling.
+#
+# Keys are scoped to the authenticated user and route, and a retry must carry the same body as the
+# original (422 otherwise). Requests without a key, or without a valid user, pass straight through
+# and the route answers them as usual. Must run inside RequestContextMiddleware (it needs request_ctx).
+# With rate_limited, answers that don't reach the route take their token from app.state.rateLimiter
+# like rate_limited_user does for the route.
+class IdempotencyMiddleware:
+    def __init__(self, app: ASGIApp, routes: set[tuple[str, str]], ttl_seconds: int = IDEMPOTENCY_TTL_SECONDS,
+                 pending_ttl_seconds: int = PENDING_TTL_SECONDS, wait_seconds: float = WAIT_SECONDS,
+                 poll_interval: float = 0.05, rate_limited: bool = False):
+        self.app = app
+        self.routes = routes
+        self.ttl_seconds = ttl_seconds
+        self.pending_ttl_seconds = pending_ttl_seconds
+        self.wait_seconds = wait_seconds
+        self.poll_interval = poll_interval
+        self.rate_limited = rate_limited
+        self._in_flight: dict[str, asyncio.Future] = {} # scoped key -> record once the first request finishes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or (scope["method"], scope["path"]) not in self.routes:
+            await self.app(scope, receive, send)
+            return
+
+        key = Headers(scope=scope).get("idempotency-key")
+        if key is None:
+            await self.app(scope, receive, send)
+            return
+        if not key or len(key) > MAX_KEY_LENGTH:
+            await JSONResponse(status_code=400, content={"error": "Invalid Idempotency-Key header"})(scope, receive, send)
+            return
+
+        body, receive = await _buffer_body(receive)
+        try:
+            user_id = await authenticate(Request(scope, receive))
+        except AuthError:
+            user_id = None
+        if not user_id:
+            await self.app(scope, receive, send)
+            return
+
+        scoped_key = hashlib.sha256(f"{user_id}\0{scope['method']}\0{scope['path']}\0{key}".encode()).hexdigest()
+        fingerprint = hashlib.sha256(body).hexdigest()
+        store = scope["app"].state.idempotencyDB
+
+        while True:
+            pending = self._in_flight.get(scoped_key)
+            if pending is not None:
+                record = await asyncio.shield(pending)
+                if record is None:
+                    continue # the first request failed without a storable response, run this one
+                await self._answer(record, fingerprint, user_id, scope, receive, send)
+                return
+
+            pending = self._in_flight[scoped_key] = asyncio.get_running_loop().create_future()
+            record = None
+            try:
+                claimed, record = await store.claim(scoped_key, fingerprint, self.pending_ttl_seconds)
+                if not claimed:
+                    if record is not None and record.get("pending") and record["fingerprint"] == fingerprint:
+                        record = await self._wait(store, scoped_key)
+                    if record is None:
+                        continue # the holder released the key, claim it again
+                    await self._answer(record, fingerprint, user_id, scope, receive, send)
+                    return
+                try:
+                    record = await self._run(scope, receive, send, fingerprint)
+                finally:
+                    await self._finish(store, scoped_key, record)
+                return
+            finally:
+                del self._in_flight[scoped_key]
+                pending.set_result(record)
+
+    # polls the store while another worker runs the request: its finished record, None once the claim is gone
+    # (released or expired) or the still pending record when wait_seconds ran out
+    async def _wait(self, store, scoped_key: str) -> dict|None:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.wait_seconds
+        delay = self.poll_interval
+        while True:
+            await asyncio.sleep(max(0, min(delay, deadline - loop.time())))
+            record = await store.get(scoped_key)
+            if record is None or not record.get("pending") or loop.time() >= deadline:
+                return record
+            delay = min(delay * 2, 1.0)
+
+    # stores a successful response, anything else releases the claim so a retry runs the route again
+    async def _finish(self, store, scoped_key: str, record: dict|None):
+        try:
+            if record is not None:
+                await store.put(scoped_key, record, self.ttl_seconds)
+                return
+        except Exception:
+            pass # the response already went out, a retry will just run the route again
+        try:
+            await store.release(scoped_key)
+        except Exception:
+            pass # the claim's lease runs out on its own
+
+    # runs the route, passing its response through while keeping a copy of it
+    async def _run(self, scope: Scope, receive: Receive, send: Send, fingerprint: str) -> dict|None:
+        response = {"fingerprint": fingerprint, "status_code": 500, "headers": [], "body": b""}
+        chunks = []
+
+        async def send_and_capture(message: Message):
+            if message["type"] == "http.response.start":
+                response["status_code"] = message["status"]
+                response["headers"] = [[k.decode("latin-1"), v.decode("latin-1")] for k, v in message.get("headers", [])
+                                       if k.lower() == b"content-type"]
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        await self.app(scope, receive, send_and_capture)
+        if not 200 <= response["status_code"] < 300:
+            return None # errors aren't replayed, a retry runs the route again
+        response["body"] = b"".join(chunks)
+        return response
+
+    # answers from the record without running the route
+    async def _answer(self, record: dict, fingerprint: str, user_id: str, scope: Scope, receive: Receive, send: Send):
+        retry_after = scope["app"].state.rateLimiter.take(user_id) if self.rate_limited else 0
+        if retry_after:
+            response = JSONResponse(status_code=429, content={"detail": {"error": "Too many requests"}}, headers=retry_after_header(retry_after))
+        elif record["fingerprint"] != fingerprint:
+            response = JSONResponse(status_code=422, content={"error": "Idempotency-Key was already used with a different request"})
+        elif record.get("pending"):
+            response = JSONResponse(status_code=409, content={"error": "A request with this Idempotency-Key is still in progress"},
+                                    headers=retry_after_header(1))
+        else:
+            response = Response(content=bytes(record["body"]), status_code=record["status_code"],
+                                headers={**dict(record["headers"]), REPLAYED_HEADER: "true"})
+        await response(scope, receive, send)
+
+# reads the whole request body and returns it with a receive callable that hands it to the app again
+async def _buffer_body(receive: Receive) -> tuple[bytes, Receive]:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    body = b"".join(chunks)
+    replayed = False
+
+    async def replay_receive() -> Message:
+        nonlocal replayed
+        if not replayed:
+            replayed = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return await receive()
+
+    return body, replay_receive
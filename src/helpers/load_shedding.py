@@ -0,0 +1,117 @@
+from starlette.types import ASGIApp, Receive, Scope, Send
+from fastapi.responses import JSONResponse
+
+from src.helpers.cache import LRUCache
+
+import asyncio
+import math
+import time
+
+# Caps how many requests of a route group run at once. Requests over the cap wait in a bounded queue for
+# at most queue_timeout seconds, acquire() returns False (and the caller sheds the request) when the queue
+# is full or the wait runs out, so a slow upstream can't pile up unbounded work behind it.
+class ConcurrencyLimiter:
+    def __init__(self, max_concurrent: int, max_queue: int, queue_timeout: float):
+        if not isinstance(max_concurrent, int) or max_concurrent < 1:
+            raise ValueError("Invalid max_concurrent provided for limiter")
+        if not isinstance(max_queue, int) or max_queue < 0:
+            raise ValueError("Invalid max_queue provided for limiter")
+        if not isinstance(queue_timeout, (int, float)) or queue_timeout < 0:
+            raise ValueError("Invalid queue_timeout provided for limiter")
+
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self.waiting = 0
+        self.shed = 0
+
+    async def acquire(self) -> bool:
+        if not self._semaphore.locked():
+            await self._semaphore.acquire() # free slot, doesn't block
+            return True
+        if self.waiting >= self.max_queue or self.queue_timeout == 0:
+            self.shed += 1
+            return False
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+            return True
+        except TimeoutError:
+            self.shed += 1
+            return False
+        finally:
+            self.waiting -= 1
+
+    def release(self):
+        self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "active": self.max_concurrent - self._semaphore._value,
+            "waiting": self.waiting,
+            "shed": self.shed,
+        }
+
+# Per-key token bucket: each key gets burst tokens refilled at rate per second. Buckets live in an
+# LRUCache that drops a bucket once it has been idle long enough to be full again, so a missing bucket
+# and a full one are the same thing and idle users cost no memory.
+class TokenBucket:
+    def __init__(self, rate: float, burst: int, max_keys: int = 10000, clock = time.monotonic):
+        if not isinstance(rate, (int, float)) or rate <= 0:
+            raise ValueError("Invalid rate provided for token bucket")
+        if not isinstance(burst, int) or burst < 1:
+            raise ValueError("Invalid burst provided for token bucket")
+
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._buckets = LRUCache(max_keys, burst / rate, clock=clock) # key -> (tokens, last refill)
+
+    # takes a token for key, returns 0 when allowed or the seconds until the next token otherwise
+    def take(self, key) -> float:
+        now = self._clock()
+        tokens, last = self._buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - last) * self.rate)
+        if tokens >= 1:
+            self._buckets.set(key, (tokens - 1, now))
+            return 0.0
+        self._buckets.set(key, (tokens, now))
+        return (1 - tokens) / self.rate
+
+def retry_after_header(seconds: float) -> dict:
+    return {"Retry-After": str(max(1, math.ceil(seconds)))}
+
+# Plain ASGI middleware putting each request whose path falls under one of the group prefixes through
+# that group's ConcurrencyLimiter (longest prefix wins), the slot is held until the response is sent.
+# Shed requests get a 503 with Retry-After before any other work is done for them.
+class ConcurrencyLimitMiddleware:
+    def __init__(self, app: ASGIApp, groups: dict[str, ConcurrencyLimiter], retry_after: float = 1):
+        self.app = app
+        self.groups = sorted(groups.items(), key=lambda group: len(group[0]), reverse=True)
+        self.retry_after = retry_after
+
+    def _limiter(self, path: str):
+        for prefix, limiter in self.groups:
+            if path == prefix or path.startswith(prefix.rstrip('/') + '/'):
+                return limiter
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        limiter = self._limiter(scope["path"]) if scope["type"] == "http" else None
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not await limiter.acquire():
+            scope["app"].state.logger.warning("Request shed by concurrency limiter", path=scope["path"], method=scope["method"])
+            response = JSONResponse(status_code=503, content={"error": "Service overloaded, retry later"},
+                                    headers=retry_after_header(self.retry_after))
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
@@ -25,18 +25,15 @@ def config_logger(name: str, file_name: str|None = None, backup: bool|None = Non
 
     if file_name:
         # If dir doesnt exist create it
-        if not os.path.exists('logs'): 
-            os.makedirs('logs')
-        # If file already exists move it to a backup or overwrite
-        if os.path.exists(f'logs/{file_name}'):
-            if backup:
-                timestamp = datetime.now().strftime('%Y%m%d-%H%M%S')
-                backup_name = f'logs/{file_name}-{timestamp}.bkp'
-                os.rename(f'logs/{file_name}', backup_name)
-            else:
-                open(f'logs/{file_name}', 'w').close()
+        os.makedirs('logs', exist_ok=True)
+        # If file already exists move it to a backup, otherwise the handler overwrites it
+        if backup and os.path.exists(f'logs/{file_name}'):
+            timestamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+            backup_name = f'logs/{file_name}-{timestamp}.bkp'
+            os.rename(f'logs/{file_name}', backup_name)
 
-        f_handler = logging.FileHandler(f'logs/{file_name}', mode='a')
+        # delay: the file is opened (and truncated) on the first record written, not during startup
+        f_handler = logging.FileHandler(f'logs/{file_name}', mode='a' if backup else 'w', delay=True)
         f_handler.setLevel(logging.DEBUG) # All logs go to log file
         f_handler.setFormatter(logging.Formatter(fmt='%(levelname)s - %(asctime)s: %(message)s'))
         logger.addHandler(f_handler)
@@ -0,0 +1,234 @@
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from bisect import bisect_left
+import math
+import time
+
+# request latency buckets in seconds, upper bounds of the cumulative Prometheus buckets (+Inf is implicit)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Label values are positional tuples in the order of the metric's label names. Children are plain dicts
+# updated from the event loop without locks, same as LRUCache: an increment is a dict lookup and an add.
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, label_names: tuple = ()):
+        if not name or not name.replace('_', '').replace(':', '').isalnum():
+            raise ValueError("Invalid name provided for metric")
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+
+    def _key(self, labels: tuple) -> tuple:
+        if len(labels) != len(self.label_names):
+            raise ValueError("Invalid labels provided for metric")
+        return labels
+
+    def _label_str(self, labels: tuple, extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(self.label_names, labels)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def _header(self) -> list:
+        return [f"# HELP {self.name} {_escape(self.help_text)}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, label_names: tuple = ()):
+        super().__init__(name, help_text, label_names)
+        self._values: dict = {}
+
+    def inc(self, *labels, amount: float = 1):
+        if amount < 0:
+            raise ValueError("Counters can only be incremented")
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def render(self) -> list:
+        lines = self._header()
+        for labels, value in self._values.items():
+            lines.append(f"{self.name}{self._label_str(labels)} {_number(value)}")
+        return lines
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def inc(self, *labels, amount: float = 1):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels, value: float):
+        self._values[self._key(labels)] = value
+
+# Fixed-bucket histogram. observe() bumps a single (non-cumulative) bucket slot, the cumulative counts
+# Prometheus expects are only summed up when rendering.
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, label_names: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        if not buckets or list(buckets) != sorted(set(buckets)):
+            raise ValueError("Invalid buckets provided for histogram")
+        self.buckets = tuple(float(b) for b in buckets if b != math.inf)
+        self._series: dict = {} # labels -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, *labels, value: float):
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [0] * (len(self.buckets) + 2)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def count(self, *labels) -> int:
+        series = self._series.get(self._key(labels))
+        return sum(series[:-1]) if series else 0
+
+    def render(self) -> list:
+        lines = self._header()
+        for labels, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), series):
+                cumulative += count
+                le = 'le="+Inf"' if bound == math.inf else f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{self._label_str(labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{self._label_str(labels)} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{self._label_str(labels)} {cumulative}")
+        return lines
+
+# Samples read from callback() every time the registry renders, for stats other objects already keep
+# (LRUCache.stats(), ConcurrencyLimiter.stats()) so nothing is counted twice. callback returns
+# {label values: value}, kind says whether those values only go up (counter) or not (gauge).
+class CallbackMetric(_Metric):
+    def __init__(self, name: str, help_text: str, label_names: tuple = (), callback = dict, kind: str = "gauge"):
+        super().__init__(name, help_text, label_names)
+        if kind not in ("counter", "gauge"):
+            raise ValueError("Invalid kind provided for metric")
+        self.kind = kind
+        self.callback = callback
+
+    def render(self) -> list:
+        lines = self._header()
+        for labels, value in self.callback().items():
+            lines.append(f"{self.name}{self._label_str(self._key(labels))} {_number(value)}")
+        return lines
+
+# Holds the app's metrics by name and renders them in the Prometheus text exposition format (0.0.4).
+class MetricsRegistry:
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self):
+        self._metrics: dict = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            if type(existing) is not type(metric) or existing.kind != metric.kind or existing.label_names != metric.label_names:
+                raise ValueError(f"Metric already registered with a different type or labels: {metric.name}")
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, label_names: tuple = ()) -> Counter:
+        return self._register(Counter(name, help_text, label_names))
+
+    def gauge(self, name: str, help_text: str, label_names: tuple = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, label_names))
+
+    def histogram(self, name: str, help_text: str, label_names: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, label_names, buckets))
+
+    # registering the same name again points it at the new callback (a restarted lifespan's objects)
+    def callback(self, name: str, help_text: str, label_names: tuple, callback, kind: str = "gauge") -> CallbackMetric:
+        metric = self._register(CallbackMetric(name, help_text, label_names, callback, kind))
+        metric.callback = callback
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+# (metric, stats key, kind, help) for LRUCache.stats()
+CACHE_METRICS = (
+    ("cache_entries", "size", "gauge", "Entries held by an in-process cache"),
+    ("cache_hits_total", "hits", "counter", "In-process cache lookups that found a live entry"),
+    ("cache_misses_total", "misses", "counter", "In-process cache lookups that found nothing"),
+    ("cache_evictions_total", "evictions", "counter", "In-process cache entries dropped to stay under max size"),
+    ("cache_expirations_total", "expirations", "counter", "In-process cache entries dropped once their TTL ran out"),
+)
+# (metric, stats key, kind, help) for ConcurrencyLimiter.stats()
+LIMITER_METRICS = (
+    ("concurrency_active", "active", "gauge", "Requests of a route group currently running"),
+    ("concurrency_waiting", "waiting", "gauge", "Requests of a route group queued for a slot"),
+    ("concurrency_shed_total", "shed", "counter", "Requests of a route group shed with a 503"),
+)
+
+# caches() returns {cache name: LRUCache.stats()}, it is called on every scrape
+def register_cache_metrics(registry: MetricsRegistry, caches) -> None:
+    for name, key, kind, help_text in CACHE_METRICS:
+        registry.callback(name, help_text, ("cache",), lambda key=key: {(cache,): stats[key] for cache, stats in caches().items()}, kind)
+
+# limiters is {route group: ConcurrencyLimiter}, as given to ConcurrencyLimitMiddleware
+def register_limiter_metrics(registry: MetricsRegistry, limiters: dict) -> None:
+    for name, key, kind, help_text in LIMITER_METRICS:
+        registry.callback(name, help_text, ("group",), lambda key=key: {(group,): limiter.stats()[key] for group, limiter in limiters.items()}, kind)
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+# Plain ASGI middleware recording request count, in-flight requests and latency per route and status.
+# The route label is the matched route's path template (e.g. /plaid/items/{item_id}) so raw paths can't
+# blow up the label space, requests that match no route are recorded under "unmatched".
+# GET metrics_path is answered here with the registry's text, before any request-id or auth checks,
+# so scrapers don't need to send app headers.
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp, registry: MetricsRegistry, metrics_path: str = "/metrics", clock = time.perf_counter):
+        self.app = app
+        self.registry = registry
+        self.metrics_path = metrics_path
+        self._clock = clock
+        self.requests = registry.counter("http_requests_total", "HTTP requests handled", ("method", "route", "status"))
+        self.latency = registry.histogram("http_request_duration_seconds", "HTTP request latency", ("method", "route", "status"))
+        self.in_flight = registry.gauge("http_requests_in_flight", "HTTP requests currently being handled")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if scope["path"] == self.metrics_path and scope["method"] == "GET":
+            response = Response(self.registry.render(), headers={"content-type": MetricsRegistry.CONTENT_TYPE})
+            await response(scope, receive, send)
+            return
+
+        status = 500 # stays 500 if the app raises before starting a response
+        async def send_with_status(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = self._clock()
+        self.in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            self.in_flight.dec()
+            route = scope.get("route")
+            labels = (scope["method"], getattr(route, "path", "unmatched"), str(status))
+            self.requests.inc(*labels)
+            self.latency.observe(*labels, value=self._clock() - start)
@@ -1,5 +1,6 @@
 import httpx
-from env.envs import Env
+from functools import cached_property
+from src.helpers.settings import Settings, resolve_settings, env_name
 
 from src.helpers.plaid.transactions import TransactionsAPI
 from src.helpers.plaid.items import ItemsAPI
@@ -9,17 +10,17 @@ from src.helpers.plaid.investments import InvestmentsAPI
 from src.requests.plaid_payloads import create_link_token_payload
 
 class Plaid:
-    def __init__(self, env: str, logger):
+    def __init__(self, env: str|Settings, logger):
         self.logger = logger
 
-        config = Env(env)['plaid']
+        config = resolve_settings(env)['plaid']
         self.client_id = config['CLIENT_ID']
         self.secret = config['SECRET']
         self.base_url = ""
 
-        if env == "sandbox":
+        if env_name(env) == "sandbox":
             self.base_url = "https://sandbox.plaid.com"
-        elif env == "prod":
+        elif env_name(env) == "prod":
             self.base_url = "https://production.plaid.com"
         else:
             raise ValueError("Invalid env specified")
@@ -27,11 +28,22 @@ class Plaid:
         self.client = httpx.AsyncClient(base_url=self.base_url, timeout=10.0, headers={"Content-Type": "application/json"})
         self.logger.info("Plaid client initialized with base URL: %s", self.base_url)
 
-        # sub-clients
-        self.items = ItemsAPI(self)
-        self.transactions = TransactionsAPI(self)
-        self.liabilities = LiabilitiesAPI(self)
-        self.investments = InvestmentsAPI(self)
+    # sub-clients, built the first time a route uses them instead of on every worker start
+    @cached_property
+    def items(self) -> ItemsAPI:
+        return ItemsAPI(self)
+
+    @cached_property
+    def transactions(self) -> TransactionsAPI:
+        return TransactionsAPI(self)
+
+    @cached_property
+    def liabilities(self) -> LiabilitiesAPI:
+        return LiabilitiesAPI(self)
+
+    @cached_property
+    def investments(self) -> InvestmentsAPI:
+        return InvestmentsAPI(self)
 
     async def _post(self, path: str, payload: dict):
         try:
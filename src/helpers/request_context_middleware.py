@@ -1,7 +1,9 @@
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from fastapi import Request
 from fastapi.responses import JSONResponse
 
+import re
 import uuid
 
 from dataclasses import dataclass
@@ -12,42 +14,93 @@ from contextvars import ContextVar
 class RequestContext:
     request_id: str
     user_id: Optional[str] = None
+    authorization: Optional[str] = None # raw Authorization header, only validated once something asks for the user
+    auth_resolved: bool = False
+    auth_error: Optional["AuthError"] = None
 
 request_ctx: ContextVar[RequestContext] = ContextVar("request_ctx")
 
-class RequestContextMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        logger = request.app.state.logger
-        session_manager = request.app.state.sessionManager
+# canonical form skips the uuid.UUID parse, anything else it accepts still goes through it
+_UUID_RE = re.compile(r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}")
 
-        request_id = request.headers.get('request-id')
-        user_id = None
-        if not request_id:
-            logger.debug("Request missing valid request-id header", path=request.url.path, method=request.method)
-            return JSONResponse(status_code=400, content={"error": "Missing request-id header"})
-        
-        try:
-            uuid.UUID(request_id, version=4)
-        except ValueError:
-            logger.debug("Request has invalid request-id header (not valid UUIDv4)", path=request.url.path, method=request.method)
-            return JSONResponse(status_code=400, content={"error": "Invalid request-id header (must be UUIDv4)"})
+def _valid_request_id(request_id: str) -> bool:
+    if _UUID_RE.fullmatch(request_id):
+        return True
+    try:
+        uuid.UUID(request_id, version=4)
+        return True
+    except ValueError:
+        return False
 
-        auth = request.headers.get('Authorization')
-        
-        if auth:
+# Authentication failure, rendered by auth_error_handler as {"error": message} like the other middleware errors
+class AuthError(Exception):
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+
+async def auth_error_handler(request: Request, exc: AuthError) -> JSONResponse:
+    return JSONResponse(status_code=exc.status_code, content={"error": exc.message})
+
+# Validates the request's Authorization header the first time it is needed and memoizes the outcome
+# on the request context. Returns None without a header, raises AuthError for a bad scheme (400) or token (401).
+async def authenticate(request: Request) -> Optional[str]:
+    ctx = request_ctx.get()
+    if not ctx.auth_resolved:
+        ctx.auth_resolved = True
+        if ctx.authorization:
+            logger = request.app.state.logger
             try:
-                scheme, token = auth.split(' ')
+                scheme, token = ctx.authorization.split(' ')
                 if scheme.lower() != 'bearer':
                     logger.debug("Authorization header has invalid scheme", path=request.url.path, method=request.method)
-                    return JSONResponse(status_code=400, content={"error": "Invalid Authorization header scheme (must be Bearer)"})
-                user_id = session_manager.validate(token)
-            except Exception as e:
+                    ctx.auth_error = AuthError(400, "Invalid Authorization header scheme (must be Bearer)")
+                else:
+                    ctx.user_id = await request.app.state.sessionManager.validate(token)
+            except Exception:
                 logger.debug("Failed to validate token", path=request.url.path, method=request.method)
-                return JSONResponse(status_code=401, content={"error": "Invalid or expired token"})
+                ctx.auth_error = AuthError(401, "Invalid or expired token")
+
+    if ctx.auth_error:
+        raise ctx.auth_error
+    return ctx.user_id
+
+# Plain ASGI middleware: the route runs in the same task as the middleware (so request_ctx is visible to it)
+# and response messages are passed straight through, only the start message gets the request-id header.
+# No session work happens here, routes that need the user resolve it through authenticate().
+class RequestContextMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
 
-        request_ctx.set(RequestContext(request_id=request_id, user_id=user_id))
-        logger.debug("Request context set", path=request.url.path, method=request.method)
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-        response = await call_next(request)
-        response.headers["request-id"] = request_id # echo back request id
-        return response
+        logger = scope["app"].state.logger
+        path, method = scope["path"], scope["method"]
+        headers = Headers(scope=scope)
+
+        request_id = headers.get('request-id')
+        if not request_id:
+            logger.debug("Request missing valid request-id header", path=path, method=method)
+            await JSONResponse(status_code=400, content={"error": "Missing request-id header"})(scope, receive, send)
+            return
+        
+        if not _valid_request_id(request_id):
+            logger.debug("Request has invalid request-id header (not valid UUIDv4)", path=path, method=method)
+            await JSONResponse(status_code=400, content={"error": "Invalid request-id header (must be UUIDv4)"})(scope, receive, send)
+            return
+
+        ctx_token = request_ctx.set(RequestContext(request_id=request_id, authorization=headers.get('Authorization')))
+        logger.debug("Request context set", path=path, method=method)
+
+        async def send_with_request_id(message: Message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)["request-id"] = request_id # echo back request id
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_ctx.reset(ctx_token)
@@ -0,0 +1,16 @@
+from fastapi.responses import JSONResponse
+
+from typing import Any
+import orjson
+
+def _default(value: Any):
+    # anything orjson can't serialize natively (e.g. a Mongo ObjectId) goes out as its string form
+    return str(value)
+
+# JSONResponse rendered with orjson: one C call straight to bytes instead of json.dumps building a str
+# and encoding it. Only for routes that return it themselves with data that is already JSON ready,
+# which skips response_model validation and jsonable_encoder. Not a default_response_class: with any
+# response class set, FastAPI no longer serializes response_model routes in pydantic's core.
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
@@ -1,89 +1,310 @@
+import asyncio
 import json
 import time
 import base64
 import hmac
 import hashlib
+import secrets
 
-from env.envs import Env
+from src.helpers.settings import Settings, resolve_settings
+from src.db.revocation_db import MemoryRevocationDB
+from src.helpers.cache import LRUCache
+from src.helpers.signing import Ed25519Verifier, _b64, _canonical_json, ed25519_header, load_private_key, load_public_key
+
+# Tokens are revoked by their jti (session id) claim, tokens issued before jti existed by a digest of the token
+def _revocation_key(session_token: str) -> str:
+    return hashlib.sha256(session_token.encode()).hexdigest()
+
+def _session_key(session_token: str, claims: dict) -> str:
+    return claims.get('jti') or _revocation_key(session_token)
+
+# issue time in ms, tokens issued before iat_ms existed only carry whole seconds
+def _issued_ms(claims: dict) -> int:
+    return claims.get('iat_ms', claims.get('iat', 0) * 1000)
+
+# hashlib constructor for the configured algorithm, JWT style names (HS256) map to their hash (sha256)
+def _digestmod(alg: str):
+    name = alg.lower()
+    if name.startswith('hs'):
+        name = f"sha{name[2:]}"
+    return getattr(hashlib, name)
+
+# Token formats, TOKEN_VERSION picks the one create() issues and validate() accepts both:
+#   v1: base64(str(header)).base64(str(payload)).base64(hex HMAC)
+#   v2: base64(canonical JSON header with "v": 2).base64(canonical JSON payload).base64(raw HMAC digest)
+# TOKEN_VERSION defaults to 1, switch it to 2 once every worker runs code that can read v2.
+# With SIGNING configured new tokens are v2 signed with Ed25519 (header alg EdDSA plus the key's kid),
+# HMAC tokens already handed out keep validating until they expire.
 
 class SessionManager:
-    def __init__(self, env: str, logger):
-        self.deactivated_sessions = set()
-        config = Env(env)['session']
+    # revocations is the shared store (RevocationDB), without one they only live in this process.
+    # Tokens the store said were not revoked are remembered for REVOCATION_CACHE.TTL_SECONDS so repeat
+    # requests skip the lookup, which is also how long a logout on another worker can take to apply here.
+    # Tokens that passed the signature check are kept (up to TOKEN_CACHE.MAX_TOKENS, until they expire)
+    # so a repeat validate skips the HMAC and payload decoding.
+    # "Log out everywhere" records one per-user epoch in milliseconds, every token of that user issued before it is
+    # rejected. Tokens carry iat_ms next to iat so a login right after the logout (same second) still validates.
+    # With REFRESH_DURATION_SECONDS set, sessions are a short lived access token (DURATION_SECONDS) plus a single use
+    # refresh token that refresh() swaps for a new pair. The refresh token names its access token's jti as sid,
+    # so logging out the access token also ends the refresh token.
+    def __init__(self, env: str|Settings, logger, revocations = None):
+        config = resolve_settings(env)['session']
         self.session_duration = config['DURATION_SECONDS']
+        self.refresh_duration = config.get('REFRESH_DURATION_SECONDS')
         self.secret_key = config['SECRET_KEY']
         self.cleanup_interval = config['CLEANUP_INTERVAL_SECONDS']
         self.header_b64 = base64.urlsafe_b64encode(bytes(str(config['HEADER']), encoding='utf-8')).rstrip(b'=').decode()
         self.alg = config['HEADER']['algorithm']
+        self.token_version = config.get('TOKEN_VERSION', 1)
+        # v2 header segment and keyed HMAC are built once, each signature copies the template
+        self.header_v2_b64 = _b64(_canonical_json({"alg": self.alg, "typ": config['HEADER'].get('typ', 'JWT'), "v": 2}))
+        self._mac = hmac.new(self.secret_key.encode(), digestmod=_digestmod(self.alg))
+        self._configure_signing(config.get('SIGNING'))
+        self.revocations = revocations if revocations is not None else MemoryRevocationDB(logger)
+        cache_config = config.get('REVOCATION_CACHE', {})
+        self.not_revoked = LRUCache(cache_config.get('MAX_TOKENS', 10000), cache_config.get('TTL_SECONDS', 5))
+        self.user_epochs = LRUCache(cache_config.get('MAX_USERS', 10000), cache_config.get('TTL_SECONDS', 5)) # user_id -> valid after epoch, 0 for none
+        self.validated = LRUCache(config.get('TOKEN_CACHE', {}).get('MAX_TOKENS', 10000), self.session_duration) # token -> (user_id, iat_ms, exp, revocation key)
+        self._cleanup_task = None
         self.logger = logger
         self.logger.info("SessionManager initialized")
 
+    # SIGNING: {"KID", "PRIVATE_KEY_PATH", "PUBLIC_KEYS": {kid: pem path} of retired keys still accepted}
+    def _configure_signing(self, signing: dict|None) -> None:
+        self.signing_key = None
+        self.header_ed25519_b64 = None
+        public_keys = {}
+        if signing:
+            self.signing_key = load_private_key(signing['PRIVATE_KEY_PATH'])
+            self.header_ed25519_b64 = ed25519_header(signing['KID'])
+            public_keys = {kid: load_public_key(path) for kid, path in signing.get('PUBLIC_KEYS', {}).items()}
+            public_keys[signing['KID']] = self.signing_key.public_key()
+        self.verifier = Ed25519Verifier(public_keys)
+
+    # what other services need to verify tokens locally
+    def public_keys(self) -> dict:
+        return self.verifier.jwks()
+
     def create(self, user_id: str) -> str:
-        payload = self.create_payload(user_id)
-        signature = hmac.new(self.secret_key.encode(), f"{self.header_b64}.{payload}".encode(), getattr(hashlib, self.alg.lower()) ).hexdigest()
-        signature_b64 = base64.urlsafe_b64encode(bytes(signature, encoding='utf-8')).rstrip(b'=').decode()
-        session_token = f"{self.header_b64}.{payload}.{signature_b64}"
-        return session_token
-
-    def create_payload(self, user_id: str) -> str:
-        iat = int(time.time())
-        exp = iat + self.session_duration
-        payload = {"id": user_id, "iat": iat, "exp": exp}
+        return self._encode(self.create_payload(user_id))
+
+    # tokens for a new login: {"jwt_token"} plus "refresh_token" when refresh tokens are enabled
+    def create_session(self, user_id: str) -> dict:
+        if not self.refresh_duration:
+            return {"jwt_token": self.create(user_id)}
+
+        jti = secrets.token_urlsafe(12)
+        return {
+            "jwt_token": self._encode(self.create_payload(user_id, {"jti": jti})),
+            "refresh_token": self._encode(self.create_payload(user_id, {"typ": "refresh", "sid": jti}, self.refresh_duration))
+        }
+
+    def _encode(self, payload: str) -> str:
+        if self.signing_key is not None:
+            signing_input = f"{self.header_ed25519_b64}.{payload}"
+            return f"{signing_input}.{_b64(self.signing_key.sign(signing_input.encode()))}"
+
+        header = self.header_v2_b64 if self.token_version == 2 else self.header_b64
+        signing_input = f"{header}.{payload}"
+        return f"{signing_input}.{self._sign(signing_input, header)}"
+
+    def create_payload(self, user_id: str, claims: dict|None = None, duration: int|None = None) -> str:
+        iat_ms = int(time.time() * 1000)
+        iat = iat_ms // 1000
+        exp = iat + (duration or self.session_duration)
+        payload = {"id": user_id, "iat": iat, "iat_ms": iat_ms, "exp": exp, "jti": secrets.token_urlsafe(12), **(claims or {})}
+        if self.token_version == 2 or self.signing_key is not None:
+            return _b64(_canonical_json(payload))
         payload_str = base64.urlsafe_b64encode(bytes(str(payload), encoding='utf-8')).rstrip(b'=').decode()
         return payload_str
-    
-    def validate(self, session_token: str) -> str:
-        if session_token in self.deactivated_sessions:
-            self.logger.error("Session token has been deactivated")
-            raise ValueError("Session token has been deactivated")
 
+    def _sign(self, signing_input: str, header_b64: str) -> str:
+        if header_b64 == self.header_v2_b64:
+            mac = self._mac.copy()
+            mac.update(signing_input.encode())
+            return _b64(mac.digest())
+
+        signature = hmac.new(self.secret_key.encode(), signing_input.encode(), _digestmod(self.alg)).hexdigest()
+        return base64.urlsafe_b64encode(bytes(signature, encoding='utf-8')).rstrip(b'=').decode()
+
+    # v1 payloads are a python repr, quotes have to be swapped before they parse as JSON
+    def _decode_payload(self, payload_b64: str, header_b64: str|None = None) -> dict:
+        payload_str = base64.urlsafe_b64decode(payload_b64 + '==').decode()
+        if header_b64 != self.header_v2_b64 and header_b64 not in self.verifier.headers:
+            payload_str = payload_str.replace("'", '"')
+        return json.loads(payload_str)
+
+    # unverified claims, only used to find what to revoke
+    def _claims(self, session_token: str) -> dict:
+        try:
+            header_b64, payload_b64, _ = session_token.split('.')
+            return self._decode_payload(payload_b64, header_b64)
+        except Exception:
+            return {}
+
+    # longest any token handed out now could stay valid
+    def _longest_lived(self) -> int:
+        return max(self.session_duration, self.refresh_duration or 0)
+
+    # the revocation only has to last as long as the token (and the refresh token issued along with an
+    # access token), unreadable tokens get the longest possible lifetime
+    def _token_exp(self, session_token: str) -> int:
+        try:
+            claims = self._claims(session_token)
+            exp = int(claims['exp'])
+            if self.refresh_duration and claims.get('typ') != 'refresh':
+                exp = max(exp, int(claims['iat']) + self.refresh_duration)
+            return exp
+        except Exception:
+            return int(time.time()) + self._longest_lived()
+
+    async def is_revoked(self, session_token: str) -> bool:
+        claims = self._claims(session_token)
+        return await self._is_revoked(_session_key(session_token, claims), claims.get('id'), _issued_ms(claims))
+
+    async def _user_epoch(self, user_id: str) -> int:
+        epoch = self.user_epochs.get(user_id)
+        if epoch is None:
+            epoch = await self.revocations.get_valid_after(user_id) or 0
+            self.user_epochs.set(user_id, epoch)
+        return epoch
+
+    async def _is_revoked(self, key: str, user_id: str|None, iat_ms: int) -> bool:
+        if user_id is not None and iat_ms < await self._user_epoch(user_id):
+            return True
+        if self.not_revoked.get(key):
+            return False
+
+        revoked = await self.revocations.is_revoked(key)
+        if not revoked:
+            self.not_revoked.set(key, True)
+        return revoked
+
+    # format, signature and payload checks, returns the token's claims
+    def _verify(self, session_token: str) -> dict:
         try:
             header_b64, payload_b64, signature_b64 = session_token.split('.')
         except ValueError:
             self.logger.error("Invalid session token format")
             raise ValueError("Invalid session token format")
         
-        expected_sig = hmac.new(self.secret_key.encode(), f"{header_b64}.{payload_b64}".encode(), getattr(hashlib, self.alg.lower()) ).hexdigest()
-        expected_sig_b64 = base64.urlsafe_b64encode(bytes(expected_sig, encoding='utf-8')).rstrip(b'=').decode()
+        if header_b64 in self.verifier.headers:
+            valid = self.verifier.check_signature(header_b64, payload_b64, signature_b64)
+        else:
+            valid = hmac.compare_digest(signature_b64, self._sign(f"{header_b64}.{payload_b64}", header_b64))
 
-        if not hmac.compare_digest(signature_b64, expected_sig_b64):
+        if not valid:
             self.logger.error("Invalid session token signature")
             raise ValueError("Invalid session token signature")
         
-        payload_str = base64.urlsafe_b64decode(payload_b64 + '==').decode().replace("'", '"')
         try:
-            payload = json.loads(payload_str)
+            payload = self._decode_payload(payload_b64, header_b64)
         except Exception:
             self.logger.error("Invalid session token payload")
             raise ValueError("Invalid session token payload")
 
-        if payload.get('exp', 0) < int(time.time()):
-            self.invalidate(session_token)
+        return payload
+
+    # signature and expiry are checked first so only well formed, live tokens reach the revocation store
+    async def validate(self, session_token: str) -> str:
+        cached = self.validated.get(session_token)
+        if cached is None:
+            claims = self._verify(session_token)
+            if claims.get('typ') == 'refresh':
+                self.logger.error("Invalid session token type")
+                raise ValueError("Invalid session token type")
+            user_id, iat_ms, exp, key = claims['id'], _issued_ms(claims), claims.get('exp', 0), _session_key(session_token, claims)
+        else:
+            user_id, iat_ms, exp, key = cached
+
+        now = int(time.time())
+        if exp < now:
+            self.validated.invalidate(session_token)
             self.logger.error("Session token has expired")
             raise ValueError("Session token has expired")
+        if cached is None:
+            self.validated.set(session_token, (user_id, iat_ms, exp, key), ttl_seconds=exp - now + 1)
+
+        if await self._is_revoked(key, user_id, iat_ms):
+            self.logger.error("Session token has been deactivated")
+            raise ValueError("Session token has been deactivated")
         
-        return payload['id']
+        return user_id
     
-    def invalidate(self, session_id: str) -> None:
+    async def invalidate(self, session_id: str) -> None:
         self.logger.debug("Invalidating specified session token")
-        self.deactivated_sessions.add(session_id)
+        self.validated.invalidate(session_id)
+        await self.revoke_session(_session_key(session_id, self._claims(session_id)), self._token_exp(session_id))
+
+    # revoke by session id (jti), exp defaults to the longest a session could still be alive
+    async def revoke_session(self, jti: str, exp: int|None = None) -> None:
+        if not jti or not isinstance(jti, str):
+            raise ValueError("Invalid session id provided for revocation")
+
+        self.not_revoked.invalidate(jti)
+        await self.revocations.revoke(jti, exp if exp is not None else int(time.time()) + self._longest_lived())
+
+    # swaps a refresh token for a new access/refresh pair without going through login
+    async def refresh(self, refresh_token: str) -> dict:
+        claims = self._verify(refresh_token)
+        if claims.get('typ') != 'refresh' or not claims.get('sid'):
+            self.logger.error("Invalid refresh token")
+            raise ValueError("Invalid refresh token")
+
+        if claims.get('exp', 0) < int(time.time()):
+            self.logger.error("Session token has expired")
+            raise ValueError("Session token has expired")
+
+        user_id = claims['id']
+        if await self._is_revoked(claims['sid'], user_id, _issued_ms(claims)):
+            self.logger.error("Session token has been deactivated")
+            raise ValueError("Session token has been deactivated")
+
+        # single use: only the first refresh with a token rotates, a second one means the token leaked
+        if not await self.revocations.claim(claims['jti'], claims['exp']):
+            self.logger.warning("Refresh token reused, invalidating all sessions for user")
+            await self.invalidate_user(user_id)
+            raise ValueError("Refresh token has already been used")
+
+        return self.create_session(user_id)
+
+    # log out everywhere: one record for the user, kept until every token issued before it has expired
+    async def invalidate_user(self, user_id: str) -> None:
+        if not user_id or not isinstance(user_id, str):
+            raise ValueError("Invalid user_id provided for invalidating sessions")
+
+        self.logger.debug("Invalidating all sessions for user")
+        epoch = int(time.time() * 1000)
+        await self.revocations.set_valid_after(user_id, epoch, epoch // 1000 + self._longest_lived())
+        self.user_epochs.set(user_id, epoch)
     
-    def cleanup(self):
-        current = time.time()
-        expired_sessions = []
+    def cache_stats(self) -> dict:
+        return {"validated": self.validated.stats(), "not_revoked": self.not_revoked.stats(), "user_epochs": self.user_epochs.stats()}
+
+    async def cleanup(self) -> int:
+        removed = await self.revocations.cleanup()
+        self.logger.debug(f"Cleaning up {removed} expired deactivated sessions")
+        return removed
+
+    async def _cleanup_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.cleanup_interval)
+            try:
+                await self.cleanup()
+            except Exception as e:
+                self.logger.error("Failed to clean up deactivated sessions: %s", e)
+
+    # runs cleanup every CLEANUP_INTERVAL_SECONDS on the running loop until close()
+    def start_cleanup(self) -> None:
+        if self._cleanup_task is None:
+            self._cleanup_task = asyncio.create_task(self._cleanup_loop())
 
-        # iterate over a snapshot to allow removing from the set
-        for token in list(self.deactivated_sessions):
+    async def close(self):
+        if self._cleanup_task is not None:
+            self._cleanup_task.cancel()
             try:
-                _, payload_b64, _ = token.split('.')
-                payload_str = base64.urlsafe_b64decode(payload_b64 + '==').decode().replace("'", '"')
-                payload = json.loads(payload_str)
-                if payload.get('exp', 0) < current:
-                    expired_sessions.append(token)
-            except Exception:
-                # if token is malformed, remove it
-                expired_sessions.append(token)
-
-        self.logger.debug(f"Cleaning up {len(expired_sessions)} expired deactivated sessions")
-        for token in expired_sessions:
-            self.deactivated_sessions.discard(token)
\ No newline at end of file
+                await self._cleanup_task
+            except asyncio.CancelledError:
+                pass
+            self._cleanup_task = None
+        await self.revocations.close()
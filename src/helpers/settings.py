@@ -0,0 +1,38 @@
+from env.envs import Env
+
+from dataclasses import dataclass
+from functools import lru_cache
+import os
+
+# Env the app runs against when create_app() gets no settings, e.g. uvicorn src.app:app
+DEFAULT_ENV = "sandbox"
+
+# Everything the service reads from its env config, parsed once per env. Sections are also available
+# as settings['db'] etc. so code written against Env(env)[...] reads the same.
+@dataclass(frozen=True)
+class Settings:
+    env: str
+    plaid: dict
+    session: dict
+    db: dict
+    log_file: str|None = "app.logs"
+    log_backup: bool = False
+    ensure_indexes: bool = True # provision indexes on startup, turn off for workers once a deploy has done it
+
+    def __getitem__(self, section: str) -> dict:
+        return getattr(self, section)
+
+# One Env(env) read per process, every component built for the env shares the result
+@lru_cache(maxsize=None)
+def get_settings(env: str|None = None) -> Settings:
+    env = env or os.environ.get("APP_ENV", DEFAULT_ENV)
+    config = Env(env)
+    return Settings(env=env, plaid=config['plaid'], session=config['session'], db=config['db'],
+                    ensure_indexes=config['db'].get("ENSURE_INDEXES", True))
+
+# Components take either an env name or Settings (create_app hands its own down), an env name is looked up
+def resolve_settings(env: str|Settings|None) -> Settings:
+    return env if isinstance(env, Settings) else get_settings(env)
+
+def env_name(env: str|Settings) -> str:
+    return env.env if isinstance(env, Settings) else env
@@ -0,0 +1,83 @@
+import base64
+import json
+import time
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey, Ed25519PublicKey
+
+# Ed25519 session signing. The API process holds the private key, anything holding the public keys
+# (e.g. the output of /account/keys) can check tokens itself with Ed25519Verifier.
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+def _canonical_json(data: dict) -> bytes:
+    return json.dumps(data, separators=(',', ':'), sort_keys=True).encode()
+
+# v2 header segment for tokens signed with the key kid
+def ed25519_header(kid: str) -> str:
+    return _b64(_canonical_json({"alg": "EdDSA", "kid": kid, "typ": "JWT", "v": 2}))
+
+def load_private_key(path: str) -> Ed25519PrivateKey:
+    with open(path, 'rb') as f:
+        key = serialization.load_pem_private_key(f.read(), password=None)
+    if not isinstance(key, Ed25519PrivateKey):
+        raise ValueError("Session signing key must be an Ed25519 private key")
+    return key
+
+def load_public_key(path: str) -> Ed25519PublicKey:
+    with open(path, 'rb') as f:
+        key = serialization.load_pem_public_key(f.read())
+    if not isinstance(key, Ed25519PublicKey):
+        raise ValueError("Session verification key must be an Ed25519 public key")
+    return key
+
+def public_jwk(kid: str, key: Ed25519PublicKey) -> dict:
+    raw = key.public_bytes(serialization.Encoding.Raw, serialization.PublicFormat.Raw)
+    return {"kty": "OKP", "crv": "Ed25519", "alg": "EdDSA", "use": "sig", "kid": kid, "x": _b64(raw)}
+
+class Ed25519Verifier:
+    def __init__(self, public_keys: dict[str, Ed25519PublicKey]):
+        self.public_keys = public_keys
+        self.headers = {ed25519_header(kid): key for kid, key in public_keys.items()} # header segment -> key
+
+    @classmethod
+    def from_jwks(cls, jwks: dict) -> "Ed25519Verifier":
+        return cls({jwk["kid"]: Ed25519PublicKey.from_public_bytes(_b64decode(jwk["x"]))
+                    for jwk in jwks.get("keys", []) if jwk.get("crv") == "Ed25519"})
+
+    def jwks(self) -> dict:
+        return {"keys": [public_jwk(kid, key) for kid, key in self.public_keys.items()]}
+
+    def check_signature(self, header_b64: str, payload_b64: str, signature_b64: str) -> bool:
+        key = self.headers.get(header_b64)
+        if key is None:
+            return False
+        try:
+            key.verify(_b64decode(signature_b64), f"{header_b64}.{payload_b64}".encode())
+            return True
+        except (InvalidSignature, ValueError):
+            return False
+
+    # standalone check for other services: signature and expiry only, revocations live with the API
+    def verify(self, session_token: str) -> dict:
+        try:
+            header_b64, payload_b64, signature_b64 = session_token.split('.')
+        except ValueError:
+            raise ValueError("Invalid session token format")
+
+        if not self.check_signature(header_b64, payload_b64, signature_b64):
+            raise ValueError("Invalid session token signature")
+
+        try:
+            claims = json.loads(_b64decode(payload_b64))
+        except Exception:
+            raise ValueError("Invalid session token payload")
+
+        if claims.get('exp', 0) < int(time.time()):
+            raise ValueError("Session token has expired")
+        return claims
@@ -9,6 +9,9 @@ class LoginRequest(BaseModel):
     username: str
     password: str
 
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
 class ExchangePublicTokenRequest(BaseModel):
     public_token: str
 
@@ -0,0 +1,37 @@
+from pydantic import BaseModel, ConfigDict
+
+class MessageResponse(BaseModel):
+    message: str
+
+class ErrorResponse(BaseModel):
+    error: str
+
+# login adds link_token, refresh_token is only there with refresh tokens enabled
+class SessionTokens(BaseModel):
+    jwt_token: str
+    refresh_token: str | None = None
+    link_token: str | None = None
+
+# item_data as stored for the item plus its item_id as id, item_data may carry fields not listed here
+class LinkedAccount(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    id: str
+    products: list[str] | None = None
+    consented_products: list[str] | None = None
+    creation_date: str | None = None
+    institution_name: str | None = None
+    nickname: str | None = None
+
+class PublicKey(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    kty: str
+    crv: str
+    kid: str
+    x: str
+    alg: str | None = None
+    use: str | None = None
+
+class PublicKeys(BaseModel):
+    keys: list[PublicKey]
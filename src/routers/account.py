@@ -1,21 +1,22 @@
 from fastapi import APIRouter, Depends, Request, Response, status
 
-from src.helpers.dependencies import get_account_db, get_item_db, get_session_manager, get_logger, get_plaid_client
+from src.helpers.dependencies import get_account_db, get_item_db, get_session_manager, get_logger, get_plaid_client, require_user, optional_user
 from src.helpers.encryption import pwd_hash
-from src.requests.bodies import CreateAccountRequest, LoginRequest
+from src.requests.bodies import CreateAccountRequest, LoginRequest, RefreshRequest
+from src.requests.responses import ErrorResponse, MessageResponse, PublicKeys, SessionTokens
 
 import uuid
 import re
 
 router = APIRouter()
 
-@router.post('/create')
+@router.post('/create', response_model=MessageResponse | ErrorResponse)
 async def create_account(request_body: CreateAccountRequest, response: Response, 
                          account_db = Depends(get_account_db), item_db = Depends(get_item_db),
                          logger = Depends(get_logger)):
     logger.debug("Account Create Attempt", path='/create', route='/account')
     
-    if account_db.find_by_field("user", request_body.username):
+    if await account_db.find_by_field("user", request_body.username):
         response.status_code = status.HTTP_400_BAD_REQUEST
         logger.warning("Username already exists", user=request_body.username)
         return {"error": "Username already exists"}
@@ -23,7 +24,7 @@ async def create_account(request_body: CreateAccountRequest, response: Response,
         response.status_code = status.HTTP_400_BAD_REQUEST
         logger.warning("Invalid email format", email=request_body.email)
         return {"error": "Invalid email format"}
-    if account_db.find_by_field("email", request_body.email):
+    if await account_db.find_by_field("email", request_body.email):
         response.status_code = status.HTTP_400_BAD_REQUEST
         logger.warning("Email already exists", email=request_body.email)
         return {"error": "Email already exists"}
@@ -35,23 +36,23 @@ async def create_account(request_body: CreateAccountRequest, response: Response,
         "password": pwd_hash(request_body.password)
     }
     
-    account_db.insert(account_data)
-    item_db.insert(account_data['user_id'])
+    await account_db.insert(account_data)
+    await item_db.insert(account_data['user_id'])
     logger.debug("Successfully created account for user", user=request_body.username)
     return {"message": "Account created successfully"}
 
-@router.post('/login')
+@router.post('/login', response_model=SessionTokens | ErrorResponse, response_model_exclude_unset=True)
 async def login(request_body: LoginRequest, response: Response, 
                 account_db = Depends(get_account_db), session_manager = Depends(get_session_manager), 
                 plaid = Depends(get_plaid_client), logger = Depends(get_logger)):
     logger.debug("Login Attempt", user=request_body.username, path='/login', route='/account')
 
-    account = account_db.validate_credentials(request_body.username, pwd_hash(request_body.password))
+    account = await account_db.validate_credentials(request_body.username, pwd_hash(request_body.password))
 
     if account:
         try:
             link_token = await plaid.create_link_token(account['user_id'])
-            return {"jwt_token": session_manager.create(account['user_id']), "link_token": link_token}
+            return {**session_manager.create_session(account['user_id']), "link_token": link_token}
         except Exception as e:
             logger.error("Exception while creating link token", exception=str(e))
             response.status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -60,8 +61,21 @@ async def login(request_body: LoginRequest, response: Response,
         response.status_code = status.HTTP_401_UNAUTHORIZED
         return {"error": "Invalid credentials"}
 
+# new access/refresh tokens from a refresh token, skips password hashing and plaid
+@router.post('/refresh', response_model=SessionTokens | ErrorResponse, response_model_exclude_unset=True)
+async def refresh(request_body: RefreshRequest, response: Response,
+                  session_manager = Depends(get_session_manager), logger = Depends(get_logger)):
+    logger.debug("Token Refresh", path='/refresh', route='/account')
+    try:
+        return await session_manager.refresh(request_body.refresh_token)
+    except Exception as e:
+        logger.warning("Token refresh rejected", exception=str(e), path='/refresh', route='/account')
+        response.status_code = status.HTTP_401_UNAUTHORIZED
+        return {"error": "Invalid or expired refresh token"}
+
 @router.get('/logout')
-async def logout(request: Request, response: Response, session_manager = Depends(get_session_manager), logger=Depends(get_logger)):
+async def logout(request: Request, response: Response, session_manager = Depends(get_session_manager), logger=Depends(get_logger),
+                 _user_id = Depends(optional_user)):
     logger.debug("Logging Out", path='/logout', route='/account')
     auth = request.headers.get('Authorization')
     if not auth:
@@ -80,5 +94,18 @@ async def logout(request: Request, response: Response, session_manager = Depends
         response.status_code = status.HTTP_400_BAD_REQUEST
         return {"error": "Malformed Authorization header"}
 
-    session_manager.invalidate(session_token)
-    response.status_code = status.HTTP_204_NO_CONTENT
\ No newline at end of file
+    await session_manager.invalidate(session_token)
+    response.status_code = status.HTTP_204_NO_CONTENT
+
+# log out everywhere: every session of the user issued up to now stops validating
+@router.get('/logout/all')
+async def logout_all(response: Response, user_id = Depends(require_user),
+                     session_manager = Depends(get_session_manager), logger = Depends(get_logger)):
+    logger.debug("Logging Out Everywhere", path='/logout/all', route='/account')
+    await session_manager.invalidate_user(user_id)
+    response.status_code = status.HTTP_204_NO_CONTENT
+
+# public keys for verifying session tokens outside this service, empty unless Ed25519 signing is configured
+@router.get('/keys', response_model=PublicKeys, response_model_exclude_unset=True)
+async def public_keys(session_manager = Depends(get_session_manager)):
+    return session_manager.public_keys()
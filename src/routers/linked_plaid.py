@@ -2,10 +2,15 @@ from fastapi import APIRouter, Depends, Response, status
 
 from src.helpers.dependencies import get_item_db, get_logger, get_plaid_client, require_user
 from src.helpers.encryption import decrypt
+from src.helpers.responses import FastJSONResponse
 from src.requests.bodies import ExchangePublicTokenRequest, ItemDeleteRequest, ItemUpdateRequest
+from src.requests.responses import LinkedAccount
 
 router = APIRouter()
 
+# routes that only need the access token don't pull item_data out of the db
+TOKEN_FIELDS = ["item_id", "access_token"]
+
 @router.post('/exchange_public_token')
 async def exchange_public_token(request_body: ExchangePublicTokenRequest, response: Response,
                                 user_id = Depends(require_user),
@@ -28,7 +33,7 @@ async def exchange_public_token(request_body: ExchangePublicTokenRequest, respon
                      "creation_date": item_creation_date, "institution_name": institution_name}
 
         try:
-            item_db.append_item(user_id, item_id, access_token, data=item_data)
+            await item_db.append_item(user_id, item_id, access_token, data=item_data)
             response.status_code = status.HTTP_204_NO_CONTENT
         except ValueError:
             logger.error("Item already exists for user", path='/exchange_public_token', route='/plaid')
@@ -40,28 +45,25 @@ async def exchange_public_token(request_body: ExchangePublicTokenRequest, respon
         return {"error": "Failed to exchange public token"}
 
 
-@router.get('/accounts/get')
-async def get_linked_accounts(response: Response, 
-                              user_id = Depends(require_user),
+# item_data is stored as plain JSON, so the list goes out through FastJSONResponse without a pydantic
+# validation pass per item, the response_model documents the shape
+@router.get('/accounts/get', response_model=list[LinkedAccount], response_model_exclude_unset=True)
+async def get_linked_accounts(user_id = Depends(require_user),
                               item_db = Depends(get_item_db), 
                               logger = Depends(get_logger)):
     logger.debug("Getting all linked accounts for user", path='/accounts/get', route='/plaid')
     
-    linked_items = item_db.get_items(user_id)
+    linked_items = await item_db.get_items(user_id, fields=["item_id", "item_data"])
 
     if len(linked_items) == 0:
-        response.status_code = status.HTTP_204_NO_CONTENT
-        return linked_items
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
     
     response_json = []
 
     for item in linked_items:
-        item_data = item['item_data']
-        item_data.update( {"id": item['item_id']} )
-        response_json.append(item_data)
+        response_json.append({"id": item['item_id'], **item['item_data']})
     
-    response.status_code = status.HTTP_200_OK
-    return response_json
+    return FastJSONResponse(response_json, status_code=status.HTTP_200_OK)
 
 @router.put('/accounts/delete')
 async def delete_linked_account(request_body: ItemDeleteRequest, response: Response, 
@@ -72,7 +74,7 @@ async def delete_linked_account(request_body: ItemDeleteRequest, response: Respo
     logger.debug(f"Deleting item for user: {user_id}", path='/accounts/delete', route='/plaid')
 
     try:
-        access_token = item_db.get_item(user_id, request_body.item_id)['access_token']
+        access_token = (await item_db.get_item(user_id, request_body.item_id, fields=TOKEN_FIELDS))['access_token']
         access_token = decrypt(access_token)
     except:
         response.status_code = status.HTTP_400_BAD_REQUEST
@@ -87,7 +89,7 @@ async def delete_linked_account(request_body: ItemDeleteRequest, response: Respo
         return {"error": "Plaid failed to delete item from user"}
 
     try:
-        item_db.remove_item(user_id, request_body.item_id)
+        await item_db.remove_item(user_id, request_body.item_id)
         response.status_code = status.HTTP_204_NO_CONTENT
     except:
         response.status_code = status.HTTP_400_BAD_REQUEST
@@ -104,7 +106,7 @@ async def update_account(request_body: ItemUpdateRequest, response: Response,
 
     if not request_body.item_data: #only item_id is passed then cycle access_token
         try:
-            access_token = item_db.get_item(user_id, item_id)['access_token']
+            access_token = (await item_db.get_item(user_id, item_id, fields=TOKEN_FIELDS))['access_token']
             access_token = decrypt(access_token)
         except:
             response.status_code = status.HTTP_400_BAD_REQUEST
@@ -117,7 +119,7 @@ async def update_account(request_body: ItemUpdateRequest, response: Response,
             return {"error": "Failed to invalidate access token"}
         
         try:
-            item_db.update_item_field(user_id, item_id, "access_token", new_access_token)
+            await item_db.update_item_fields(user_id, item_id, {"access_token": new_access_token})
             response.status_code = status.HTTP_204_NO_CONTENT
         except:
             # TODO: might want to consider deleting item from db if fail to update access token
@@ -126,26 +128,16 @@ async def update_account(request_body: ItemUpdateRequest, response: Response,
             response.status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
             return {"error": "Failed to update access token in item db"}
 
-    else: #item_data is passed, update item_data in db with new item_data
-        new_item_data = request_body.item_data
+    else: #item_data is passed, set only the provided item_data sub-fields in a single write
+        fields = {f"item_data.{k}": v for k, v in request_body.item_data if k and v}
+        logger.debug(f"updating item_data fields: {list(fields)}")
 
         try:
-            item_data = item_db.get_item(user_id, item_id)['item_data']
-            logger.debug(f"got item_data: {item_data}")
-        except:
+            await item_db.update_item_fields(user_id, item_id, fields)
+            response.status_code = status.HTTP_204_NO_CONTENT
+        except ValueError:
             response.status_code = status.HTTP_400_BAD_REQUEST
             return {"error": "Could not find item_id for user"}
-        
-        for k,v in new_item_data:
-            logger.debug(f"{k}: {v}, {type(k)}: {type(v)}, {type(item_data)}")
-            if k and v:
-                item_data[k] = v
-
-        logger.debug(f"updated item_data: {item_data}")
-
-        try:
-            item_db.update_item_field(user_id, item_id, "item_data", item_data)
-            response.status_code = status.HTTP_204_NO_CONTENT
         except:
             response.status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
             return {"error": "Failed to update access token in item db"}
\ No newline at end of file
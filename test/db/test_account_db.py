@@ -1,6 +1,7 @@
-from src.db.account_db import AccountDB
+from src.db.account_db import AccountDB, AsyncAccountDB
 
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, AsyncMock
+import pytest
 import logging
 
 def account_db_with_mocks() -> AccountDB:
@@ -224,8 +225,109 @@ def test_db_account_validate_credentials_negative_empty_password():
 def test_db_account_close():
     account_db, mock_collection, _ = account_db_with_mocks()
 
+    account_db.connection = MagicMock()
+
     # Call close method
     account_db.close()
 
-    # Verify that collection.database.client.close was called
-    mock_collection.database.client.close.assert_called_once()
\ No newline at end of file
+    # Verify that the shared connection handle was released
+    account_db.connection.close.assert_called_once()
+
+
+def async_account_db_with_mocks() -> AsyncAccountDB:
+    # Setup mocks; collection methods are awaited by AsyncAccountDB
+    mock_logger = MagicMock(spec=logging.Logger)
+    mock_collection = AsyncMock()
+
+    accountDB = AsyncAccountDB.__new__(AsyncAccountDB)
+    accountDB.collection = mock_collection
+    accountDB.logger = mock_logger
+    return accountDB, mock_collection, mock_logger
+
+def test_db_async_account_init():
+    mock_logger = MagicMock(spec=logging.Logger)
+    mock_collection = AsyncMock()
+
+    mock_db = MagicMock()
+    mock_db.accounts = mock_collection
+
+    mock_db_instance = MagicMock()
+    mock_db_instance.get_db.return_value = mock_db
+
+    mock_db_factory = MagicMock()
+    mock_db_factory.return_value = mock_db_instance
+
+    account_db = AsyncAccountDB(env="test", logger=mock_logger, db_factory=mock_db_factory)
+
+    mock_db_factory.assert_called_once_with("test")
+    assert account_db.collection == mock_collection
+    mock_logger.debug.assert_called_with("AsyncAccountDB initialized.")
+
+@pytest.mark.asyncio
+async def test_db_async_account_insert_positive():
+    accountDB, mock_collection, mock_logger = async_account_db_with_mocks()
+
+    test_account_data = {"user": "test_user", "password": "test_password"}
+    await accountDB.insert(test_account_data)
+
+    mock_collection.insert_one.assert_awaited_once_with(test_account_data)
+    mock_logger.debug.assert_any_call("Insertion complete.")
+
+@pytest.mark.asyncio
+async def test_db_async_account_insert_negative_invalid_data():
+    accountDB, mock_collection, _ = async_account_db_with_mocks()
+
+    try:
+        await accountDB.insert("invalid_data")
+        assert False, "Expected ValueError for invalid account data type"
+    except ValueError as e:
+        assert str(e) == "Invalid account data provided for insertion."
+        mock_collection.insert_one.assert_not_awaited()
+
+@pytest.mark.asyncio
+async def test_db_async_account_find_by_field_positive_data():
+    account_db, mock_collection, _ = async_account_db_with_mocks()
+
+    mock_collection.find_one.return_value = {"user": "testuser", "password": "testpassword", "_id": "12345"}
+
+    result = await account_db.find_by_field("user", "testuser")
+
+    mock_collection.find_one.assert_awaited_once_with({"user": "testuser"})
+    assert result == {"user": "testuser"}
+
+@pytest.mark.asyncio
+async def test_db_async_account_find_by_field_positive_no_data():
+    account_db, mock_collection, _ = async_account_db_with_mocks()
+    mock_collection.find_one.return_value = None
+
+    assert await account_db.find_by_field("user", "testuser") is None
+
+@pytest.mark.asyncio
+async def test_db_async_account_validate_credentials():
+    account_db, mock_collection, _ = async_account_db_with_mocks()
+    mock_collection.find_one.return_value = {"user": "testuser", "password": "hashed", "_id": "12345"}
+
+    assert await account_db.validate_credentials("testuser", "hashed") == {"user": "testuser"}
+
+    mock_collection.find_one.return_value = {"user": "testuser", "password": "hashed", "_id": "12345"}
+    assert await account_db.validate_credentials("testuser", "wrong") is None
+
+@pytest.mark.asyncio
+async def test_db_async_account_validate_credentials_negative_invalid_input():
+    account_db, _, _ = async_account_db_with_mocks()
+
+    try:
+        await account_db.validate_credentials("", "password")
+        assert False, "Expected ValueError for empty username"
+    except ValueError as e:
+        assert str(e) == "Invalid username or password provided for validation."
+
+@pytest.mark.asyncio
+async def test_db_async_account_close():
+    account_db, mock_collection, _ = async_account_db_with_mocks()
+
+    account_db.connection = AsyncMock()
+
+    await account_db.close()
+
+    account_db.connection.close.assert_awaited_once()
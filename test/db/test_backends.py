@@ -0,0 +1,76 @@
+from src.db.backends import build_account_db, build_item_db, build_index_manager, build_revocation_db, build_idempotency_db, backend_name
+from src.db.idempotency_db import MemoryIdempotencyDB
+from src.db.cached_item_db import CachedItemDB
+from src.db.sqlite import SQLiteAccountDB, SQLiteRevocationDB
+from src.helpers.settings import Settings
+
+from unittest.mock import MagicMock, patch
+import pytest
+import logging
+
+def test_db_backend_name():
+    assert backend_name({}) == "mongo"
+    assert backend_name({"BACKEND": "sqlite"}) == "sqlite"
+
+    with pytest.raises(ValueError, match="Unknown db backend: redis"):
+        backend_name({"BACKEND": "redis"})
+
+def test_db_build_item_db_selects_layout():
+    mock_logger = MagicMock(spec=logging.Logger)
+
+    with patch("src.db.backends.resolve_settings") as mock_env, \
+         patch("src.db.backends.AsyncNormalizedItemDB") as mock_normalized, \
+         patch("src.db.backends.AsyncItemDB") as mock_embedded:
+        mock_env.return_value = {"db": {"ITEM_LAYOUT": "normalized", "ITEM_LEGACY_FALLBACK": True}}
+        assert build_item_db("test", mock_logger) == mock_normalized.return_value
+        mock_normalized.assert_called_once_with("test", mock_logger, legacy_fallback=True)
+
+        mock_env.return_value = {"db": {}}
+        assert build_item_db("test", mock_logger) == mock_embedded.return_value
+
+        mock_env.return_value = {"db": {"ITEM_CACHE": {"MAX_USERS": 5, "TTL_SECONDS": 30}}}
+        mock_embedded.return_value.logger = mock_logger
+        cached = build_item_db("test", mock_logger)
+        assert isinstance(cached, CachedItemDB)
+        assert (cached.cache.max_size, cached.cache.ttl_seconds) == (5, 30)
+
+def test_db_build_selects_sqlite_backend():
+    mock_logger = MagicMock(spec=logging.Logger)
+
+    with patch("src.db.backends.resolve_settings") as mock_env, \
+         patch("src.db.backends.SQLiteAccountDB") as mock_accounts, \
+         patch("src.db.backends.SQLiteItemDB") as mock_items, \
+         patch("src.db.backends.SQLiteIndexManager") as mock_indexes, \
+         patch("src.db.backends.SQLiteRevocationDB") as mock_sqlite_revocations, \
+         patch("src.db.backends.AsyncAccountDB") as mock_mongo_accounts, \
+         patch("src.db.backends.IndexManager") as mock_mongo_indexes, \
+         patch("src.db.backends.RevocationDB") as mock_revocations, \
+         patch("src.db.backends.IdempotencyDB") as mock_idempotency:
+        mock_env.return_value = {"db": {"BACKEND": "sqlite", "ITEM_LAYOUT": "normalized"}}
+        assert build_account_db("test", mock_logger) == mock_accounts.return_value
+        assert build_item_db("test", mock_logger) == mock_items.return_value
+        assert build_index_manager("test", mock_logger) == mock_indexes.return_value
+        assert build_revocation_db("test", mock_logger) == mock_sqlite_revocations.return_value
+        assert isinstance(build_idempotency_db("test", mock_logger), MemoryIdempotencyDB)
+
+        mock_env.return_value = {"db": {}}
+        assert build_account_db("test", mock_logger) == mock_mongo_accounts.return_value
+        assert build_index_manager("test", mock_logger) == mock_mongo_indexes.return_value
+        assert build_revocation_db("test", mock_logger) == mock_revocations.return_value
+        assert build_idempotency_db("test", mock_logger) == mock_idempotency.return_value
+
+@pytest.mark.asyncio
+async def test_db_build_uses_settings_db_section(tmp_path):
+    mock_logger = MagicMock(spec=logging.Logger)
+    path = str(tmp_path / "custom.db")
+    settings = Settings(env="test", plaid={}, session={}, db={"BACKEND": "sqlite", "SQLITE_PATH": path})
+
+    with patch("src.helpers.settings.get_settings") as mock_env:
+        account_db = build_account_db(settings, mock_logger)
+        revocations = build_revocation_db(settings, mock_logger)
+    mock_env.assert_not_called()
+
+    assert isinstance(account_db, SQLiteAccountDB) and isinstance(revocations, SQLiteRevocationDB)
+    assert account_db.connection.path == revocations.connection.path == path
+    await account_db.close()
+    await revocations.close()
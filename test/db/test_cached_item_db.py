@@ -0,0 +1,186 @@
+from src.db.cached_item_db import CachedItemDB, CACHED_FIELDS
+from src.db.item_db import NOT_ATTEMPTED
+from src.helpers.cache import LRUCache
+
+from unittest.mock import MagicMock, AsyncMock
+import pytest
+import logging
+
+def cached_item_db_with_mocks():
+    mock_item_db = AsyncMock()
+    mock_item_db.logger = MagicMock(spec=logging.Logger)
+    mock_item_db.get_items.return_value = [
+        {"item_id": "i1", "item_data": {"k": "v"}},
+        {"item_id": "i2", "item_data": {"k2": "v2"}}
+    ]
+    cached = CachedItemDB(mock_item_db, LRUCache(10, 60))
+    return cached, mock_item_db
+
+@pytest.mark.asyncio
+async def test_db_cached_item_get_items_reads_through_once():
+    cached, mock_item_db = cached_item_db_with_mocks()
+
+    first = await cached.get_items("u1", fields=["item_id"])
+    second = await cached.get_items("u1", fields=["item_id", "item_data"])
+
+    mock_item_db.get_items.assert_awaited_once_with("u1", fields=CACHED_FIELDS)
+    assert first == [{"item_id": "i1"}, {"item_id": "i2"}]
+    assert second == [{"item_id": "i1", "item_data": {"k": "v"}}, {"item_id": "i2", "item_data": {"k2": "v2"}}]
+    assert cached.cache_stats()["hits"] == 1
+    assert cached.cache_stats()["misses"] == 1
+
+@pytest.mark.asyncio
+async def test_db_cached_item_results_are_copies():
+    cached, _ = cached_item_db_with_mocks()
+
+    items = await cached.get_items("u1", fields=CACHED_FIELDS)
+    items[0]["item_data"]["id"] = "i1" # routes decorate results in place
+
+    assert "id" not in (await cached.get_items("u1", fields=CACHED_FIELDS))[0]["item_data"]
+
+@pytest.mark.asyncio
+async def test_db_cached_item_get_item():
+    cached, mock_item_db = cached_item_db_with_mocks()
+
+    assert await cached.get_item("u1", "i2", fields=["item_data"]) == {"item_data": {"k2": "v2"}}
+    assert await cached.get_item("u1", "missing", fields=CACHED_FIELDS) is None
+    mock_item_db.logger.warning.assert_called_with("Item not found")
+    mock_item_db.get_items.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_db_cached_item_uncached_fields_bypass_cache():
+    cached, mock_item_db = cached_item_db_with_mocks()
+    mock_item_db.get_item.return_value = {"item_id": "i1", "access_token": "tok1"}
+
+    assert await cached.get_item("u1", "i1", fields=["item_id", "access_token"]) == {"item_id": "i1", "access_token": "tok1"}
+    await cached.get_item("u1", "i1")
+    await cached.get_items("u1")
+
+    mock_item_db.get_item.assert_awaited_with("u1", "i1", fields=None)
+    mock_item_db.get_items.assert_awaited_once_with("u1", fields=None)
+    assert len(cached.cache) == 0
+
+@pytest.mark.asyncio
+async def test_db_cached_item_nested_fields_bypass_cache():
+    cached, mock_item_db = cached_item_db_with_mocks()
+
+    await cached.get_items("u1", fields=["item_data.k"])
+
+    mock_item_db.get_items.assert_awaited_once_with("u1", fields=["item_data.k"])
+    assert len(cached.cache) == 0
+
+@pytest.mark.asyncio
+async def test_db_cached_item_writes_invalidate():
+    cached, mock_item_db = cached_item_db_with_mocks()
+
+    writes = [
+        lambda: cached.append_item("u1", "i3", "tok3", data={}),
+        lambda: cached.remove_item("u1", "i1"),
+        lambda: cached.update_item_field("u1", "i1", "item_data", {"k": "v"}),
+        lambda: cached.update_item_fields("u1", "i1", {"item_data.nickname": "n"}),
+        lambda: cached.insert("u1"),
+    ]
+    for write in writes:
+        await cached.get_items("u1", fields=CACHED_FIELDS)
+        assert len(cached.cache) == 1
+        await write()
+        assert len(cached.cache) == 0
+
+@pytest.mark.asyncio
+async def test_db_cached_item_failed_write_still_invalidates():
+    cached, mock_item_db = cached_item_db_with_mocks()
+    mock_item_db.append_item.side_effect = ValueError("Item already exists")
+
+    await cached.get_items("u1", fields=CACHED_FIELDS)
+    try:
+        await cached.append_item("u1", "i1", "tok")
+        assert False, "Expected ValueError from wrapped db"
+    except ValueError as e:
+        assert str(e) == "Item already exists"
+    assert len(cached.cache) == 0
+
+@pytest.mark.asyncio
+async def test_db_cached_item_read_racing_write_is_not_cached():
+    cached, mock_item_db = cached_item_db_with_mocks()
+
+    async def get_items_with_concurrent_write(user_id, fields):
+        await cached.remove_item(user_id, "i1") # write lands while the read is in flight
+        return [{"item_id": "i1"}]
+    mock_item_db.get_items.side_effect = get_items_with_concurrent_write
+
+    await cached.get_items("u1", fields=CACHED_FIELDS)
+
+    assert len(cached.cache) == 0
+    assert cached._pending == {}
+
+@pytest.mark.asyncio
+async def test_db_cached_item_write_for_another_user_keeps_read():
+    cached, mock_item_db = cached_item_db_with_mocks()
+
+    async def get_items_with_other_write(user_id, fields):
+        await cached.remove_item("u2", "i1") # only u2's reads are affected
+        return [{"item_id": "i1"}]
+    mock_item_db.get_items.side_effect = get_items_with_other_write
+
+    await cached.get_items("u1", fields=CACHED_FIELDS)
+
+    assert cached.cache.get("u1") == [{"item_id": "i1"}]
+    assert cached._pending == {}
+
+@pytest.mark.asyncio
+async def test_db_cached_item_close_and_passthrough():
+    cached, mock_item_db = cached_item_db_with_mocks()
+    await cached.get_items("u1", fields=CACHED_FIELDS)
+
+    await cached.close()
+
+    assert len(cached.cache) == 0
+    mock_item_db.close.assert_awaited_once()
+    assert cached.collection is mock_item_db.collection
+
+@pytest.mark.asyncio
+async def test_db_cached_item_bulk_writes_invalidate_touched_users():
+    cached, mock_item_db = cached_item_db_with_mocks()
+    await cached.get_items("u1", fields=CACHED_FIELDS)
+    await cached.get_items("u2", fields=CACHED_FIELDS)
+    mock_item_db.bulk_update_item_fields.return_value = [{"user_id": "u1", "item_id": "i1", "ok": True, "error": None}]
+
+    updates = iter([{"user_id": "u1", "item_id": "i1", "fields": {"item_data.tag": "x"}}])
+    outcomes = await cached.bulk_update_item_fields(updates, batch_size=10)
+
+    assert outcomes == mock_item_db.bulk_update_item_fields.return_value
+    mock_item_db.bulk_update_item_fields.assert_awaited_once_with([{"user_id": "u1", "item_id": "i1", "fields": {"item_data.tag": "x"}}], batch_size=10, ordered=False)
+    assert cached.cache.get("u1") is None
+    assert cached.cache.get("u2") is not None
+
+    mock_item_db.bulk_insert.side_effect = Exception("Database error")
+    with pytest.raises(Exception):
+        await cached.bulk_insert(["u2"])
+    assert cached.cache.get("u2") is None
+
+@pytest.mark.asyncio
+async def test_db_cached_item_bulk_writes_stream_batches():
+    cached, mock_item_db = cached_item_db_with_mocks()
+    await cached.get_items("u1", fields=CACHED_FIELDS)
+    await cached.get_items("u2", fields=CACHED_FIELDS)
+    seen = []
+
+    async def insert(batch, **options):
+        seen.append(list(batch))
+        # the first batch was invalidated before the second one is read from the input
+        assert cached.cache.get("u2") is not None
+        return [{"user_id": user_id, "ok": user_id != "u1", "error": None} for user_id in batch]
+    mock_item_db.bulk_insert.side_effect = insert
+
+    def user_ids():
+        yield "u1"
+        assert cached.cache.get("u1") is None
+        yield "u2"
+        yield "u3"
+
+    outcomes = await cached.bulk_insert(user_ids(), batch_size=1, ordered=True)
+
+    assert seen == [["u1"]]
+    assert [o["ok"] for o in outcomes] == [False, False, False]
+    assert outcomes[1]["error"] == NOT_ATTEMPTED
+    assert cached.cache.get("u2") is not None
@@ -0,0 +1,188 @@
+from src.db.idempotency_db import IdempotencyDB, MemoryIdempotencyDB
+from test.mocks.clock import FakeClock
+
+from datetime import datetime, UTC
+from pymongo.errors import DuplicateKeyError
+from unittest.mock import MagicMock, AsyncMock, patch
+import pytest
+import logging
+
+RECORD = {"fingerprint": "f", "status_code": 204, "headers": [], "body": b""}
+
+def idempotency_db_with_mocks() -> IdempotencyDB:
+    mock_logger = MagicMock(spec=logging.Logger)
+    mock_collection = AsyncMock()
+
+    idempotency_db = IdempotencyDB.__new__(IdempotencyDB)
+    idempotency_db.collection = mock_collection
+    idempotency_db.logger = mock_logger
+    return idempotency_db, mock_collection, mock_logger
+
+def test_db_idempotency_init():
+    mock_logger = MagicMock(spec=logging.Logger)
+    mock_db_factory = MagicMock()
+
+    idempotency_db = IdempotencyDB(env="test", logger=mock_logger, db_factory=mock_db_factory)
+
+    mock_db_factory.assert_called_once_with("test")
+    assert idempotency_db.collection == mock_db_factory.return_value.get_db.return_value.idempotency_keys
+    mock_logger.debug.assert_called_with("IdempotencyDB initialized.")
+
+@pytest.mark.asyncio
+async def test_db_idempotency_get_ignores_expired():
+    idempotency_db, mock_collection, _ = idempotency_db_with_mocks()
+    mock_collection.find_one.return_value = RECORD
+
+    assert await idempotency_db.get("key") == RECORD
+
+    query, projection = mock_collection.find_one.call_args[0]
+    assert query["_id"] == "key"
+    assert "$gt" in query["expires_at"]
+    assert projection == {"_id": 0, "expires_at": 0}
+
+@pytest.mark.asyncio
+async def test_db_idempotency_put_upserts_with_expiry():
+    idempotency_db, mock_collection, _ = idempotency_db_with_mocks()
+
+    with patch("src.db.idempotency_db.time.time", return_value=1700000000):
+        await idempotency_db.put("key", RECORD, 60)
+
+    # replacing drops the pending flag of the claim the record finishes
+    mock_collection.replace_one.assert_awaited_once_with(
+        {"_id": "key"}, {**RECORD, "expires_at": datetime.fromtimestamp(1700000060, UTC)}, upsert=True)
+
+@pytest.mark.asyncio
+async def test_db_idempotency_put_invalid_and_exception():
+    idempotency_db, mock_collection, mock_logger = idempotency_db_with_mocks()
+
+    with pytest.raises(ValueError, match="Invalid key, record or ttl_seconds provided for idempotency"):
+        await idempotency_db.put("", RECORD, 60)
+
+    mock_collection.replace_one.side_effect = Exception("Database error")
+    with pytest.raises(Exception, match="Database error"):
+        await idempotency_db.put("key", RECORD, 60)
+    mock_logger.error.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_db_idempotency_claim():
+    idempotency_db, mock_collection, _ = idempotency_db_with_mocks()
+
+    with patch("src.db.idempotency_db.time.time", return_value=1700000000):
+        assert await idempotency_db.claim("key", "f", 60) == (True, None)
+    mock_collection.insert_one.assert_awaited_once_with(
+        {"_id": "key", "fingerprint": "f", "pending": True, "expires_at": datetime.fromtimestamp(1700000060, UTC)})
+
+    # taken: the live record comes back, pending or finished
+    mock_collection.insert_one.side_effect = DuplicateKeyError("dup")
+    mock_collection.find_one.return_value = {"fingerprint": "f", "pending": True}
+    assert await idempotency_db.claim("key", "f", 60) == (False, {"fingerprint": "f", "pending": True})
+
+    # an expired record the TTL monitor hasn't dropped yet is taken over
+    mock_collection.find_one.return_value = None
+    mock_collection.replace_one.return_value = MagicMock(modified_count=1)
+    with patch("src.db.idempotency_db.time.time", return_value=1700000000):
+        assert await idempotency_db.claim("key", "f", 60) == (True, None)
+    query, replacement = mock_collection.replace_one.call_args[0]
+    assert query == {"_id": "key", "expires_at": {"$lte": datetime.fromtimestamp(1700000000, UTC)}}
+    assert replacement["pending"] is True
+
+    mock_collection.replace_one.return_value = MagicMock(modified_count=0)
+    assert await idempotency_db.claim("key", "f", 60) == (False, None)
+
+@pytest.mark.asyncio
+async def test_db_idempotency_claim_invalid_and_exception():
+    idempotency_db, mock_collection, mock_logger = idempotency_db_with_mocks()
+
+    with pytest.raises(ValueError, match="Invalid key, fingerprint or ttl_seconds provided for idempotency"):
+        await idempotency_db.claim("key", None, 60)
+
+    mock_collection.insert_one.side_effect = Exception("Database error")
+    with pytest.raises(Exception, match="Database error"):
+        await idempotency_db.claim("key", "f", 60)
+    mock_logger.error.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_db_idempotency_release_only_drops_pending_claims():
+    idempotency_db, mock_collection, mock_logger = idempotency_db_with_mocks()
+
+    await idempotency_db.release("key")
+
+    mock_collection.delete_one.assert_awaited_once_with({"_id": "key", "pending": True})
+    mock_collection.delete_one.side_effect = Exception("Database error")
+    with pytest.raises(Exception, match="Database error"):
+        await idempotency_db.release("key")
+    mock_logger.error.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_db_idempotency_close():
+    idempotency_db, _, _ = idempotency_db_with_mocks()
+    idempotency_db.connection = AsyncMock()
+
+    await idempotency_db.close()
+
+    idempotency_db.connection.close.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_db_memory_idempotency_expires_records():
+    clock = FakeClock(100.0)
+    idempotency_db = MemoryIdempotencyDB(clock=clock)
+
+    await idempotency_db.put("key", RECORD, 60)
+    assert await idempotency_db.get("key") == RECORD
+    assert await idempotency_db.get("other") is None
+
+    clock.now += 60
+    assert await idempotency_db.get("key") is None
+    assert idempotency_db.records == {}
+
+    with pytest.raises(ValueError, match="Invalid key, record or ttl_seconds provided for idempotency"):
+        await idempotency_db.put("key", RECORD, 1.5)
+
+@pytest.mark.asyncio
+async def test_db_memory_idempotency_drops_expired_records_on_put():
+    clock = FakeClock(100.0)
+    idempotency_db = MemoryIdempotencyDB(clock=clock)
+
+    for n in range(3):
+        await idempotency_db.put(f"old{n}", RECORD, 60)
+    await idempotency_db.put("old0", RECORD, 120) # stored again, the first expiry is stale
+    clock.now += 60
+
+    await idempotency_db.put("new", RECORD, 60)
+
+    assert set(idempotency_db.records) == {"old0", "new"}
+    clock.now += 60
+    assert await idempotency_db.cleanup() == 2
+    assert idempotency_db.records == {} and idempotency_db._expiries == []
+
+@pytest.mark.asyncio
+async def test_db_memory_idempotency_bounded_size():
+    clock = FakeClock(100.0)
+    idempotency_db = MemoryIdempotencyDB(clock=clock, max_records=2)
+
+    await idempotency_db.put("a", RECORD, 30)
+    await idempotency_db.put("b", RECORD, 90)
+    await idempotency_db.put("c", RECORD, 60)
+
+    assert set(idempotency_db.records) == {"b", "c"}
+    with pytest.raises(ValueError, match="Invalid max_records provided for idempotency"):
+        MemoryIdempotencyDB(max_records=0)
+
+@pytest.mark.asyncio
+async def test_db_memory_idempotency_claim_and_release():
+    clock = FakeClock(100.0)
+    idempotency_db = MemoryIdempotencyDB(clock=clock)
+
+    assert await idempotency_db.claim("key", "f", 60) == (True, None)
+    assert await idempotency_db.claim("key", "f", 60) == (False, {"fingerprint": "f", "pending": True})
+
+    await idempotency_db.release("key")
+    assert await idempotency_db.claim("key", "f", 60) == (True, None)
+    await idempotency_db.put("key", RECORD, 120)
+    await idempotency_db.release("key") # a finished record stays
+    assert await idempotency_db.claim("key", "f", 60) == (False, RECORD)
+
+    # a claim whose lease ran out can be taken again
+    assert await idempotency_db.claim("other", "f", 60) == (True, None)
+    clock.now += 60
+    assert await idempotency_db.claim("other", "f", 60) == (True, None)
@@ -0,0 +1,96 @@
+from src.db.indexes import IndexManager, INDEXES
+
+from unittest.mock import MagicMock, AsyncMock
+from pymongo import IndexModel
+import pytest
+import logging
+
+def index_manager_with_mocks(indexes=None) -> IndexManager:
+    mock_logger = MagicMock(spec=logging.Logger)
+    collections = {}
+
+    def get_collection(name):
+        if name not in collections:
+            collections[name] = AsyncMock()
+        return collections[name]
+
+    mock_db = MagicMock()
+    mock_db.__getitem__.side_effect = get_collection
+
+    index_manager = IndexManager.__new__(IndexManager)
+    index_manager.db = mock_db
+    index_manager.indexes = indexes if indexes is not None else INDEXES
+    index_manager.logger = mock_logger
+    return index_manager, collections, mock_logger
+
+def test_db_indexes_declared():
+    declared = {name: [model.document for model in models] for name, models in INDEXES.items()}
+
+    accounts = {tuple(doc["key"].keys()): doc for doc in declared["accounts"]}
+    items = {tuple(doc["key"].keys()): doc for doc in declared["items"]}
+
+    for key in [("user",), ("email",), ("user_id",)]:
+        assert accounts[key]["unique"] is True
+    assert items[("user_id",)]["unique"] is True
+    assert ("items.item_id",) in items
+    assert declared["revoked_sessions"][0]["expireAfterSeconds"] == 0
+
+def test_db_indexes_init():
+    mock_logger = MagicMock(spec=logging.Logger)
+    mock_db_factory = MagicMock()
+
+    index_manager = IndexManager(env="test", logger=mock_logger, db_factory=mock_db_factory)
+
+    mock_db_factory.assert_called_once_with("test")
+    assert index_manager.db == mock_db_factory.return_value.get_db.return_value
+    assert index_manager.indexes is INDEXES
+
+@pytest.mark.asyncio
+async def test_db_indexes_ensure_reports_built():
+    index_manager, collections, _ = index_manager_with_mocks({"accounts": [IndexModel("user", name="user_unique"), IndexModel("email", name="email_unique")]})
+
+    collection = AsyncMock()
+    collection.index_information.return_value = {"_id_": {}, "user_unique": {}}
+    collection.create_indexes.return_value = ["user_unique", "email_unique"]
+    collections["accounts"] = collection
+
+    built = await index_manager.ensure_indexes()
+
+    collection.create_indexes.assert_awaited_once()
+    assert built == {"accounts": ["email_unique"]}
+
+@pytest.mark.asyncio
+async def test_db_indexes_ensure_idempotent():
+    index_manager, collections, _ = index_manager_with_mocks({"items": [IndexModel("user_id", name="user_id_unique")]})
+
+    collection = AsyncMock()
+    collection.index_information.return_value = {"_id_": {}, "user_id_unique": {}}
+    collection.create_indexes.return_value = ["user_id_unique"]
+    collections["items"] = collection
+
+    assert await index_manager.ensure_indexes() == {"items": []}
+
+@pytest.mark.asyncio
+async def test_db_indexes_ensure_exception():
+    index_manager, collections, mock_logger = index_manager_with_mocks({"items": [IndexModel("user_id", name="user_id_unique")]})
+
+    collection = AsyncMock()
+    collection.index_information.return_value = {"_id_": {}}
+    collection.create_indexes.side_effect = Exception("duplicate key")
+    collections["items"] = collection
+
+    try:
+        await index_manager.ensure_indexes()
+        assert False, "Expected Exception when index creation fails"
+    except Exception as e:
+        assert str(e) == "duplicate key"
+        mock_logger.error.assert_called_with("Failed to create indexes on %s: %s", "items", e)
+
+@pytest.mark.asyncio
+async def test_db_indexes_close():
+    index_manager, _, _ = index_manager_with_mocks()
+    index_manager.connection = AsyncMock()
+
+    await index_manager.close()
+
+    index_manager.connection.close.assert_awaited_once()
@@ -1,6 +1,9 @@
-from src.db.item_db import ItemDB
+from src.db.item_db import ItemDB, AsyncItemDB, _append_item_update, NOT_ATTEMPTED, UNCONFIRMED
 
-from unittest.mock import MagicMock, patch
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
+
+from unittest.mock import MagicMock, AsyncMock, patch
 import pytest
 import logging
 
@@ -107,39 +110,43 @@ def test_db_item_insert_exception():
 def test_db_item_append_item_success():
     itemDB, mock_collection, mock_logger = item_db_with_mocks()
 
-    # Setup mock to simulate existing user_id
-    mock_collection.find_one.side_effect = [
-        {"user_id": "test_user_id", "items": []},  # For user_id check
-        None  # For existing item check
-    ]
+    # Setup mock to simulate existing user_id without the item (pre-update document)
+    mock_collection.find_one_and_update.return_value = {}
 
     # Call append_item method
     itemDB.append_item("test_user_id", "item_123", "access_token_abc")
 
-    # Verify that collection.update_one was called with correct data
-    mock_collection.update_one.assert_called_once_with(
-        {"user_id": "test_user_id"}, 
-        {"$push": {"items": {"item_id": "item_123", "access_token": "access_token_abc", "last_updatated": None, "item_data": None}}}
+    # Verify a single conditional update was issued with the expected item
+    pipeline, projection = _append_item_update("item_123", "access_token_abc", None)
+    mock_collection.find_one_and_update.assert_called_once_with(
+        {"user_id": "test_user_id"}, pipeline,
+        projection=projection, return_document=ReturnDocument.BEFORE
     )
+    mock_collection.find_one.assert_not_called()
+    mock_collection.update_one.assert_not_called()
 
 def test_db_item_append_item_success_with_data():
     itemDB, mock_collection, mock_logger = item_db_with_mocks()
 
-    # Setup mock to simulate existing user_id
-    mock_collection.find_one.side_effect = [
-        {"user_id": "test_user_id", "items": []},  # For user_id check
-        None  # For existing item check
-    ]
+    mock_collection.find_one_and_update.return_value = {"items": []}
 
     # Call append_item method
     test_item_data = {"test_field": "test_val"}
     itemDB.append_item("test_user_id", "item_123", "access_token_abc", data=test_item_data)
 
-    # Verify that collection.update_one was called with correct data
-    mock_collection.update_one.assert_called_once_with(
-        {"user_id": "test_user_id"}, 
-        {"$push": {"items": {"item_id": "item_123", "access_token": "access_token_abc", "last_updatated": None, "item_data": test_item_data}}}
-    )
+    pipeline = mock_collection.find_one_and_update.call_args[0][1]
+    appended = pipeline[0]["$set"]["items"]["$cond"][2]["$concatArrays"][1][0]["$literal"]
+    assert appended == {"item_id": "item_123", "access_token": "access_token_abc", "last_updatated": None, "item_data": test_item_data}
+
+def test_db_item_append_item_update_pipeline():
+    pipeline, projection = _append_item_update("item_123", "$tok", {"k": "$v"})
+
+    cond = pipeline[0]["$set"]["items"]["$cond"]
+    # duplicate check and appended values are literals, not field paths
+    assert cond[0] == {"$in": [{"$literal": "item_123"}, {"$ifNull": ["$items.item_id", []]}]}
+    assert cond[1] == {"$ifNull": ["$items", []]}
+    assert cond[2]["$concatArrays"][1][0]["$literal"]["access_token"] == "$tok"
+    assert projection == {"_id": 0, "items": {"$elemMatch": {"item_id": "item_123"}}}
 
 # NEGATIVE tests for append_item method
 def test_db_item_append_item_invalid_user_id():
@@ -199,8 +206,8 @@ def test_db_item_append_item_empty_access_token():
 def test_db_item_append_item_user_id_not_found():
     itemDB, mock_collection, _ = item_db_with_mocks()
 
-    # Setup mock to simulate user_id not found
-    mock_collection.find_one.return_value = None
+    # Setup mock to simulate user_id not found (no document matched)
+    mock_collection.find_one_and_update.return_value = None
 
     try:
         itemDB.append_item("nonexistent_user_id", "item_123", "access_token_abc")
@@ -211,38 +218,27 @@ def test_db_item_append_item_user_id_not_found():
 def test_db_item_append_item_item_already_exists():
     itemDB, mock_collection, _ = item_db_with_mocks()
 
-    # Setup mock to simulate existing user_id and existing item
-    mock_collection.find_one.side_effect = [
-        {"user_id": "test_user_id", "items": [{"item_id": "item_123", "access_token": "access_token_123"}]},  # For user_id check
-        {"user_id": "test_user_id", "items": [{"item_id": "item_123", "access_token": "access_token_abc"}]}  # For existing item check
-    ]
+    # Setup mock to simulate existing user_id where projection matched the item
+    mock_collection.find_one_and_update.return_value = {"items": [{"item_id": "item_123", "access_token": "access_token_123"}]}
 
     try:
         itemDB.append_item("test_user_id", "item_123", "access_token_abc")
         assert False, "Expected ValueError for item already exists"
     except ValueError as e:
         assert str(e) == "Item already exists"
+        mock_collection.find_one_and_update.assert_called_once()
 
 def test_db_item_append_item_exception():
     itemDB, mock_collection, mock_logger = item_db_with_mocks()
 
-    # Setup mock to simulate existing user_id and no existing item
-    mock_collection.find_one.side_effect = [
-        {"user_id": "test_user_id", "items": []},  # For user_id check
-        None  # For existing item check
-    ]
-
-    # Setup mock to raise exception on update_one
-    mock_collection.update_one.side_effect = Exception("Database error")
+    # Setup mock to raise exception on find_one_and_update
+    mock_collection.find_one_and_update.side_effect = Exception("Database error")
 
     try:
         itemDB.append_item("test_user_id", "item_123", "access_token_abc")
         assert False, "Expected Exception for database error during append_item"
     except Exception as e:
-        mock_collection.update_one.assert_called_once_with(
-            {"user_id": "test_user_id"}, 
-            {"$push": {"items": {"item_id": "item_123", "access_token": "access_token_abc", "last_updatated": None, "item_data": None}}}
-            )
+        mock_collection.find_one_and_update.assert_called_once()
         assert str(e) == "Database error"
         mock_logger.error.assert_called_with("Failed to append item: %s", e)
 
@@ -252,35 +248,78 @@ def test_db_item_get_items_success():
 
     # Setup mock to simulate existing user_id with items
     mock_collection.find_one.return_value = {
-        "user_id": "test_user_id",
         "items": [{"item_id": "12345", "access_token": "acces_token"}]
     }
 
     # Call get_items method
     result = itemDB.get_items("test_user_id")
 
-    # Verify that collection.find_one was called with correct query and result is correct
-    mock_collection.find_one.assert_called_once_with({"user_id": "test_user_id"})
+    # Verify that collection.find_one was called with correct query and projection and result is correct
+    mock_collection.find_one.assert_called_once_with({"user_id": "test_user_id"}, {"_id": 0, "items": 1})
     assert result == [{"item_id": "12345", "access_token": "acces_token"}]
 
+def test_db_item_get_items_with_fields():
+    itemDB, mock_collection, mock_logger = item_db_with_mocks()
+
+    mock_collection.find_one.return_value = {"items": [{"item_id": "12345", "item_data": {"k": "v"}}]}
+
+    result = itemDB.get_items("test_user_id", fields=["item_id", "item_data"])
+
+    # only the requested sub-fields are projected, access tokens stay in the db
+    mock_collection.find_one.assert_called_once_with({"user_id": "test_user_id"}, {"_id": 0, "items.item_id": 1, "items.item_data": 1})
+    assert result == [{"item_id": "12345", "item_data": {"k": "v"}}]
+
+def test_db_item_get_items_invalid_fields():
+    itemDB, mock_collection, _ = item_db_with_mocks()
+
+    for fields in ["item_id", [""], [1]]:
+        try:
+            itemDB.get_items("test_user_id", fields=fields)
+            assert False, "Expected ValueError for invalid fields"
+        except ValueError as e:
+            assert str(e) == "Invalid fields provided for retrieving items"
+    mock_collection.find_one.assert_not_called()
+
 
 # New tests for get_item (added for refactor coverage)
 def test_db_item_get_item_success():
     itemDB, mock_collection, mock_logger = item_db_with_mocks()
 
-    mock_collection.find_one.return_value = {
-        "user_id": "test_user_id",
-        "items": [{"item_id": "item_1", "access_token": "tok"}, {"item_id": "item_2", "access_token": "tok2"}]
-    }
+    # $elemMatch projection returns only the matching item
+    mock_collection.find_one.return_value = {"items": [{"item_id": "item_2", "access_token": "tok2"}]}
 
     result = itemDB.get_item("test_user_id", "item_2")
+    mock_collection.find_one.assert_called_once_with({"user_id": "test_user_id"}, {"_id": 0, "items": {"$elemMatch": {"item_id": "item_2"}}})
     assert result == {"item_id": "item_2", "access_token": "tok2"}
 
 
+def test_db_item_get_item_fields_trims_server_side():
+    itemDB, mock_collection, _ = item_db_with_mocks()
+    mock_collection.aggregate.return_value = iter([{"items": [{"item_id": "item_2", "access_token": "tok2"}]}])
+
+    result = itemDB.get_item("test_user_id", "item_2", fields=["item_id", "access_token"])
+
+    assert result == {"item_id": "item_2", "access_token": "tok2"}
+    mock_collection.find_one.assert_not_called()
+    pipeline = mock_collection.aggregate.call_args[0][0]
+    assert pipeline[0] == {"$match": {"user_id": "test_user_id"}}
+    assert pipeline[-1] == {"$project": {"items.item_id": 1, "items.access_token": 1}}
+
+    mock_collection.aggregate.return_value = iter([{"items": []}])
+    assert itemDB.get_item("test_user_id", "missing", fields=["access_token"]) is None
+
+    try:
+        itemDB.get_item("test_user_id", "item_2", fields="access_token")
+        assert False, "Expected ValueError for invalid fields"
+    except ValueError as e:
+        assert str(e) == "Invalid fields provided for retrieving item"
+
+
 def test_db_item_get_item_not_found():
     itemDB, mock_collection, mock_logger = item_db_with_mocks()
 
-    mock_collection.find_one.return_value = {"user_id": "test_user_id", "items": [{"item_id": "a"}]}
+    # user exists but no element matched, so items is omitted from the projection
+    mock_collection.find_one.return_value = {}
 
     result = itemDB.get_item("test_user_id", "missing")
     assert result is None
@@ -305,7 +344,7 @@ def test_db_item_get_items_no_user():
     result = item_db.get_items("nonexistent_user_id")
 
     # Verify that collection.find_one was called with correct query and result is empty list
-    mock_collection.find_one.assert_called_once_with({"user_id": "nonexistent_user_id"})
+    mock_collection.find_one.assert_called_once_with({"user_id": "nonexistent_user_id"}, {"_id": 0, "items": 1})
     assert result == []
     mock_logger.warning.assert_called_with("No user found")
 
@@ -414,13 +453,62 @@ def test_db_item_update_item_field_generic_success():
 
     itemDB.update_item_field("test_user_id", "item_123", "item_data", {"k": "v"})
 
-    mock_collection.update_one.assert_any_call(
-        {"user_id": "test_user_id", "items.item_id": "item_123"},
-        {"$set": {"items.$.item_data": {"k": "v"}}}
-    )
+    # field and last_updated are written together in one update
+    mock_collection.update_one.assert_called_once()
+    query, update = mock_collection.update_one.call_args[0]
+    assert query == {"user_id": "test_user_id", "items.item_id": "item_123"}
+    assert update["$set"]["items.$.item_data"] == {"k": "v"}
+    assert "items.$.last_updated" in update["$set"]
 
-    assert any("items.$.last_updated" in list(call[0][1]["$set"].keys()) for call in mock_collection.update_one.call_args_list)
 
+# POSITIVE tests for update_item_fields method
+def test_db_item_update_item_fields_success():
+    itemDB, mock_collection, mock_logger = item_db_with_mocks()
+    mock_collection.update_one.return_value = MagicMock(matched_count=1)
+
+    with patch("src.db.item_db.encrypt", lambda x: "enc:" + x):
+        itemDB.update_item_fields("test_user_id", "item_123", {"access_token": "tok", "item_data.nickname": "n", "item_data.institution_name": "Bank"})
+
+    mock_collection.update_one.assert_called_once()
+    query, update = mock_collection.update_one.call_args[0]
+    assert query == {"user_id": "test_user_id", "items.item_id": "item_123"}
+    assert update["$set"]["items.$.access_token"] == "enc:tok"
+    assert update["$set"]["items.$.item_data.nickname"] == "n"
+    assert update["$set"]["items.$.item_data.institution_name"] == "Bank"
+    assert "items.$.last_updated" in update["$set"]
+
+# NEGATIVE tests for update_item_fields method
+def test_db_item_update_item_fields_item_not_found():
+    itemDB, mock_collection, mock_logger = item_db_with_mocks()
+    mock_collection.update_one.return_value = MagicMock(matched_count=0)
+
+    try:
+        itemDB.update_item_fields("test_user_id", "missing", {"item_data.nickname": "n"})
+        assert False, "Expected ValueError for missing item"
+    except ValueError as e:
+        assert str(e) == "Item not found"
+        mock_logger.warning.assert_called_with("Item not found")
+
+def test_db_item_update_item_fields_invalid_fields():
+    itemDB, mock_collection, _ = item_db_with_mocks()
+
+    for fields in [None, ["item_data"], {"": "v"}, {1: "v"}]:
+        try:
+            itemDB.update_item_fields("test_user_id", "item_123", fields)
+            assert False, "Expected ValueError for invalid fields"
+        except ValueError as e:
+            assert str(e) == "Invalid user_id, item_id, or fields provided for updating item fields"
+    mock_collection.update_one.assert_not_called()
+
+def test_db_item_update_item_fields_access_token_not_string():
+    itemDB, mock_collection, _ = item_db_with_mocks()
+
+    try:
+        itemDB.update_item_fields("test_user_id", "item_123", {"access_token": {"bad": "type"}})
+        assert False, "Expected ValueError for non-string access token"
+    except ValueError as e:
+        assert str(e) == "New access token must be a string"
+    mock_collection.update_one.assert_not_called()
 
 # NEGATIVE tests for update_item_field method
 def test_db_item_update_item_field_invalid_user_id():
@@ -466,8 +554,331 @@ def test_db_item_update_item_field_exception():
 def test_db_item_close():
     itemDB, mock_collection, _ = item_db_with_mocks()
 
+    itemDB.connection = MagicMock()
+
     # Call close method
     itemDB.close()
 
-    # Verify that collection.database.client.close was called
-    mock_collection.database.client.close.assert_called_once()
\ No newline at end of file
+    # Verify that the shared connection handle was released
+    itemDB.connection.close.assert_called_once()
+
+
+def async_item_db_with_mocks() -> AsyncItemDB:
+    # Setup mocks; collection methods are awaited by AsyncItemDB
+    mock_logger = MagicMock(spec=logging.Logger)
+    mock_collection = AsyncMock()
+
+    itemDB = AsyncItemDB.__new__(AsyncItemDB)
+    itemDB.collection = mock_collection
+    itemDB.logger = mock_logger
+    return itemDB, mock_collection, mock_logger
+
+def test_db_async_item_init():
+    mock_logger = MagicMock(spec=logging.Logger)
+    mock_collection = AsyncMock()
+
+    mock_db = MagicMock()
+    mock_db.items = mock_collection
+
+    mock_db_instance = MagicMock()
+    mock_db_instance.get_db.return_value = mock_db
+
+    mock_db_factory = MagicMock()
+    mock_db_factory.return_value = mock_db_instance
+
+    item_db = AsyncItemDB(env="test", logger=mock_logger, db_factory=mock_db_factory)
+
+    mock_db_factory.assert_called_once_with("test")
+    assert item_db.collection == mock_collection
+    mock_logger.info.assert_called_with("AsyncItemDB initialized.")
+
+@pytest.mark.asyncio
+async def test_db_async_item_insert_positive():
+    itemDB, mock_collection, _ = async_item_db_with_mocks()
+
+    await itemDB.insert("test_user_id")
+
+    mock_collection.insert_one.assert_awaited_once_with({"user_id": "test_user_id", "items": []})
+
+@pytest.mark.asyncio
+async def test_db_async_item_insert_exception():
+    itemDB, mock_collection, mock_logger = async_item_db_with_mocks()
+    mock_collection.insert_one.side_effect = Exception("Database error")
+
+    try:
+        await itemDB.insert("test_user_id")
+        assert False, "Expected Exception for database error during insert"
+    except Exception as e:
+        assert str(e) == "Database error"
+        mock_logger.error.assert_called_with("Failed to insert new item: %s", e)
+
+@pytest.mark.asyncio
+async def test_db_async_item_append_item_success():
+    itemDB, mock_collection, _ = async_item_db_with_mocks()
+
+    mock_collection.find_one_and_update.return_value = {}
+
+    await itemDB.append_item("test_user_id", "item_123", "access_token_abc")
+
+    pipeline, projection = _append_item_update("item_123", "access_token_abc", None)
+    mock_collection.find_one_and_update.assert_awaited_once_with(
+        {"user_id": "test_user_id"}, pipeline,
+        projection=projection, return_document=ReturnDocument.BEFORE
+    )
+
+@pytest.mark.asyncio
+async def test_db_async_item_append_item_user_id_not_found():
+    itemDB, mock_collection, _ = async_item_db_with_mocks()
+
+    mock_collection.find_one_and_update.return_value = None
+
+    try:
+        await itemDB.append_item("test_user_id", "item_123", "access_token_abc")
+        assert False, "Expected ValueError for user_id not found"
+    except ValueError as e:
+        assert str(e) == "User_id not found"
+
+@pytest.mark.asyncio
+async def test_db_async_item_append_item_item_already_exists():
+    itemDB, mock_collection, _ = async_item_db_with_mocks()
+
+    mock_collection.find_one_and_update.return_value = {"items": [{"item_id": "item_123"}]}
+
+    try:
+        await itemDB.append_item("test_user_id", "item_123", "access_token_abc")
+        assert False, "Expected ValueError for item already exists"
+    except ValueError as e:
+        assert str(e) == "Item already exists"
+        mock_collection.find_one_and_update.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_db_async_item_get_items_success():
+    itemDB, mock_collection, _ = async_item_db_with_mocks()
+
+    mock_collection.find_one.return_value = {"items": [{"item_id": "12345"}]}
+
+    result = await itemDB.get_items("test_user_id", fields=["item_id"])
+
+    mock_collection.find_one.assert_awaited_once_with({"user_id": "test_user_id"}, {"_id": 0, "items.item_id": 1})
+    assert result == [{"item_id": "12345"}]
+
+@pytest.mark.asyncio
+async def test_db_async_item_get_item_success():
+    itemDB, mock_collection, mock_logger = async_item_db_with_mocks()
+
+    mock_collection.find_one.return_value = {"items": [{"item_id": "item_2", "access_token": "tok2"}]}
+    assert await itemDB.get_item("test_user_id", "item_2") == {"item_id": "item_2", "access_token": "tok2"}
+    mock_collection.find_one.assert_awaited_once_with({"user_id": "test_user_id"}, {"_id": 0, "items": {"$elemMatch": {"item_id": "item_2"}}})
+
+    mock_collection.find_one.return_value = {}
+    assert await itemDB.get_item("test_user_id", "missing") is None
+    mock_logger.warning.assert_called_with("Item not found")
+
+@pytest.mark.asyncio
+async def test_db_async_item_get_item_fields():
+    itemDB, mock_collection, _ = async_item_db_with_mocks()
+    cursor = AsyncMock()
+    cursor.to_list.return_value = [{"items": [{"item_id": "item_2", "access_token": "tok2"}]}]
+    mock_collection.aggregate.return_value = cursor
+
+    assert await itemDB.get_item("test_user_id", "item_2", fields=["item_id", "access_token"]) == {"item_id": "item_2", "access_token": "tok2"}
+    mock_collection.find_one.assert_not_awaited()
+
+    cursor.to_list.return_value = []
+    assert await itemDB.get_item("no_user", "item_2", fields=["access_token"]) is None
+
+@pytest.mark.asyncio
+async def test_db_async_item_remove_item_success():
+    itemDB, mock_collection, _ = async_item_db_with_mocks()
+
+    await itemDB.remove_item("test_user_id", "item_123")
+
+    mock_collection.update_one.assert_awaited_once_with(
+        {"user_id": "test_user_id"},
+        {"$pull": {"items": {"item_id": "item_123"}}}
+    )
+
+@pytest.mark.asyncio
+async def test_db_async_item_update_item_field_generic_success():
+    itemDB, mock_collection, _ = async_item_db_with_mocks()
+
+    await itemDB.update_item_field("test_user_id", "item_123", "item_data", {"k": "v"})
+
+    mock_collection.update_one.assert_awaited_once()
+    update = mock_collection.update_one.await_args[0][1]
+    assert update["$set"]["items.$.item_data"] == {"k": "v"}
+    assert "items.$.last_updated" in update["$set"]
+
+@pytest.mark.asyncio
+async def test_db_async_item_update_item_fields_success():
+    itemDB, mock_collection, _ = async_item_db_with_mocks()
+    mock_collection.update_one.return_value = MagicMock(matched_count=1)
+
+    await itemDB.update_item_fields("test_user_id", "item_123", {"access_token": "tok", "item_data.nickname": "n"})
+
+    mock_collection.update_one.assert_awaited_once()
+    query, update = mock_collection.update_one.await_args[0]
+    assert query == {"user_id": "test_user_id", "items.item_id": "item_123"}
+    assert set(update["$set"]) == {"items.$.access_token", "items.$.item_data.nickname", "items.$.last_updated"}
+
+@pytest.mark.asyncio
+async def test_db_async_item_update_item_fields_item_not_found():
+    itemDB, mock_collection, _ = async_item_db_with_mocks()
+    mock_collection.update_one.return_value = MagicMock(matched_count=0)
+
+    try:
+        await itemDB.update_item_fields("test_user_id", "missing", {"item_data.nickname": "n"})
+        assert False, "Expected ValueError for missing item"
+    except ValueError as e:
+        assert str(e) == "Item not found"
+
+@pytest.mark.asyncio
+async def test_db_async_item_close():
+    itemDB, mock_collection, _ = async_item_db_with_mocks()
+
+    itemDB.connection = AsyncMock()
+
+    await itemDB.close()
+
+    itemDB.connection.close.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_db_async_item_bulk_insert_outcomes():
+    itemDB, mock_collection, _ = async_item_db_with_mocks()
+    mock_collection.find = MagicMock()
+    mock_collection.bulk_write.side_effect = [
+        BulkWriteError({"writeErrors": [{"index": 1, "code": 11000, "errmsg": "E11000 duplicate key"}]}),
+        MagicMock(inserted_count=1, matched_count=0)
+    ]
+
+    outcomes = await itemDB.bulk_insert(["u1", "u2", "", "u3"], batch_size=3)
+
+    assert outcomes == [
+        {"user_id": "u1", "ok": True, "error": None},
+        {"user_id": "u2", "ok": False, "error": "User_id already exists"},
+        {"user_id": "", "ok": False, "error": "Invalid user_id provided for insertion."},
+        {"user_id": "u3", "ok": True, "error": None}
+    ]
+    assert mock_collection.bulk_write.await_count == 2
+    requests = mock_collection.bulk_write.call_args_list[0][0][0]
+    assert [request._doc for request in requests] == [{"user_id": "u1", "items": []}, {"user_id": "u2", "items": []}]
+    assert mock_collection.bulk_write.call_args_list[0][1] == {"ordered": False}
+    mock_collection.find.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_db_async_item_bulk_append_items_checks_owners_once_per_batch():
+    itemDB, mock_collection, _ = async_item_db_with_mocks()
+    mock_collection.find = MagicMock()
+    mock_collection.find.return_value.to_list = AsyncMock(return_value=[{"user_id": "u1", "items": [{"item_id": "old"}]}])
+    mock_collection.bulk_write.return_value = MagicMock(inserted_count=0, matched_count=1)
+
+    outcomes = await itemDB.bulk_append_items([
+        {"user_id": "u1", "item_id": "new", "access_token": "tok", "data": {"k": "v"}},
+        {"user_id": "u1", "item_id": "old", "access_token": "tok"},
+        {"user_id": "u1", "item_id": "new", "access_token": "tok"},
+        {"user_id": "missing", "item_id": "i1", "access_token": "tok"},
+        {"user_id": "u1", "item_id": "i2"}
+    ])
+
+    assert [(o["item_id"], o["ok"], o["error"]) for o in outcomes] == [
+        ("new", True, None),
+        ("old", False, "Item already exists"),
+        ("new", False, "Item already exists"),
+        ("i1", False, "User_id not found"),
+        ("i2", False, "Invalid user_id, item_id, or access_token provided for appending item")
+    ]
+    mock_collection.find.assert_called_once()
+    assert sorted(mock_collection.find.call_args[0][0]["user_id"]["$in"]) == ["missing", "u1"]
+
+    (request,) = mock_collection.bulk_write.call_args[0][0]
+    assert request._filter == {"user_id": "u1", "items.item_id": {"$ne": "new"}}
+    assert request._doc == {"$push": {"items": {"item_id": "new", "access_token": "tok", "last_updatated": None, "item_data": {"k": "v"}}}}
+
+@pytest.mark.asyncio
+async def test_db_async_item_bulk_update_item_fields_ordered_stops_at_first_failure():
+    itemDB, mock_collection, _ = async_item_db_with_mocks()
+    mock_collection.find = MagicMock()
+    mock_collection.find.return_value.to_list = AsyncMock(return_value=[{"user_id": "u1", "items": [{"item_id": "i1"}, {"item_id": "i2"}]}])
+    mock_collection.bulk_write.return_value = MagicMock(inserted_count=0, matched_count=1)
+
+    outcomes = await itemDB.bulk_update_item_fields([
+        {"user_id": "u1", "item_id": "i1", "fields": {"access_token": "new"}},
+        {"user_id": "u1", "item_id": "gone", "fields": {"item_data.tag": "x"}},
+        {"user_id": "u1", "item_id": "i2", "fields": {"item_data.tag": "x"}},
+        {"user_id": "u1", "item_id": "i2", "fields": {"item_data.tag": "y"}}
+    ], batch_size=3, ordered=True)
+
+    assert [(o["ok"], o["error"]) for o in outcomes] == [
+        (True, None), (False, "Item not found"), (False, NOT_ATTEMPTED), (False, NOT_ATTEMPTED)
+    ]
+    # the second batch is never read or written
+    mock_collection.find.assert_called_once()
+    (request,) = mock_collection.bulk_write.call_args[0][0]
+    assert request._filter == {"user_id": "u1", "items.item_id": "i1"}
+    assert request._doc["$set"]["items.$.access_token"] == "new"
+    assert mock_collection.bulk_write.call_args[1] == {"ordered": True}
+
+@pytest.mark.asyncio
+async def test_db_async_item_bulk_ordered_write_error_skips_rest():
+    itemDB, mock_collection, _ = async_item_db_with_mocks()
+    mock_collection.bulk_write.side_effect = BulkWriteError({"writeErrors": [{"index": 0, "code": 121, "errmsg": "Document failed validation"}]})
+
+    outcomes = await itemDB.bulk_insert(["u1", "u2"], ordered=True)
+
+    assert [(o["ok"], o["error"]) for o in outcomes] == [(False, "Document failed validation"), (False, NOT_ATTEMPTED)]
+
+@pytest.mark.asyncio
+async def test_db_async_item_bulk_invalid_options_and_exception():
+    itemDB, mock_collection, mock_logger = async_item_db_with_mocks()
+
+    with pytest.raises(ValueError, match="Invalid batch_size provided for bulk operation"):
+        await itemDB.bulk_insert(["u1"], batch_size=0)
+    with pytest.raises(ValueError, match="Invalid ordered flag provided for bulk operation"):
+        await itemDB.bulk_insert(["u1"], ordered="yes")
+
+    mock_collection.bulk_write.side_effect = Exception("Database error")
+    with pytest.raises(Exception, match="Database error"):
+        await itemDB.bulk_insert(["u1"])
+    mock_logger.error.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_db_async_item_bulk_append_items():
+    itemDB, mock_collection, mock_logger = async_item_db_with_mocks()
+    mock_collection.find = MagicMock()
+    # the second read is the reconcile after one of the two guarded pushes matched nothing
+    mock_collection.find.return_value.to_list = AsyncMock(side_effect=[[{"user_id": "u1", "items": []}],
+                                                                       [{"user_id": "u1", "items": [{"item_id": "i0"}]}]])
+    mock_collection.bulk_write.return_value = MagicMock(inserted_count=0, matched_count=1)
+
+    outcomes = await itemDB.bulk_append_items(({"user_id": "u1", "item_id": f"i{n}", "access_token": "tok"} for n in range(2)))
+
+    assert [o["ok"] for o in outcomes] == [True, False]
+    assert outcomes[1]["error"] == UNCONFIRMED
+    mock_collection.bulk_write.assert_awaited_once()
+    mock_logger.warning.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_db_async_item_bulk_update_unmatched_reports_failure():
+    itemDB, mock_collection, mock_logger = async_item_db_with_mocks()
+    mock_collection.find = MagicMock()
+    # the item was removed between the owners read and the write
+    mock_collection.find.return_value.to_list = AsyncMock(side_effect=[[{"user_id": "u1", "items": [{"item_id": "i1"}]}],
+                                                                       [{"user_id": "u1", "items": []}]])
+    mock_collection.bulk_write.return_value = MagicMock(inserted_count=0, matched_count=0)
+
+    outcomes = await itemDB.bulk_update_item_fields([{"user_id": "u1", "item_id": "i1", "fields": {"cursor": "c"}}])
+
+    assert outcomes == [{"user_id": "u1", "item_id": "i1", "ok": False, "error": "Item not found"}]
+
+@pytest.mark.asyncio
+async def test_db_async_item_bulk_unmatched_without_explanation_is_unconfirmed():
+    itemDB, mock_collection, _ = async_item_db_with_mocks()
+    owners = [{"user_id": "u1", "items": [{"item_id": "i1"}, {"item_id": "i2"}]}]
+    mock_collection.find = MagicMock()
+    mock_collection.find.return_value.to_list = AsyncMock(side_effect=[owners, owners])
+    mock_collection.bulk_write.return_value = MagicMock(inserted_count=0, matched_count=1)
+
+    outcomes = await itemDB.bulk_update_item_fields([{"user_id": "u1", "item_id": f"i{n}", "fields": {"cursor": "c"}} for n in (1, 2)])
+
+    assert [o["ok"] for o in outcomes] == [False, False]
+    assert {o["error"] for o in outcomes} == {UNCONFIRMED}
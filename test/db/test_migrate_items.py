@@ -0,0 +1,61 @@
+from src.db.migrate_items import ItemLayoutMigration
+
+from unittest.mock import MagicMock
+import logging
+
+def migration_with_mocks(batch_size: int = 2) -> ItemLayoutMigration:
+    mock_logger = MagicMock(spec=logging.Logger)
+
+    migration = ItemLayoutMigration.__new__(ItemLayoutMigration)
+    migration.source = MagicMock()
+    migration.target = MagicMock()
+    migration.batch_size = batch_size
+    migration.logger = mock_logger
+    return migration, migration.source, migration.target
+
+def _source_reads(source, batch, reread=None):
+    # find(...).sort(...).limit(...) returns the batch, the follow-up find by _id returns the re-read documents
+    cursor = MagicMock()
+    cursor.sort.return_value.limit.return_value = batch
+    source.find.side_effect = lambda query, projection: cursor if "migrated" in query else iter(reread or [])
+
+def test_db_migrate_items_init_invalid_batch_size():
+    try:
+        ItemLayoutMigration("test", MagicMock(), db_factory=MagicMock(), batch_size=0)
+        assert False, "Expected ValueError for invalid batch size"
+    except ValueError as e:
+        assert str(e) == "Invalid batch_size provided for migration"
+
+def test_db_migrate_items_run_batch_copies_marks_and_prunes():
+    migration, source, target = migration_with_mocks()
+    records = [
+        {"_id": 1, "user_id": "u1", "items": [{"item_id": "i1", "access_token": "t1"}]},
+        {"_id": 2, "user_id": "u2", "items": []},
+    ]
+    reread = [{"_id": 1, "user_id": "u1", "items": []}, {"_id": 2, "user_id": "u2", "items": []}]
+    _source_reads(source, records, reread)
+
+    count, after_id = migration.run_batch()
+
+    assert (count, after_id) == (2, 2)
+    copy_ops = target.bulk_write.call_args_list[0][0][0]
+    assert len(copy_ops) == 1
+    source.update_many.assert_called_once_with({"_id": {"$in": [1, 2]}}, {"$set": {"migrated": True}})
+    # u1's item was removed while the batch was copied, so it is pruned again
+    prune_ops = target.bulk_write.call_args_list[1][0][0]
+    assert prune_ops[0]._filter == {"user_id": "u1", "legacy": True, "item_id": {"$nin": []}}
+
+def test_db_migrate_items_run_batch_empty():
+    migration, source, target = migration_with_mocks()
+    _source_reads(source, [])
+
+    assert migration.run_batch(after_id=7) == (0, 7)
+    target.bulk_write.assert_not_called()
+    source.update_many.assert_not_called()
+
+def test_db_migrate_items_run_resumes_after_last_id():
+    migration, source, target = migration_with_mocks()
+    migration.run_batch = MagicMock(side_effect=[(2, "b"), (1, "c"), (0, "c")])
+
+    assert migration.run() == 3
+    assert [c[0][0] for c in migration.run_batch.call_args_list] == [None, "b", "c"]
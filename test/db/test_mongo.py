@@ -0,0 +1,73 @@
+from src.db.mongo import ClientRegistry, client_options
+from src.helpers.settings import Settings
+
+from unittest.mock import MagicMock, patch
+import pytest
+
+ENV_CONFIG = {'db': {
+    'URI': 'mongodb://localhost:27017',
+    'DB_NAME': 'test_db',
+    'POOL': {'maxPoolSize': 50, 'minPoolSize': 5, 'serverSelectionTimeoutMS': 2000}
+}}
+
+@pytest.fixture
+def registry():
+    mock_client_cls = MagicMock()
+    with patch("src.db.mongo.resolve_settings", return_value=ENV_CONFIG) as mock_env:
+        yield ClientRegistry(mock_client_cls), mock_client_cls, mock_env
+
+def test_db_mongo_client_options():
+    assert client_options(ENV_CONFIG['db']) == {'maxPoolSize': 50, 'minPoolSize': 5, 'serverSelectionTimeoutMS': 2000}
+    assert client_options({'URI': 'uri'}) == {}
+
+def test_db_mongo_client_options_unknown_option():
+    try:
+        client_options({'POOL': {'maxPoolSize': 10, 'poolSize': 10}})
+        assert False, "Expected ValueError for unknown pool option"
+    except ValueError as e:
+        assert str(e) == "Unknown db pool options: ['poolSize']"
+
+def test_db_mongo_registry_shares_one_client(registry):
+    clients, mock_client_cls, mock_env = registry
+
+    db1 = clients.acquire("test")
+    db2 = clients.acquire("test")
+
+    # one client built with the pool options
+    mock_client_cls.assert_called_once_with('mongodb://localhost:27017', maxPoolSize=50, minPoolSize=5, serverSelectionTimeoutMS=2000)
+    mock_env.assert_called_with("test")
+    mock_client_cls.return_value.__getitem__.assert_called_with('test_db')
+    assert db1 is db2
+    assert clients.refs("test") == 2
+
+def test_db_mongo_registry_release_is_reference_counted(registry):
+    clients, mock_client_cls, _ = registry
+
+    clients.acquire("test")
+    clients.acquire("test")
+
+    assert clients.release("test") is None # still referenced
+    assert clients.release("test") is mock_client_cls.return_value # last reference, caller closes
+    assert clients.refs("test") == 0
+    assert clients.release("test") is None
+
+def test_db_mongo_registry_new_client_after_full_release(registry):
+    clients, mock_client_cls, _ = registry
+
+    clients.acquire("test")
+    clients.release("test")
+    clients.acquire("test")
+
+    assert mock_client_cls.call_count == 2
+
+def test_db_mongo_registry_pools_per_db_section():
+    mock_client_cls = MagicMock()
+    clients = ClientRegistry(mock_client_cls)
+    settings = Settings(env="test", plaid={}, session={}, db=ENV_CONFIG['db'])
+    other = Settings(env="test", plaid={}, session={}, db={'URI': 'mongodb://other:27017', 'DB_NAME': 'other_db'})
+
+    clients.acquire(settings)
+    clients.acquire(other)
+
+    assert [c[0] for c in mock_client_cls.call_args_list] == [('mongodb://localhost:27017',), ('mongodb://other:27017',)]
+    assert clients.refs(settings) == 1 and clients.refs(other) == 1
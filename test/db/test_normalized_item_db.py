@@ -0,0 +1,195 @@
+from src.db.normalized_item_db import AsyncNormalizedItemDB, _legacy_copy_ops, _stale_legacy_filter
+
+from unittest.mock import MagicMock, AsyncMock, patch
+from pymongo.errors import DuplicateKeyError
+import pytest
+import logging
+
+
+@pytest.fixture(autouse=True)
+def noop_encrypt_patcher():
+    p1 = patch("src.db.normalized_item_db.encrypt", lambda x: x)
+    p2 = patch("src.db.item_db.encrypt", lambda x: x)
+    p1.start()
+    p2.start()
+    try:
+        yield
+    finally:
+        p1.stop()
+        p2.stop()
+
+
+def async_normalized_item_db_with_mocks(legacy_fallback: bool = False) -> AsyncNormalizedItemDB:
+    mock_logger = MagicMock(spec=logging.Logger)
+    mock_collection = AsyncMock()
+
+    itemDB = AsyncNormalizedItemDB.__new__(AsyncNormalizedItemDB)
+    itemDB.collection = mock_collection
+    itemDB.legacy = AsyncMock() if legacy_fallback else None
+    itemDB.logger = mock_logger
+    return itemDB, mock_collection, mock_logger
+
+def test_db_normalized_item_init():
+    mock_logger = MagicMock(spec=logging.Logger)
+    mock_db_factory = MagicMock()
+    mock_db = mock_db_factory.return_value.get_db.return_value
+
+    item_db = AsyncNormalizedItemDB(env="test", logger=mock_logger, db_factory=mock_db_factory)
+    assert item_db.collection == mock_db.linked_items
+    assert item_db.legacy is None
+
+    item_db = AsyncNormalizedItemDB(env="test", logger=mock_logger, db_factory=mock_db_factory, legacy_fallback=True)
+    assert item_db.legacy == mock_db.items
+    mock_logger.info.assert_called_with("AsyncNormalizedItemDB initialized.")
+
+def test_db_normalized_item_legacy_copy_ops():
+    record = {"user_id": "u1", "items": [{"item_id": "i1", "access_token": "tok", "last_updatated": None, "item_data": {"k": "v"}}]}
+
+    ops = _legacy_copy_ops(record)
+
+    assert len(ops) == 1
+    assert ops[0]._filter == {"user_id": "u1", "item_id": "i1"}
+    assert ops[0]._doc == {"$setOnInsert": {"access_token": "tok", "last_updated": None, "item_data": {"k": "v"}, "legacy": True}}
+    assert ops[0]._upsert is True
+    assert _legacy_copy_ops({"user_id": "u1", "items": []}) == []
+
+def test_db_normalized_item_stale_legacy_filter():
+    record = {"user_id": "u1", "items": [{"item_id": "i1"}, {"item_id": "i2"}]}
+
+    assert _stale_legacy_filter(record) == {"user_id": "u1", "legacy": True, "item_id": {"$nin": ["i1", "i2"]}}
+
+@pytest.mark.asyncio
+async def test_db_async_normalized_item_append_item_already_exists():
+    itemDB, mock_collection, _ = async_normalized_item_db_with_mocks()
+    mock_collection.insert_one.side_effect = DuplicateKeyError("dup")
+
+    try:
+        await itemDB.append_item("u1", "i1", "tok")
+        assert False, "Expected ValueError for item already exists"
+    except ValueError as e:
+        assert str(e) == "Item already exists"
+
+@pytest.mark.asyncio
+async def test_db_async_normalized_item_get_items():
+    itemDB, mock_collection, _ = async_normalized_item_db_with_mocks()
+    cursor = MagicMock()
+    cursor.to_list = AsyncMock(return_value=[{"item_id": "i1"}])
+    mock_collection.find = MagicMock(return_value=cursor)
+
+    assert await itemDB.get_items("u1") == [{"item_id": "i1"}]
+    mock_collection.find.assert_called_once_with({"user_id": "u1"}, {"_id": 0, "user_id": 0, "legacy": 0})
+
+@pytest.mark.asyncio
+async def test_db_async_normalized_item_update_and_remove():
+    itemDB, mock_collection, _ = async_normalized_item_db_with_mocks()
+    mock_collection.update_one.return_value = MagicMock(matched_count=1)
+
+    await itemDB.update_item_fields("u1", "i1", {"item_data.nickname": "n"})
+    await itemDB.remove_item("u1", "i1")
+
+    mock_collection.update_one.assert_awaited_once()
+    mock_collection.delete_one.assert_awaited_once_with({"user_id": "u1", "item_id": "i1"})
+
+# POSITIVE tests for append_item
+@pytest.mark.asyncio
+async def test_db_async_normalized_item_append_item_success():
+    itemDB, mock_collection, _ = async_normalized_item_db_with_mocks()
+
+    await itemDB.append_item("u1", "i1", "tok", data={"k": "v"})
+
+    mock_collection.insert_one.assert_awaited_once_with({"user_id": "u1", "item_id": "i1", "access_token": "tok", "last_updated": None, "item_data": {"k": "v"}})
+
+# NEGATIVE tests for append_item
+@pytest.mark.asyncio
+async def test_db_async_normalized_item_append_item_invalid_input():
+    itemDB, mock_collection, _ = async_normalized_item_db_with_mocks()
+
+    try:
+        await itemDB.append_item("u1", "", "tok")
+        assert False, "Expected ValueError for empty item_id"
+    except ValueError as e:
+        assert str(e) == "Invalid user_id, item_id, or access_token provided for appending item"
+    mock_collection.insert_one.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_db_async_normalized_item_get_item():
+    itemDB, mock_collection, mock_logger = async_normalized_item_db_with_mocks()
+    mock_collection.find_one.return_value = {"item_id": "i1", "access_token": "tok"}
+
+    assert await itemDB.get_item("u1", "i1") == {"item_id": "i1", "access_token": "tok"}
+    mock_collection.find_one.assert_awaited_once_with({"user_id": "u1", "item_id": "i1"}, {"_id": 0, "user_id": 0, "legacy": 0})
+
+    mock_collection.find_one.return_value = None
+    assert await itemDB.get_item("u1", "missing") is None
+    mock_logger.warning.assert_called_with("Item not found")
+
+    await itemDB.get_item("u1", "i1", fields=["item_id", "access_token"])
+    mock_collection.find_one.assert_awaited_with({"user_id": "u1", "item_id": "i1"}, {"_id": 0, "item_id": 1, "access_token": 1})
+
+@pytest.mark.asyncio
+async def test_db_async_normalized_item_update_item_fields_item_not_found():
+    itemDB, mock_collection, _ = async_normalized_item_db_with_mocks()
+    mock_collection.update_one.return_value = MagicMock(matched_count=0)
+
+    try:
+        await itemDB.update_item_field("u1", "missing", "item_data", {"k": "v"})
+        assert False, "Expected ValueError for missing item"
+    except ValueError as e:
+        assert str(e) == "Item not found"
+
+# legacy fallback while migrating
+@pytest.mark.asyncio
+async def test_db_async_normalized_item_legacy_fallback_migrates_once():
+    itemDB, mock_collection, _ = async_normalized_item_db_with_mocks(legacy_fallback=True)
+    record = {"user_id": "u1", "items": [{"item_id": "i1", "access_token": "tok", "item_data": None}]}
+    itemDB.legacy.find_one.side_effect = [
+        record, # not migrated yet
+        {"user_id": "u1", "items": [{"item_id": "i1"}]}, # re-read after the copy
+        None # already migrated
+    ]
+    calls = []
+    mock_collection.bulk_write.side_effect = lambda *a, **k: calls.append("copy")
+    itemDB.legacy.update_one.side_effect = lambda *a, **k: calls.append("mark")
+    mock_collection.find_one.return_value = {"item_id": "i1"}
+
+    assert await itemDB.get_item("u1", "i1") == {"item_id": "i1"}
+    await itemDB.get_item("u1", "i1")
+
+    itemDB.legacy.find_one.assert_awaited_with({"user_id": "u1", "migrated": {"$ne": True}}, {"_id": 0, "user_id": 1, "items": 1})
+    mock_collection.bulk_write.assert_awaited_once()
+    itemDB.legacy.update_one.assert_awaited_once_with({"user_id": "u1"}, {"$set": {"migrated": True}})
+    assert calls == ["copy", "mark"]
+    mock_collection.delete_many.assert_awaited_once_with({"user_id": "u1", "legacy": True, "item_id": {"$nin": ["i1"]}})
+
+@pytest.mark.asyncio
+async def test_db_async_normalized_item_legacy_fallback_failed_copy_is_retried():
+    itemDB, mock_collection, _ = async_normalized_item_db_with_mocks(legacy_fallback=True)
+    record = {"user_id": "u1", "items": [{"item_id": "i1", "access_token": "tok", "item_data": None}]}
+    itemDB.legacy.find_one.side_effect = [record, record, {"user_id": "u1", "items": [{"item_id": "i1"}]}]
+    mock_collection.bulk_write.side_effect = [Exception("network error"), None]
+    cursor = MagicMock()
+    cursor.to_list = AsyncMock(return_value=[{"item_id": "i1"}])
+    mock_collection.find = MagicMock(return_value=cursor)
+
+    with pytest.raises(Exception, match="network error"):
+        await itemDB.get_items("u1")
+    # the legacy document was not marked, so the next request copies the items again
+    itemDB.legacy.update_one.assert_not_called()
+
+    assert await itemDB.get_items("u1") == [{"item_id": "i1"}]
+    assert mock_collection.bulk_write.await_count == 2
+    itemDB.legacy.update_one.assert_awaited_once_with({"user_id": "u1"}, {"$set": {"migrated": True}})
+
+@pytest.mark.asyncio
+async def test_db_async_normalized_item_legacy_fallback_remove_mirrors_to_legacy():
+    itemDB, mock_collection, _ = async_normalized_item_db_with_mocks(legacy_fallback=True)
+    itemDB.legacy.find_one.return_value = None
+
+    calls = []
+    itemDB.legacy.update_one.side_effect = lambda *a, **k: calls.append("legacy")
+    mock_collection.delete_one.side_effect = lambda *a, **k: calls.append("normalized")
+
+    await itemDB.remove_item("u1", "i1")
+
+    itemDB.legacy.update_one.assert_awaited_once_with({"user_id": "u1"}, {"$pull": {"items": {"item_id": "i1"}}})
+    assert calls == ["legacy", "normalized"]
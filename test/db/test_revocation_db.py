@@ -0,0 +1,135 @@
+from src.db.revocation_db import RevocationDB, MemoryRevocationDB
+
+from datetime import datetime, UTC
+from pymongo.errors import DuplicateKeyError
+from unittest.mock import MagicMock, AsyncMock
+import pytest
+import logging
+
+def revocation_db_with_mocks() -> RevocationDB:
+    mock_logger = MagicMock(spec=logging.Logger)
+    mock_collection = AsyncMock()
+
+    revocation_db = RevocationDB.__new__(RevocationDB)
+    revocation_db.collection = mock_collection
+    revocation_db.logger = mock_logger
+    return revocation_db, mock_collection, mock_logger
+
+def test_db_revocation_init():
+    mock_logger = MagicMock(spec=logging.Logger)
+    mock_db_factory = MagicMock()
+
+    revocation_db = RevocationDB(env="test", logger=mock_logger, db_factory=mock_db_factory)
+
+    mock_db_factory.assert_called_once_with("test")
+    assert revocation_db.collection == mock_db_factory.return_value.get_db.return_value.revoked_sessions
+    mock_logger.debug.assert_called_with("RevocationDB initialized.")
+
+@pytest.mark.asyncio
+async def test_db_revocation_revoke_upserts_expiry():
+    revocation_db, mock_collection, _ = revocation_db_with_mocks()
+
+    await revocation_db.revoke("key", 1700000000)
+
+    mock_collection.update_one.assert_awaited_once_with({"_id": "key"}, {"$set": {"expires_at": datetime.fromtimestamp(1700000000, UTC)}}, upsert=True)
+
+@pytest.mark.asyncio
+async def test_db_revocation_revoke_invalid_and_exception():
+    revocation_db, mock_collection, mock_logger = revocation_db_with_mocks()
+
+    with pytest.raises(ValueError, match="Invalid key or exp provided for revocation"):
+        await revocation_db.revoke("", 1)
+
+    mock_collection.update_one.side_effect = Exception("Database error")
+    with pytest.raises(Exception, match="Database error"):
+        await revocation_db.revoke("key", 1)
+    mock_logger.error.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_db_revocation_is_revoked_ignores_expired():
+    revocation_db, mock_collection, _ = revocation_db_with_mocks()
+    mock_collection.find_one.return_value = {"_id": "key"}
+
+    assert await revocation_db.is_revoked("key") is True
+    query, projection = mock_collection.find_one.call_args[0]
+    assert query["_id"] == "key" and "$gt" in query["expires_at"]
+    assert projection == {"_id": 1}
+
+    mock_collection.find_one.return_value = None
+    assert await revocation_db.is_revoked("key") is False
+
+@pytest.mark.asyncio
+async def test_db_memory_revocation():
+    now = [1000]
+    revocation_db = MemoryRevocationDB(clock=lambda: now[0])
+
+    await revocation_db.revoke("a", 1010)
+    await revocation_db.revoke("b", 2000)
+    assert await revocation_db.is_revoked("a")
+    assert not await revocation_db.is_revoked("c")
+
+    now[0] = 1500
+    assert not await revocation_db.is_revoked("a")
+    assert await revocation_db.cleanup() == 1
+    assert revocation_db.revoked == {"b": 2000}
+
+@pytest.mark.asyncio
+async def test_db_memory_revocation_cleanup_pops_only_expired():
+    now = [1000]
+    revocation_db = MemoryRevocationDB(clock=lambda: now[0])
+    for n in range(5):
+        await revocation_db.revoke(f"k{n}", 1001 + n * 10)
+    await revocation_db.revoke("k0", 1100) # re-revoked, its old heap entry is stale
+
+    now[0] = 1025
+    assert await revocation_db.cleanup() == 2 # k1, k2
+    assert sorted(revocation_db.revoked) == ["k0", "k3", "k4"]
+    assert len(revocation_db._expiries) == 3
+
+    await revocation_db.close()
+    assert revocation_db.revoked == {} and revocation_db._expiries == []
+
+@pytest.mark.asyncio
+async def test_db_revocation_valid_after():
+    revocation_db, _, _ = revocation_db_with_mocks()
+    revocation_db.epochs = AsyncMock()
+
+    await revocation_db.set_valid_after("u1", 1700000000, 1700003600)
+    revocation_db.epochs.update_one.assert_awaited_once_with({"_id": "u1"}, {"$max": {"valid_after": 1700000000, "expires_at": datetime.fromtimestamp(1700003600, UTC)}}, upsert=True)
+
+    revocation_db.epochs.find_one.return_value = {"valid_after": 1700000000}
+    assert await revocation_db.get_valid_after("u1") == 1700000000
+    revocation_db.epochs.find_one.return_value = None
+    assert await revocation_db.get_valid_after("u1") is None
+
+    with pytest.raises(ValueError, match="Invalid user_id, epoch or exp provided for revocation"):
+        await revocation_db.set_valid_after("u1", "now", 1)
+
+@pytest.mark.asyncio
+async def test_db_memory_revocation_valid_after_expires():
+    now = [1000]
+    revocation_db = MemoryRevocationDB(clock=lambda: now[0])
+
+    await revocation_db.set_valid_after("u1", 1000, 1060)
+    await revocation_db.set_valid_after("u1", 990, 1050) # an older, racing logout does not move it back
+    assert await revocation_db.get_valid_after("u1") == 1000
+    assert await revocation_db.get_valid_after("u2") is None
+
+    now[0] = 1061
+    assert await revocation_db.get_valid_after("u1") is None
+    assert await revocation_db.cleanup() == 1
+    assert revocation_db.valid_after == {}
+
+@pytest.mark.asyncio
+async def test_db_revocation_claim_once():
+    revocation_db, mock_collection, _ = revocation_db_with_mocks()
+
+    assert await revocation_db.claim("jti", 1700000000) is True
+    mock_collection.insert_one.assert_awaited_once_with({"_id": "jti", "expires_at": datetime.fromtimestamp(1700000000, UTC)})
+
+    mock_collection.insert_one.side_effect = DuplicateKeyError("E11000")
+    assert await revocation_db.claim("jti", 1700000000) is False
+
+    memory_db = MemoryRevocationDB(clock=lambda: 1000)
+    assert await memory_db.claim("jti", 2000) is True
+    assert await memory_db.claim("jti", 2000) is False
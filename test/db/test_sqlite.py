@@ -0,0 +1,123 @@
+from src.db.sqlite import SQLiteDB, SQLiteAccountDB, SQLiteItemDB, SQLiteIndexManager, SQLiteRevocationDB, SCHEMA
+
+from unittest.mock import MagicMock, patch
+import pytest
+import logging
+
+@pytest.fixture
+def db_factory(tmp_path):
+    return lambda env: SQLiteDB(env, path=str(tmp_path / "test.db"))
+
+@pytest.fixture
+def mock_logger():
+    return MagicMock(spec=logging.Logger)
+
+@pytest.mark.asyncio
+async def test_db_sqlite_schema_built_once(db_factory, mock_logger):
+    first = SQLiteIndexManager("test", mock_logger, db_factory=db_factory)
+    assert await first.ensure_indexes() == {"sqlite": list(SCHEMA)}
+    await first.close()
+
+    second = SQLiteIndexManager("test", mock_logger, db_factory=db_factory)
+    assert await second.ensure_indexes() == {"sqlite": []}
+    await second.close()
+
+@pytest.mark.asyncio
+async def test_db_sqlite_accounts(db_factory, mock_logger):
+    account_db = SQLiteAccountDB("test", mock_logger, db_factory=db_factory)
+    await account_db.insert({"user_id": "u1", "user": "bob", "email": "b@x.com", "password": "pw", "first_name": "Bob"})
+
+    assert await account_db.find_by_field("user", "bob") == {"user_id": "u1", "user": "bob", "email": "b@x.com", "first_name": "Bob"}
+    assert await account_db.find_by_field("email", "nobody@x.com") is None
+    assert (await account_db.validate_credentials("bob", "pw"))["user_id"] == "u1"
+    assert await account_db.validate_credentials("bob", "wrong") is None
+
+    with pytest.raises(ValueError, match="Invalid field or value provided for search."):
+        await account_db.find_by_field("password", "pw")
+    with pytest.raises(Exception):
+        await account_db.insert({"user_id": "u2", "user": "bob", "email": "c@x.com", "password": "pw"})
+
+    await account_db.close()
+
+@pytest.mark.asyncio
+async def test_db_sqlite_items(db_factory, mock_logger):
+    item_db = SQLiteItemDB("test", mock_logger, db_factory=db_factory)
+
+    with patch("src.db.sqlite.encrypt", side_effect=lambda token: f"enc-{token}"):
+        with pytest.raises(ValueError, match="User_id not found"):
+            await item_db.append_item("u1", "i1", "tok")
+
+        await item_db.insert("u1")
+        assert await item_db.get_items("u1") == []
+        assert await item_db.get_items("missing") == []
+
+        await item_db.append_item("u1", "i1", "tok", data={"name": "Bank", "mask": "1234"})
+        await item_db.append_item("u1", "i2", "tok2")
+        with pytest.raises(ValueError, match="Item already exists"):
+            await item_db.append_item("u1", "i1", "tok")
+
+        assert [item["item_id"] for item in await item_db.get_items("u1")] == ["i1", "i2"]
+        assert await item_db.get_items("u1", fields=["item_id", "item_data.name"]) == [{"item_id": "i1", "item_data": {"name": "Bank"}}, {"item_id": "i2"}]
+
+        await item_db.update_item_fields("u1", "i1", {"access_token": "new", "item_data.name": "Renamed"})
+        item = await item_db.get_item("u1", "i1")
+        assert item["access_token"] == "enc-new"
+        assert item["item_data"] == {"name": "Renamed", "mask": "1234"}
+        assert item["last_updated"] is not None
+        assert await item_db.get_item("u1", "i1", fields=["item_id", "access_token"]) == {"item_id": "i1", "access_token": "enc-new"}
+
+        await item_db.update_item_field("u1", "i2", "item_data", {"name": "Other"})
+        assert (await item_db.get_item("u1", "i2"))["item_data"] == {"name": "Other"}
+
+    with pytest.raises(ValueError, match="Item not found"):
+        await item_db.update_item_fields("u1", "missing", {"item_data.name": "x"})
+    with pytest.raises(ValueError, match="Invalid user_id, item_id, or fields provided for updating item fields"):
+        await item_db.update_item_fields("u1", "i1", {"status": "x"})
+
+    await item_db.remove_item("u1", "i1")
+    assert await item_db.get_item("u1", "i1") is None
+    assert [item["item_id"] for item in await item_db.get_items("u1")] == ["i2"]
+
+    await item_db.close()
+
+@pytest.mark.asyncio
+async def test_db_sqlite_revocations(db_factory, mock_logger):
+    clock = MagicMock(return_value=100)
+    revocations = SQLiteRevocationDB("test", mock_logger, db_factory=db_factory, clock=clock)
+
+    await revocations.revoke("s1", 150)
+    assert await revocations.is_revoked("s1")
+    assert not await revocations.is_revoked("s2")
+
+    assert await revocations.claim("s2", 120)
+    assert not await revocations.claim("s2", 120)
+
+    await revocations.set_valid_after("u1", 90, 200)
+    await revocations.set_valid_after("u1", 80, 130) # an older logout racing in keeps the latest epoch
+    assert await revocations.get_valid_after("u1") == 90
+    assert await revocations.get_valid_after("u2") is None
+
+    with pytest.raises(ValueError, match="Invalid key or exp provided for revocation"):
+        await revocations.revoke("", 150)
+
+    clock.return_value = 160
+    assert not await revocations.is_revoked("s1")
+    assert await revocations.claim("s2", 300) # its earlier claim ran out
+    assert await revocations.cleanup() == 1
+    assert await revocations.get_valid_after("u1") == 90
+
+    clock.return_value = 400
+    assert await revocations.cleanup() == 2
+    await revocations.close()
+
+@pytest.mark.asyncio
+async def test_db_sqlite_revocations_shared_across_connections(db_factory, mock_logger):
+    first = SQLiteRevocationDB("test", mock_logger, db_factory=db_factory)
+    second = SQLiteRevocationDB("test", mock_logger, db_factory=db_factory)
+
+    assert await first.claim("s1", 2**40)
+    assert not await second.claim("s1", 2**40)
+    assert await second.is_revoked("s1")
+
+    await first.close()
+    await second.close()
@@ -36,7 +36,7 @@ def test_plaid_init():
     # set up mocks
     mock_logger = MagicMock(spec=logging.Logger)
 
-    with patch("src.helpers.plaid.client.Env") as mock_env:
+    with patch("src.helpers.plaid.client.resolve_settings") as mock_env:
         with patch("src.helpers.plaid.client.httpx.AsyncClient") as mock_client:
             mock_env.return_value = {
                 "plaid": {
@@ -56,10 +56,13 @@ def test_plaid_init():
             mock_client.assert_called_once_with(base_url = "https://sandbox.plaid.com", timeout = 10.0, headers = {"Content-Type": "application/json"})
             mock_logger.info.assert_called_once_with("Plaid client initialized with base URL: %s", plaid.base_url)
 
+            # sub-clients are only built on first use, then reused
+            assert "items" not in vars(plaid)
             assert isinstance(plaid.transactions, TransactionsAPI)
             assert isinstance(plaid.items, ItemsAPI)
             assert isinstance(plaid.liabilities, LiabilitiesAPI)
             assert isinstance(plaid.investments, InvestmentsAPI)
+            assert plaid.items is plaid.items
 
 # Test _post method
 @pytest.mark.asyncio
@@ -0,0 +1,59 @@
+from src.helpers.cache import LRUCache
+from test.mocks.clock import FakeClock
+
+def test_cache_init_invalid():
+    for max_size, ttl in [(0, 10), ("10", 10), (10, 0), (10, "1")]:
+        try:
+            LRUCache(max_size, ttl)
+            assert False, "Expected ValueError for invalid cache settings"
+        except ValueError:
+            pass
+
+def test_cache_get_set_hit_and_miss():
+    cache = LRUCache(2, 10, clock=FakeClock())
+
+    assert cache.get("a") is None
+    cache.set("a", [1])
+    assert cache.get("a") == [1]
+    assert cache.get("b", "default") == "default"
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 2, 1)
+    assert stats["hit_rate"] == 1 / 3
+
+def test_cache_evicts_least_recently_used():
+    cache = LRUCache(2, 10, clock=FakeClock())
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a") # a is now most recently used
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.evictions == 1
+
+def test_cache_entries_expire():
+    clock = FakeClock()
+    cache = LRUCache(2, 10, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl_seconds=1)
+
+    clock.now = 5
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+
+    clock.now = 10
+    assert cache.get("a") is None
+    assert cache.expirations == 2
+    assert len(cache) == 0
+
+def test_cache_invalidate_and_clear():
+    cache = LRUCache(2, 10, clock=FakeClock())
+    cache.set("a", 1)
+    cache.set("b", 2)
+
+    assert cache.invalidate("a") is True
+    assert cache.invalidate("a") is False
+    cache.clear()
+    assert len(cache) == 0
@@ -0,0 +1,91 @@
+from src.helpers.compression_middleware import GZipMiddleware, accepts_gzip
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+from unittest.mock import AsyncMock
+import gzip
+import pytest
+
+BIG = "x" * 2000
+
+def app_with_gzip(**kwargs) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(GZipMiddleware, minimum_size=1000, **kwargs)
+
+    @app.get("/small")
+    async def small():
+        return PlainTextResponse("pong")
+
+    @app.get("/big")
+    async def big():
+        return PlainTextResponse(BIG)
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for n in range(3):
+                yield f"chunk-{n};" * 200
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    return app
+
+def test_gzip_init_invalid():
+    for minimum_size, level in [(-1, 6), ("10", 6), (10, 0), (10, 10)]:
+        try:
+            GZipMiddleware(None, minimum_size=minimum_size, level=level)
+            assert False, "Expected ValueError for invalid gzip settings"
+        except ValueError:
+            pass
+
+def test_gzip_accepts_gzip():
+    assert accepts_gzip("gzip")
+    assert accepts_gzip("br, gzip;q=0.5")
+    assert accepts_gzip("*")
+    assert not accepts_gzip("")
+    assert not accepts_gzip("br, deflate")
+    assert not accepts_gzip("gzip;q=0")
+    assert not accepts_gzip("*, gzip;q=0")
+    assert not accepts_gzip("gzip;q=abc")
+
+def test_gzip_compresses_large_response():
+    client = TestClient(app_with_gzip())
+
+    response = client.get("/big", headers={"accept-encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) < len(BIG)
+    assert response.text == BIG
+
+def test_gzip_skips_small_and_unaccepted_responses():
+    client = TestClient(app_with_gzip())
+
+    small = client.get("/small", headers={"accept-encoding": "gzip"})
+    identity = client.get("/big", headers={"accept-encoding": "identity"})
+
+    assert "content-encoding" not in small.headers
+    assert small.text == "pong"
+    assert "content-encoding" not in identity.headers
+    assert identity.text == BIG
+
+def test_gzip_streams_chunks():
+    client = TestClient(app_with_gzip())
+    expected = "".join(f"chunk-{n};" * 200 for n in range(3))
+
+    with client.stream("GET", "/stream", headers={"accept-encoding": "gzip"}) as response:
+        raw = b"".join(response.iter_raw())
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert gzip.decompress(raw).decode() == expected
+
+@pytest.mark.asyncio
+async def test_gzip_skips_non_http_scopes():
+    inner = AsyncMock()
+    middleware = GZipMiddleware(inner)
+    scope = {"type": "lifespan"}
+
+    await middleware(scope, None, None)
+
+    inner.assert_awaited_once_with(scope, None, None)
@@ -0,0 +1,254 @@
+from src.helpers.idempotency_middleware import IdempotencyMiddleware
+from src.helpers.request_context_middleware import RequestContextMiddleware, RequestContext, AuthError, auth_error_handler, request_ctx
+from src.helpers.dependencies import require_user
+from src.helpers.load_shedding import TokenBucket
+from src.db.idempotency_db import MemoryIdempotencyDB
+
+from fastapi import Depends, FastAPI, Response, status
+from fastapi.testclient import TestClient
+from unittest.mock import MagicMock, AsyncMock
+import asyncio
+import pytest
+import uuid
+
+def app_with_idempotency(**options):
+    app = FastAPI()
+    app.add_middleware(IdempotencyMiddleware, routes={("POST", "/charge"), ("PUT", "/fail")}, **options)
+    app.add_middleware(RequestContextMiddleware)
+    app.add_exception_handler(AuthError, auth_error_handler)
+    app.state.logger = MagicMock()
+    app.state.sessionManager = MagicMock()
+    app.state.sessionManager.validate = AsyncMock(side_effect=lambda token: f"user-{token}")
+    app.state.idempotencyDB = MemoryIdempotencyDB()
+    calls = {"charge": 0, "fail": 0, "fail_status": status.HTTP_500_INTERNAL_SERVER_ERROR}
+
+    @app.post("/charge")
+    async def charge(body: dict, user_id = Depends(require_user)):
+        calls["charge"] += 1
+        return {"user_id": user_id, "amount": body["amount"], "call": calls["charge"]}
+
+    @app.put("/fail")
+    async def fail(response: Response, user_id = Depends(require_user)):
+        calls["fail"] += 1
+        response.status_code = calls["fail_status"]
+        return {"error": "boom"}
+
+    return app, calls
+
+def _hdr(key = "key-1", token = "a"):
+    headers = {"request-id": str(uuid.uuid4()), "Authorization": f"Bearer {token}"}
+    if key is not None:
+        headers["Idempotency-Key"] = key
+    return headers
+
+def test_idempotency_replays_stored_response():
+    app, calls = app_with_idempotency()
+    client = TestClient(app)
+
+    first = client.post("/charge", json={"amount": 5}, headers=_hdr())
+    retry = client.post("/charge", json={"amount": 5}, headers=_hdr())
+
+    assert calls["charge"] == 1
+    assert retry.status_code == first.status_code == 200
+    assert retry.json() == first.json() == {"user_id": "user-a", "amount": 5, "call": 1}
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert retry.headers["content-type"] == "application/json"
+    assert "idempotent-replayed" not in first.headers
+
+def test_idempotency_keys_are_scoped_per_user_and_key():
+    app, calls = app_with_idempotency()
+    client = TestClient(app)
+
+    client.post("/charge", json={"amount": 5}, headers=_hdr())
+    other_user = client.post("/charge", json={"amount": 5}, headers=_hdr(token="b"))
+    other_key = client.post("/charge", json={"amount": 5}, headers=_hdr(key="key-2"))
+    no_key = client.post("/charge", json={"amount": 5}, headers=_hdr(key=None))
+
+    assert calls["charge"] == 4
+    assert other_user.json()["user_id"] == "user-b"
+    assert other_key.json()["call"] == 3
+    assert no_key.json()["call"] == 4
+
+def test_idempotency_rejects_reused_key_with_different_body():
+    app, calls = app_with_idempotency()
+    client = TestClient(app)
+
+    client.post("/charge", json={"amount": 5}, headers=_hdr())
+    reused = client.post("/charge", json={"amount": 6}, headers=_hdr())
+
+    assert calls["charge"] == 1
+    assert reused.status_code == 422
+    assert reused.json() == {"error": "Idempotency-Key was already used with a different request"}
+
+def test_idempotency_invalid_key_and_unauthenticated():
+    app, calls = app_with_idempotency()
+    client = TestClient(app)
+
+    invalid = client.post("/charge", json={"amount": 5}, headers=_hdr(key="k" * 256))
+    headers = _hdr()
+    del headers["Authorization"]
+    unauthenticated = client.post("/charge", json={"amount": 5}, headers=headers)
+
+    assert invalid.status_code == 400
+    assert invalid.json() == {"error": "Invalid Idempotency-Key header"}
+    assert unauthenticated.status_code == 401
+    assert calls["charge"] == 0
+
+# upstream and db failures surface as 4xx from some routes, only successes are kept
+@pytest.mark.parametrize("fail_status", [500, 502, 400, 409])
+def test_idempotency_does_not_store_errors(fail_status):
+    app, calls = app_with_idempotency()
+    calls["fail_status"] = fail_status
+    client = TestClient(app)
+
+    client.put("/fail", headers=_hdr())
+    client.put("/fail", headers=_hdr())
+
+    assert calls["fail"] == 2
+    assert app.state.idempotencyDB.records == {}
+
+@pytest.mark.asyncio
+async def test_idempotency_collapses_concurrent_duplicates():
+    release = asyncio.Event()
+    calls = []
+
+    async def inner(scope, receive, send):
+        calls.append(scope["path"])
+        await release.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": b'{"ok":true}'})
+
+    middleware = IdempotencyMiddleware(inner, routes={("POST", "/charge")})
+    state = MagicMock()
+    state.idempotencyDB = MemoryIdempotencyDB()
+    state.logger = MagicMock()
+    state.sessionManager.validate = AsyncMock(return_value="user-a")
+
+    async def run():
+        request_ctx.set(RequestContext(request_id="r", authorization="Bearer a"))
+        scope = {"type": "http", "method": "POST", "path": "/charge", "query_string": b"", "app": MagicMock(state=state),
+                 "headers": [(b"idempotency-key", b"k")]}
+        messages = []
+        async def receive():
+            return {"type": "http.request", "body": b"{}", "more_body": False}
+        async def send(message):
+            messages.append(message)
+        await middleware(scope, receive, send)
+        return messages
+
+    first = asyncio.create_task(run())
+    second = asyncio.create_task(run())
+    await asyncio.sleep(0.01)
+    release.set()
+    first_messages, second_messages = await asyncio.gather(first, second)
+
+    assert calls == ["/charge"]
+    assert first_messages[-1]["body"] == second_messages[-1]["body"] == b'{"ok":true}'
+    assert (b"idempotent-replayed", b"true") in second_messages[0]["headers"]
+
+def test_idempotency_replays_take_a_rate_limit_token():
+    app, calls = app_with_idempotency(rate_limited=True)
+    app.state.rateLimiter = TokenBucket(rate=0.01, burst=1)
+    client = TestClient(app)
+
+    client.post("/charge", json={"amount": 5}, headers=_hdr()) # the route's own dependency would charge this one
+    replay = client.post("/charge", json={"amount": 5}, headers=_hdr())
+    limited = client.post("/charge", json={"amount": 5}, headers=_hdr())
+
+    assert calls["charge"] == 1
+    assert replay.status_code == 200
+    assert limited.status_code == 429
+    assert limited.json() == {"detail": {"error": "Too many requests"}}
+    assert limited.headers["retry-after"] == "100"
+
+def blocking_route(calls: list, release: asyncio.Event, fail: bool = False):
+    async def inner(scope, receive, send):
+        calls.append(scope["path"])
+        await release.wait()
+        if fail:
+            raise RuntimeError("boom")
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": b'{"ok":true}'})
+    return inner
+
+def worker_state(store) -> MagicMock:
+    state = MagicMock()
+    state.idempotencyDB = store
+    state.logger = MagicMock()
+    state.sessionManager.validate = AsyncMock(return_value="user-a")
+    return state
+
+async def call(middleware, state) -> list:
+    request_ctx.set(RequestContext(request_id="r", authorization="Bearer a"))
+    scope = {"type": "http", "method": "POST", "path": "/charge", "query_string": b"", "app": MagicMock(state=state),
+             "headers": [(b"idempotency-key", b"k")]}
+    messages = []
+    async def receive():
+        return {"type": "http.request", "body": b"{}", "more_body": False}
+    async def send(message):
+        messages.append(message)
+    await middleware(scope, receive, send)
+    return messages
+
+# two middlewares with their own in-flight maps stand in for two workers sharing the store
+@pytest.mark.asyncio
+async def test_idempotency_duplicate_on_another_worker_waits_for_the_result():
+    release, calls = asyncio.Event(), []
+    state = worker_state(MemoryIdempotencyDB())
+    first_worker = IdempotencyMiddleware(blocking_route(calls, release), routes={("POST", "/charge")})
+    second_worker = IdempotencyMiddleware(blocking_route(calls, release), routes={("POST", "/charge")}, poll_interval=0.01)
+
+    first = asyncio.create_task(call(first_worker, state))
+    await asyncio.sleep(0.01)
+    second = asyncio.create_task(call(second_worker, state))
+    await asyncio.sleep(0.03)
+    release.set()
+    first_messages, second_messages = await asyncio.gather(first, second)
+
+    assert calls == ["/charge"]
+    assert first_messages[-1]["body"] == second_messages[-1]["body"] == b'{"ok":true}'
+    assert (b"idempotent-replayed", b"true") in second_messages[0]["headers"]
+
+@pytest.mark.asyncio
+async def test_idempotency_duplicate_on_another_worker_gets_409_while_still_running():
+    release, calls = asyncio.Event(), []
+    state = worker_state(MemoryIdempotencyDB())
+    first_worker = IdempotencyMiddleware(blocking_route(calls, release), routes={("POST", "/charge")})
+    second_worker = IdempotencyMiddleware(blocking_route(calls, release), routes={("POST", "/charge")}, wait_seconds=0.05, poll_interval=0.01)
+
+    first = asyncio.create_task(call(first_worker, state))
+    await asyncio.sleep(0.01)
+    second_messages = await call(second_worker, state)
+    release.set()
+    await first
+
+    assert calls == ["/charge"]
+    assert second_messages[0]["status"] == 409
+    assert (b"retry-after", b"1") in second_messages[0]["headers"]
+    assert second_messages[-1]["body"] == b'{"error":"A request with this Idempotency-Key is still in progress"}'
+
+@pytest.mark.asyncio
+async def test_idempotency_failed_route_releases_the_claim():
+    release, calls = asyncio.Event(), []
+    release.set()
+    store = MemoryIdempotencyDB()
+    state = worker_state(store)
+
+    with pytest.raises(RuntimeError, match="boom"):
+        await call(IdempotencyMiddleware(blocking_route(calls, release, fail=True), routes={("POST", "/charge")}), state)
+    assert store.records == {}
+
+    # another worker's retry runs the route instead of waiting on a claim nobody finishes
+    messages = await call(IdempotencyMiddleware(blocking_route(calls, release), routes={("POST", "/charge")}), state)
+    assert calls == ["/charge", "/charge"]
+    assert messages[-1]["body"] == b'{"ok":true}'
+
+@pytest.mark.asyncio
+async def test_idempotency_skips_non_http_scopes():
+    inner = AsyncMock()
+    middleware = IdempotencyMiddleware(inner, routes=set())
+    scope = {"type": "lifespan"}
+
+    await middleware(scope, None, None)
+
+    inner.assert_awaited_once_with(scope, None, None)
@@ -0,0 +1,116 @@
+from src.helpers.load_shedding import ConcurrencyLimiter, ConcurrencyLimitMiddleware, TokenBucket
+from test.mocks.clock import FakeClock
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from unittest.mock import MagicMock, AsyncMock
+import asyncio
+import pytest
+
+def test_limiter_init_invalid():
+    for args in [(0, 1, 1), (1, -1, 1), (1, 1, -1), ("1", 1, 1)]:
+        try:
+            ConcurrencyLimiter(*args)
+            assert False, "Expected ValueError for invalid limiter settings"
+        except ValueError:
+            pass
+
+@pytest.mark.asyncio
+async def test_limiter_queues_then_sheds():
+    limiter = ConcurrencyLimiter(max_concurrent=1, max_queue=1, queue_timeout=1)
+
+    assert await limiter.acquire()
+    queued = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+
+    # queue is full, the next request is shed right away
+    assert not await limiter.acquire()
+    assert limiter.stats() == {"active": 1, "waiting": 1, "shed": 1}
+
+    limiter.release()
+    assert await queued
+    limiter.release()
+    assert limiter.stats() == {"active": 0, "waiting": 0, "shed": 1}
+
+@pytest.mark.asyncio
+async def test_limiter_sheds_after_queue_timeout():
+    limiter = ConcurrencyLimiter(max_concurrent=1, max_queue=5, queue_timeout=0.01)
+
+    assert await limiter.acquire()
+    assert not await limiter.acquire()
+    assert limiter.stats()["waiting"] == 0
+    assert limiter.stats()["shed"] == 1
+
+def test_token_bucket_init_invalid():
+    for rate, burst in [(0, 1), ("1", 1), (1, 0), (1, 1.5)]:
+        try:
+            TokenBucket(rate, burst)
+            assert False, "Expected ValueError for invalid token bucket settings"
+        except ValueError:
+            pass
+
+def test_token_bucket_limits_and_refills_per_key():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, burst=2, clock=clock)
+
+    assert bucket.take("u1") == 0
+    assert bucket.take("u1") == 0
+    assert bucket.take("u1") == 0.5
+    assert bucket.take("u2") == 0 # other users have their own bucket
+
+    clock.now = 0.5
+    assert bucket.take("u1") == 0
+    assert bucket.take("u1") == 0.5
+
+    # idle long enough for the bucket to be full again, it is dropped and starts over full
+    clock.now = 10
+    assert bucket.take("u1") == 0
+    assert bucket.take("u1") == 0
+    assert bucket.take("u1") > 0
+
+def app_with_limits(limiter) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(ConcurrencyLimitMiddleware, groups={"/plaid": limiter}, retry_after=3)
+    app.state.logger = MagicMock()
+
+    @app.get("/plaid/items")
+    async def items():
+        return {"ok": True}
+
+    @app.get("/plaidish")
+    async def plaidish():
+        return {"ok": True}
+
+    return app
+
+def test_limit_middleware_sheds_with_503_and_retry_after():
+    limiter = ConcurrencyLimiter(max_concurrent=1, max_queue=0, queue_timeout=1)
+    limiter.acquire = AsyncMock(return_value=False)
+    client = TestClient(app_with_limits(limiter))
+
+    shed = client.get("/plaid/items")
+    other = client.get("/plaidish")
+
+    assert shed.status_code == 503
+    assert shed.json() == {"error": "Service overloaded, retry later"}
+    assert shed.headers["retry-after"] == "3"
+    assert other.status_code == 200
+    client.app.state.logger.warning.assert_called_once_with("Request shed by concurrency limiter", path="/plaid/items", method="GET")
+
+def test_limit_middleware_releases_slot_after_response():
+    limiter = ConcurrencyLimiter(max_concurrent=1, max_queue=0, queue_timeout=1)
+    client = TestClient(app_with_limits(limiter))
+
+    assert client.get("/plaid/items").status_code == 200
+    assert client.get("/plaid/items").status_code == 200
+    assert limiter.stats() == {"active": 0, "waiting": 0, "shed": 0}
+
+@pytest.mark.asyncio
+async def test_limit_middleware_skips_non_http_scopes():
+    inner = AsyncMock()
+    middleware = ConcurrencyLimitMiddleware(inner, groups={"/": ConcurrencyLimiter(1, 0, 1)})
+    scope = {"type": "lifespan"}
+
+    await middleware(scope, None, None)
+
+    inner.assert_awaited_once_with(scope, None, None)
@@ -0,0 +1,155 @@
+from src.helpers.metrics import MetricsRegistry, MetricsMiddleware, register_cache_metrics, register_limiter_metrics
+from src.helpers.cache import LRUCache
+from src.helpers.load_shedding import ConcurrencyLimiter
+from test.mocks.clock import FakeClock
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from unittest.mock import AsyncMock
+import pytest
+
+def test_metrics_invalid_definitions():
+    registry = MetricsRegistry()
+    for build in [lambda: registry.counter("bad name", "x"),
+                  lambda: registry.histogram("h", "x", buckets=(1.0, 0.5)),
+                  lambda: registry.histogram("h", "x", buckets=())]:
+        try:
+            build()
+            assert False, "Expected ValueError for invalid metric"
+        except ValueError:
+            pass
+
+def test_metrics_registry_returns_existing_metric():
+    registry = MetricsRegistry()
+    counter = registry.counter("hits_total", "hits", ("route",))
+
+    assert registry.counter("hits_total", "hits", ("route",)) is counter
+    with pytest.raises(ValueError):
+        registry.gauge("hits_total", "hits", ("route",))
+
+def test_metrics_callback_reads_stats_on_render():
+    registry = MetricsRegistry()
+    stats = {("a",): 1}
+    registry.callback("things", "things held", ("name",), lambda: stats)
+
+    assert 'things{name="a"} 1' in registry.render()
+    stats[("a",)] = 5
+    assert 'things{name="a"} 5' in registry.render()
+
+    # registering again points the metric at the new source, another kind is a different metric
+    registry.callback("things", "things held", ("name",), lambda: {("b",): 2})
+    assert 'things{name="b"} 2' in registry.render() and 'name="a"' not in registry.render()
+    with pytest.raises(ValueError):
+        registry.callback("things", "things held", ("name",), dict, kind="counter")
+    with pytest.raises(ValueError, match="Invalid kind provided for metric"):
+        registry.callback("other", "x", (), dict, kind="histogram")
+
+def test_metrics_cache_and_limiter_stats():
+    registry = MetricsRegistry()
+    cache = LRUCache(1, 60)
+    cache.set("k1", 1)
+    cache.set("k2", 2) # evicts k1
+    cache.get("k2")
+    cache.get("k1")
+    limiter = ConcurrencyLimiter(max_concurrent=2, max_queue=1, queue_timeout=1.0)
+    register_cache_metrics(registry, lambda: {"items": cache.stats()})
+    register_limiter_metrics(registry, {"/plaid": limiter})
+
+    rendered = registry.render()
+
+    assert "# TYPE cache_entries gauge" in rendered and "# TYPE cache_hits_total counter" in rendered
+    for line in ['cache_entries{cache="items"} 1', 'cache_hits_total{cache="items"} 1', 'cache_misses_total{cache="items"} 1',
+                 'cache_evictions_total{cache="items"} 1', 'cache_expirations_total{cache="items"} 0',
+                 'concurrency_active{group="/plaid"} 0', 'concurrency_waiting{group="/plaid"} 0', 'concurrency_shed_total{group="/plaid"} 0']:
+        assert line in rendered
+
+def test_metrics_counter_and_gauge():
+    registry = MetricsRegistry()
+    counter = registry.counter("hits_total", "hits", ("route",))
+    gauge = registry.gauge("in_flight", "in flight")
+
+    counter.inc("/a")
+    counter.inc("/a", amount=2)
+    gauge.inc()
+    gauge.inc()
+    gauge.dec()
+
+    assert counter.value("/a") == 3
+    assert counter.value("/b") == 0
+    assert gauge.value() == 1
+    with pytest.raises(ValueError):
+        counter.inc("/a", amount=-1)
+    with pytest.raises(ValueError):
+        counter.inc()
+
+def test_metrics_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("latency_seconds", "latency", ("route",), buckets=(0.1, 1.0))
+
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe("/a", value=value)
+
+    text = registry.render()
+
+    assert histogram.count("/a") == 4
+    assert "# TYPE latency_seconds histogram" in text
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 2' in text
+    assert 'latency_seconds_bucket{route="/a",le="1.0"} 3' in text
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 4' in text
+    assert 'latency_seconds_sum{route="/a"} 3.65' in text
+    assert 'latency_seconds_count{route="/a"} 4' in text
+
+def test_metrics_escapes_label_values():
+    registry = MetricsRegistry()
+    registry.counter("hits_total", "hits", ("route",)).inc('/a"b\\')
+
+    assert 'hits_total{route="/a\\"b\\\\"} 1' in registry.render()
+
+def app_with_metrics(registry) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware, registry=registry, clock=FakeClock(step=0.02))
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: str):
+        return {"item_id": item_id}
+
+    return app
+
+def test_metrics_middleware_records_route_template_and_status():
+    registry = MetricsRegistry()
+    client = TestClient(app_with_metrics(registry))
+
+    client.get("/items/1")
+    client.get("/items/2")
+    client.get("/missing")
+
+    requests = registry._metrics["http_requests_total"]
+    latency = registry._metrics["http_request_duration_seconds"]
+    assert requests.value("GET", "/items/{item_id}", "200") == 2
+    assert requests.value("GET", "unmatched", "404") == 1
+    assert latency.count("GET", "/items/{item_id}", "200") == 2
+    assert registry._metrics["http_requests_in_flight"].value() == 0
+
+def test_metrics_middleware_serves_metrics_endpoint():
+    registry = MetricsRegistry()
+    client = TestClient(app_with_metrics(registry))
+    client.get("/items/1")
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == MetricsRegistry.CONTENT_TYPE
+    assert 'http_requests_total{method="GET",route="/items/{item_id}",status="200"} 1' in response.text
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/items/{item_id}",status="200",le="0.025"} 1' in response.text
+
+@pytest.mark.asyncio
+async def test_metrics_middleware_skips_non_http_scopes():
+    inner = AsyncMock()
+    registry = MetricsRegistry()
+    middleware = MetricsMiddleware(inner, registry)
+    scope = {"type": "lifespan"}
+
+    await middleware(scope, None, None)
+
+    inner.assert_awaited_once_with(scope, None, None)
+    assert registry._metrics["http_requests_total"]._values == {}
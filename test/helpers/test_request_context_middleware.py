@@ -0,0 +1,89 @@
+from src.helpers.request_context_middleware import RequestContextMiddleware, request_ctx, AuthError, auth_error_handler
+from src.helpers.dependencies import require_user
+
+from fastapi import Depends, FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from unittest.mock import MagicMock, AsyncMock
+import pytest
+import uuid
+
+def app_with_middleware() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(RequestContextMiddleware)
+    app.add_exception_handler(AuthError, auth_error_handler)
+    app.state.logger = MagicMock()
+    app.state.sessionManager = MagicMock()
+    app.state.sessionManager.validate = AsyncMock(return_value="user-123")
+
+    @app.get("/ctx")
+    async def ctx():
+        context = request_ctx.get()
+        return {"request_id": context.request_id, "user_id": context.user_id}
+
+    @app.get("/me")
+    async def me(user_id = Depends(require_user), again = Depends(require_user)):
+        return {"user_id": user_id, "again": again}
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for n in range(3):
+                yield f"chunk-{n};"
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    return app
+
+def test_request_context_visible_to_route_and_reset():
+    client = TestClient(app_with_middleware())
+    rid = str(uuid.uuid4())
+
+    response = client.get("/ctx", headers={"request-id": rid, "Authorization": "Bearer tok"})
+
+    # nothing asked for the user, so the token is never validated
+    assert response.json() == {"request_id": rid, "user_id": None}
+    assert response.headers["request-id"] == rid
+    assert request_ctx.get(None) is None
+    client.app.state.sessionManager.validate.assert_not_awaited()
+
+def test_request_context_resolves_user_once_per_request():
+    client = TestClient(app_with_middleware())
+
+    response = client.get("/me", headers={"request-id": str(uuid.uuid4()), "Authorization": "Bearer tok"})
+
+    assert response.status_code == 200
+    assert response.json() == {"user_id": "user-123", "again": "user-123"}
+    client.app.state.sessionManager.validate.assert_awaited_once_with("tok")
+
+def test_request_context_protected_route_rejects_bad_auth():
+    client = TestClient(app_with_middleware())
+    client.app.state.sessionManager.validate.side_effect = Exception("bad token")
+
+    scheme = client.get("/me", headers={"request-id": str(uuid.uuid4()), "Authorization": "Token tok"})
+    token = client.get("/me", headers={"request-id": str(uuid.uuid4()), "Authorization": "Bearer tok"})
+    missing = client.get("/me", headers={"request-id": str(uuid.uuid4())})
+
+    assert scheme.status_code == 400
+    assert scheme.json() == {"error": "Invalid Authorization header scheme (must be Bearer)"}
+    assert token.status_code == 401
+    assert token.json() == {"error": "Invalid or expired token"}
+    assert missing.status_code == 401
+    assert missing.json() == {"detail": {"error": "Protected route requires valid authentication"}}
+
+def test_request_context_streams_response_through():
+    client = TestClient(app_with_middleware())
+    rid = str(uuid.uuid4())
+
+    with client.stream("GET", "/stream", headers={"request-id": rid}) as response:
+        assert response.headers["request-id"] == rid
+        assert "".join(response.iter_text()) == "chunk-0;chunk-1;chunk-2;"
+
+@pytest.mark.asyncio
+async def test_request_context_skips_non_http_scopes():
+    inner = AsyncMock()
+    middleware = RequestContextMiddleware(inner)
+    scope = {"type": "lifespan"}
+
+    await middleware(scope, None, None)
+
+    inner.assert_awaited_once_with(scope, None, None)
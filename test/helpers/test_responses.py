@@ -0,0 +1,19 @@
+from src.helpers.responses import FastJSONResponse
+
+from bson import ObjectId
+from datetime import datetime, timezone
+import json
+
+def test_fast_json_response_renders_compact_bytes():
+    response = FastJSONResponse({"id": "i1", "products": ["auth"], "count": 2, "none": None})
+
+    assert response.body == b'{"id":"i1","products":["auth"],"count":2,"none":null}'
+    assert response.headers["content-type"] == "application/json"
+
+def test_fast_json_response_handles_non_json_types():
+    oid = ObjectId()
+    when = datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+
+    body = json.loads(FastJSONResponse({"_id": oid, "at": when, 1: "int key"}).body)
+
+    assert body == {"_id": str(oid), "at": "2024-01-02T03:04:05+00:00", "1": "int key"}
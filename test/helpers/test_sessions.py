@@ -1,6 +1,14 @@
-from src.helpers.sessions import SessionManager
+from src.helpers.sessions import SessionManager, _revocation_key, _b64, _canonical_json
+from src.db.revocation_db import MemoryRevocationDB
+from src.helpers.cache import LRUCache
+from src.helpers.signing import Ed25519Verifier
 
-from unittest.mock import MagicMock, patch
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+
+from unittest.mock import MagicMock, AsyncMock, patch
+import pytest
+import asyncio
 import logging
 import base64
 import time
@@ -12,12 +20,23 @@ def session_manager_with_mocks() -> SessionManager:
     mock_logger = MagicMock(spec=logging.Logger)
 
     session_manager = SessionManager.__new__(SessionManager)
-    session_manager.deactivated_sessions = set()
+    session_manager.revocations = MemoryRevocationDB()
+    session_manager.not_revoked = LRUCache(100, 5)
+    session_manager.validated = LRUCache(100, 3600)
+    session_manager.user_epochs = LRUCache(100, 5)
+    session_manager._cleanup_task = None
     session_manager.session_duration = 3600
+    session_manager.refresh_duration = None
     session_manager.secret_key = "test_secret_key"
     session_manager.cleanup_interval = 600
     session_manager.header_b64 = "test_header_b64"
     session_manager.alg = "SHA1"
+    session_manager.token_version = 2
+    session_manager.header_v2_b64 = _b64(_canonical_json({"alg": "SHA1", "typ": "JWT", "v": 2}))
+    session_manager._mac = hmac.new(b"test_secret_key", digestmod=hashlib.sha1)
+    session_manager.signing_key = None
+    session_manager.header_ed25519_b64 = None
+    session_manager.verifier = Ed25519Verifier({})
     session_manager.logger = mock_logger
 
     return session_manager, mock_logger
@@ -27,7 +46,7 @@ def test_session_manager_init():
     mock_logger = MagicMock(spec=logging.Logger)
 
     # Patch the Env import
-    with patch("src.helpers.sessions.Env") as mock_env:
+    with patch("src.helpers.sessions.resolve_settings") as mock_env:
         mock_env.return_value = {'session': 
             {
                 'DURATION_SECONDS': 3600,
@@ -45,10 +64,18 @@ def test_session_manager_init():
         assert session_manager.cleanup_interval == 600
         assert session_manager.header_b64 == base64.urlsafe_b64encode(bytes(str({'algorithm': 'HS256'}), encoding='utf-8')).rstrip(b'=').decode()
         assert session_manager.alg == "HS256"
+        assert session_manager.token_version == 1
+        assert session_manager.signing_key is None
+        assert session_manager.public_keys() == {"keys": []}
+        assert json.loads(base64.urlsafe_b64decode(session_manager.header_v2_b64 + '==')) == {"alg": "HS256", "typ": "JWT", "v": 2}
+        assert isinstance(session_manager.revocations, MemoryRevocationDB)
+        assert session_manager.not_revoked.ttl_seconds == 5
+        assert session_manager.validated.max_size == 10000
         mock_logger.info.assert_called_with("SessionManager initialized")
 
 # POSTIVE test for create
-def test_create_session_positive():
+@pytest.mark.asyncio
+async def test_create_session_positive():
     session_manager, mock_logger = session_manager_with_mocks()
     user_id = "user123"
 
@@ -56,23 +83,25 @@ def test_create_session_positive():
 
     assert isinstance(session_token, str)
     # token should validate and return the original user id
-    validated = session_manager.validate(session_token)
+    validated = await session_manager.validate(session_token)
     assert validated == user_id
     mock_logger.error.assert_not_called()
 
 # POSITIVE tests for validate
-def test_validate_session_positive_valid_token():
+@pytest.mark.asyncio
+async def test_validate_session_positive_valid_token():
     session_manager, mock_logger = session_manager_with_mocks()
     user_id = "user123"
 
     session_token = session_manager.create(user_id)
 
-    validated_user_id = session_manager.validate(session_token)
+    validated_user_id = await session_manager.validate(session_token)
 
     assert validated_user_id == user_id
     mock_logger.error.assert_not_called()
 
-def test_validate_session_positive_expired_token():
+@pytest.mark.asyncio
+async def test_validate_session_positive_expired_token():
     session_manager, mock_logger = session_manager_with_mocks()
     session_manager.session_duration = 1 # Set short duration for testing
     user_id = "user123"
@@ -82,26 +111,29 @@ def test_validate_session_positive_expired_token():
     time.sleep(2) # wait for token to expire
 
     try:
-        session_manager.validate(session_token)
+        await session_manager.validate(session_token)
         assert False, "Expected ValueError for expired token"
     except ValueError as e:
         assert str(e) == "Session token has expired"
         mock_logger.error.assert_called_with("Session token has expired")
-        assert session_token in session_manager.deactivated_sessions
+        # expired tokens are rejected on exp, nothing needs to be revoked
+        assert session_manager.revocations.revoked == {}
 
 # NEGATIVE test for validate
-def test_validate_session_negative_invalid_format():
+@pytest.mark.asyncio
+async def test_validate_session_negative_invalid_format():
     session_manager, mock_logger = session_manager_with_mocks()
     invalid_token = "header.payload" # missing signature
 
     try:
-        session_manager.validate(invalid_token)
+        await session_manager.validate(invalid_token)
         assert False, "Expected ValueError for invalid token format"
     except ValueError as e:
         assert str(e) == "Invalid session token format"
         mock_logger.error.assert_called_with("Invalid session token format")
 
-def test_validate_session_negative_invalid_signature():
+@pytest.mark.asyncio
+async def test_validate_session_negative_invalid_signature():
     session_manager, mock_logger = session_manager_with_mocks()
     user_id = "user123"
 
@@ -112,32 +144,35 @@ def test_validate_session_negative_invalid_signature():
     tampered_token = '.'.join(tampered_token)
 
     try:
-        session_manager.validate(tampered_token)
+        await session_manager.validate(tampered_token)
         assert False, "Expected ValueError for invalid token signature"
     except ValueError as e:
         assert str(e) == "Invalid session token signature"
         mock_logger.error.assert_called_with("Invalid session token signature")
 
 # POSITIVE test for invalidate
-def test_invalidate_session_positive():
+@pytest.mark.asyncio
+async def test_invalidate_session_positive():
     session_manager, mock_logger = session_manager_with_mocks()
     user_id = "user123"
 
     session_token = session_manager.create(user_id)
-    # invalidate should add the token to `deactivated_sessions`
-    session_manager.invalidate(session_token)
-    assert session_token in session_manager.deactivated_sessions
+    # invalidate should revoke the token until it would have expired anyway
+    await session_manager.invalidate(session_token)
+    assert session_manager.revocations.revoked == {session_manager._claims(session_token)['jti']: session_manager._token_exp(session_token)}
+    assert await session_manager.is_revoked(session_token)
     mock_logger.debug.assert_called_with("Invalidating specified session token")
 
 # NEGATIVE test for invalidate
-def test_invalidate_session_negative_nonexistent_token():
+@pytest.mark.asyncio
+async def test_invalidate_session_negative_nonexistent_token():
     session_manager, mock_logger = session_manager_with_mocks()
     non_existent_token = "nonexistent.token.signature"
 
     try:
         # invalidating a token that was never issued should still add it
-        session_manager.invalidate(non_existent_token)
-        assert non_existent_token in session_manager.deactivated_sessions
+        await session_manager.invalidate(non_existent_token)
+        assert await session_manager.is_revoked(non_existent_token)
         mock_logger.debug.assert_called_with("Invalidating specified session token")
     except Exception as e:
         assert False, f"Expected no exception for invalidating non-existent token, but got: {e}"
@@ -153,25 +188,28 @@ def test_sessions_create_payload_fields():
 
     assert payload['id'] == user_id
     assert 'iat' in payload and 'exp' in payload
+    assert payload['iat_ms'] // 1000 == payload['iat']
     assert payload['exp'] - payload['iat'] == session_manager.session_duration
 
 
-def test_sessions_validate_deactivated_token():
+@pytest.mark.asyncio
+async def test_sessions_validate_deactivated_token():
     session_manager, mock_logger = session_manager_with_mocks()
     user_id = "u-deactivated"
 
     token = session_manager.create(user_id)
-    session_manager.deactivated_sessions.add(token)
+    await session_manager.invalidate(token)
 
     try:
-        session_manager.validate(token)
+        await session_manager.validate(token)
         assert False, "Expected ValueError for deactivated token"
     except ValueError as e:
         assert str(e) == "Session token has been deactivated"
         mock_logger.error.assert_called_with("Session token has been deactivated")
 
 
-def test_sessions_validate_malformed_payload_logs_and_raises():
+@pytest.mark.asyncio
+async def test_sessions_validate_malformed_payload_logs_and_raises():
     session_manager, mock_logger = session_manager_with_mocks()
     # craft a payload that's not valid JSON but with a correct signature
     bad_payload = b"not-json-payload"
@@ -184,14 +222,15 @@ def test_sessions_validate_malformed_payload_logs_and_raises():
     malformed_token = f"{header_b64}.{payload_b64}.{signature_b64}"
 
     try:
-        session_manager.validate(malformed_token)
+        await session_manager.validate(malformed_token)
         assert False, "Expected ValueError for invalid session token payload"
     except ValueError as e:
         assert str(e) == "Invalid session token payload"
         mock_logger.error.assert_called_with("Invalid session token payload")
 
 
-def test_sessions_cleanup_removes_expired_deactivated_sessions():
+@pytest.mark.asyncio
+async def test_sessions_cleanup_removes_expired_deactivated_sessions():
     session_manager, mock_logger = session_manager_with_mocks()
     # create one short-lived and one long-lived token
     session_manager.session_duration = 1
@@ -201,13 +240,320 @@ def test_sessions_cleanup_removes_expired_deactivated_sessions():
     t2 = session_manager.create("b")
 
     # mark both as deactivated
-    session_manager.deactivated_sessions.add(t1)
-    session_manager.deactivated_sessions.add(t2)
+    await session_manager.invalidate(t1)
+    await session_manager.invalidate(t2)
 
     time.sleep(2)
 
-    session_manager.cleanup()
+    await session_manager.cleanup()
+
+    assert session_manager._claims(t1)['jti'] not in session_manager.revocations.revoked
+    assert session_manager._claims(t2)['jti'] in session_manager.revocations.revoked
+    mock_logger.debug.assert_called_with("Cleaning up 1 expired deactivated sessions")
+
+@pytest.mark.asyncio
+async def test_sessions_not_revoked_cache_skips_store():
+    session_manager, _ = session_manager_with_mocks()
+    session_manager.revocations = AsyncMock()
+    session_manager.revocations.is_revoked.return_value = False
+    session_manager.revocations.get_valid_after.return_value = None
+    token = session_manager.create("u1")
+    jti = session_manager._claims(token)['jti']
+
+    assert await session_manager.validate(token) == "u1"
+    assert await session_manager.validate(token) == "u1"
+    session_manager.revocations.is_revoked.assert_awaited_once_with(jti)
+    session_manager.revocations.get_valid_after.assert_awaited_once_with("u1")
+
+    # a logout on this worker applies immediately
+    await session_manager.invalidate(token)
+    session_manager.revocations.revoke.assert_awaited_once_with(jti, session_manager._token_exp(token))
+    session_manager.revocations.is_revoked.return_value = True
+    with pytest.raises(ValueError, match="Session token has been deactivated"):
+        await session_manager.validate(token)
+
+@pytest.mark.asyncio
+async def test_sessions_invalid_tokens_never_reach_store():
+    session_manager, _ = session_manager_with_mocks()
+    session_manager.revocations = AsyncMock()
+
+    with pytest.raises(ValueError, match="Invalid session token signature"):
+        await session_manager.validate("a.b.c")
+    session_manager.revocations.is_revoked.assert_not_awaited()
+
+@pytest.mark.asyncio
+async def test_sessions_close_closes_store():
+    session_manager, _ = session_manager_with_mocks()
+    session_manager.revocations = AsyncMock()
+
+    await session_manager.close()
+
+    session_manager.revocations.close.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_sessions_cleanup_task_runs_until_close():
+    session_manager, mock_logger = session_manager_with_mocks()
+    session_manager.cleanup_interval = 0.01
+    session_manager.revocations = AsyncMock()
+    session_manager.revocations.cleanup.side_effect = [Exception("Database error"), 2, 0, 0, 0, 0, 0, 0]
+
+    session_manager.start_cleanup()
+    task = session_manager._cleanup_task
+    session_manager.start_cleanup() # already running
+    assert session_manager._cleanup_task is task
+
+    while session_manager.revocations.cleanup.await_count < 2:
+        await asyncio.sleep(0.01)
+    await session_manager.close()
+
+    assert task.cancelled()
+    assert session_manager._cleanup_task is None
+    # a failed pass is logged and the loop keeps going
+    mock_logger.error.assert_called_once()
+    assert mock_logger.error.call_args[0][0] == "Failed to clean up deactivated sessions: %s"
+
+@pytest.mark.asyncio
+async def test_sessions_validated_cache_skips_signature_check():
+    session_manager, _ = session_manager_with_mocks()
+    token = session_manager.create("u1")
+
+    with patch.object(session_manager, "_sign", wraps=session_manager._sign) as mock_sign:
+        assert await session_manager.validate(token) == "u1"
+        assert await session_manager.validate(token) == "u1"
+        assert await session_manager.validate(token) == "u1"
+    assert mock_sign.call_count == 1
+
+    stats = session_manager.cache_stats()
+    assert (stats["validated"]["hits"], stats["validated"]["misses"]) == (2, 1)
+    assert stats["not_revoked"]["hits"] == 2
+
+@pytest.mark.asyncio
+async def test_sessions_validated_cache_purged_on_invalidate_and_expiry():
+    session_manager, _ = session_manager_with_mocks()
+    token = session_manager.create("u1")
+    await session_manager.validate(token)
+
+    await session_manager.invalidate(token)
+    assert session_manager.validated.get(token) is None
+    with pytest.raises(ValueError, match="Session token has been deactivated"):
+        await session_manager.validate(token)
+
+    # a cached entry past its exp is still rejected
+    other = session_manager.create("u2")
+    session_manager.validated.set(other, ("u2", 0, int(time.time()) - 1, _revocation_key(other)))
+    with pytest.raises(ValueError, match="Session token has expired"):
+        await session_manager.validate(other)
+    assert session_manager.validated.get(other) is None
+
+def test_sessions_v2_token_is_compact_json():
+    session_manager, _ = session_manager_with_mocks()
+    v2 = session_manager.create("user123")
+    session_manager.token_version = 1
+    v1 = session_manager.create("user123")
+
+    header_b64, payload_b64, signature_b64 = v2.split('.')
+    assert header_b64 == session_manager.header_v2_b64
+    assert base64.urlsafe_b64decode(payload_b64 + '==').startswith(b'{"exp":')
+    assert len(base64.urlsafe_b64decode(signature_b64 + '==')) == hashlib.sha1().digest_size
+    assert len(v2) < len(v1)
+
+@pytest.mark.asyncio
+async def test_sessions_validate_accepts_v1_and_v2():
+    session_manager, mock_logger = session_manager_with_mocks()
+    v2 = session_manager.create("o'brien") # v1 payload parsing would mangle the quote
+    session_manager.token_version = 1
+    v1 = session_manager.create("user123")
+
+    assert await session_manager.validate(v2) == "o'brien"
+    assert await session_manager.validate(v1) == "user123"
+    mock_logger.error.assert_not_called()
+
+    # a v1 signature under the v2 header does not verify
+    header_b64, payload_b64, _ = v2.split('.')
+    forged = f"{header_b64}.{payload_b64}.{v1.split('.')[2]}"
+    with pytest.raises(ValueError, match="Invalid session token signature"):
+        await session_manager.validate(forged)
+
+def test_sessions_payload_has_unique_jti():
+    session_manager, _ = session_manager_with_mocks()
+
+    first = session_manager._claims(session_manager.create("u1"))
+    second = session_manager._claims(session_manager.create("u1"))
+
+    assert first['jti'] and first['jti'] != second['jti']
+
+@pytest.mark.asyncio
+async def test_sessions_revoke_session_by_id():
+    session_manager, _ = session_manager_with_mocks()
+    token = session_manager.create("u1")
+    assert await session_manager.validate(token) == "u1"
+
+    await session_manager.revoke_session(session_manager._claims(token)['jti'])
+
+    with pytest.raises(ValueError, match="Session token has been deactivated"):
+        await session_manager.validate(token)
+    with pytest.raises(ValueError, match="Invalid session id provided for revocation"):
+        await session_manager.revoke_session("")
+
+@pytest.mark.asyncio
+async def test_sessions_tokens_without_jti_revoked_by_digest():
+    session_manager, _ = session_manager_with_mocks()
+    session_manager.token_version = 1
+    payload_b64 = base64.urlsafe_b64encode(str({"id": "u1", "iat": int(time.time()), "exp": int(time.time()) + 60}).encode()).rstrip(b'=').decode()
+    signing_input = f"{session_manager.header_b64}.{payload_b64}"
+    token = f"{signing_input}.{session_manager._sign(signing_input, session_manager.header_b64)}"
+
+    await session_manager.invalidate(token)
+
+    assert _revocation_key(token) in session_manager.revocations.revoked
+    assert await session_manager.is_revoked(token)
+
+@pytest.mark.asyncio
+async def test_sessions_invalidate_user_rejects_earlier_tokens():
+    session_manager, _ = session_manager_with_mocks()
+    session_manager.token_version = 1 # v1 and v2 tokens alike
+    old_v1 = session_manager.create("u1")
+    session_manager.token_version = 2
+    old_v2 = session_manager.create("u1")
+    other_user = session_manager.create("u2")
+
+    with patch("src.helpers.sessions.time.time", return_value=time.time() + 1):
+        await session_manager.invalidate_user("u1")
+    assert len(session_manager.revocations.valid_after) == 1 and session_manager.revocations.revoked == {}
+
+    for token in (old_v1, old_v2):
+        with pytest.raises(ValueError, match="Session token has been deactivated"):
+            await session_manager.validate(token)
+    assert await session_manager.validate(other_user) == "u2"
+
+    # a login after the logout is fine, also on a worker that only sees the shared store
+    with patch("src.helpers.sessions.time.time", return_value=time.time() + 2):
+        fresh = session_manager.create("u1")
+    session_manager.user_epochs.clear()
+    assert await session_manager.validate(fresh) == "u1"
+
+    with pytest.raises(ValueError, match="Invalid user_id provided for invalidating sessions"):
+        await session_manager.invalidate_user("")
+
+@pytest.mark.asyncio
+async def test_sessions_login_right_after_invalidate_user():
+    session_manager, _ = session_manager_with_mocks()
+    now = int(time.time()) + 0.25
+    with patch("src.helpers.sessions.time.time", return_value=now):
+        before = session_manager.create("u1")
+    with patch("src.helpers.sessions.time.time", return_value=now + 0.001):
+        await session_manager.invalidate_user("u1")
+    # logging in again within the same second as the logout
+    with patch("src.helpers.sessions.time.time", return_value=now + 0.002):
+        after = session_manager.create("u1")
+
+    assert session_manager._claims(before)['iat'] == session_manager._claims(after)['iat']
+    with patch("src.helpers.sessions.time.time", return_value=now + 1):
+        with pytest.raises(ValueError, match="Session token has been deactivated"):
+            await session_manager.validate(before)
+        assert await session_manager.validate(after) == "u1"
+        session_manager.user_epochs.clear() # another worker reading the shared store
+        session_manager.validated.clear()
+        assert await session_manager.validate(after) == "u1"
+        with pytest.raises(ValueError, match="Session token has been deactivated"):
+            await session_manager.validate(before)
+
+def write_pem(path, key, private=True):
+    if private:
+        data = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption())
+    else:
+        data = key.public_bytes(serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo)
+    path.write_bytes(data)
+    return str(path)
+
+@pytest.mark.asyncio
+async def test_sessions_ed25519_signing(tmp_path):
+    mock_logger = MagicMock(spec=logging.Logger)
+    current, retired = Ed25519PrivateKey.generate(), Ed25519PrivateKey.generate()
+    signing = {"KID": "k2", "PRIVATE_KEY_PATH": write_pem(tmp_path / "k2.pem", current),
+               "PUBLIC_KEYS": {"k1": write_pem(tmp_path / "k1.pub", retired.public_key(), private=False)}}
+
+    with patch("src.helpers.sessions.resolve_settings") as mock_env:
+        mock_env.return_value = {'session': {'DURATION_SECONDS': 3600, 'SECRET_KEY': 'test_secret_key', 'CLEANUP_INTERVAL_SECONDS': 600,
+                                             'HEADER': {'algorithm': 'SHA256', 'typ': 'JWT'}, 'SIGNING': signing}}
+        session_manager = SessionManager(env="test", logger=mock_logger)
+
+    token = session_manager.create("u1")
+    header = json.loads(base64.urlsafe_b64decode(token.split('.')[0] + '=='))
+    assert header == {"alg": "EdDSA", "kid": "k2", "typ": "JWT", "v": 2}
+    assert await session_manager.validate(token) == "u1"
+
+    # another process only needs the exported public keys
+    jwks = session_manager.public_keys()
+    assert sorted(jwk["kid"] for jwk in jwks["keys"]) == ["k1", "k2"]
+    assert Ed25519Verifier.from_jwks(jwks).verify(token)["id"] == "u1"
+
+    # tokens signed with a retired key still verify, HMAC tokens issued before the switch too
+    header_b64, payload_b64, _ = token.split('.')
+    retired_header = base64.urlsafe_b64encode(b'{"alg":"EdDSA","kid":"k1","typ":"JWT","v":2}').rstrip(b'=').decode()
+    retired_sig = base64.urlsafe_b64encode(retired.sign(f"{retired_header}.{payload_b64}".encode())).rstrip(b'=').decode()
+    assert await session_manager.validate(f"{retired_header}.{payload_b64}.{retired_sig}") == "u1"
+
+    signing_key, session_manager.signing_key = session_manager.signing_key, None
+    hmac_token = session_manager.create("u2")
+    session_manager.signing_key = signing_key
+    assert await session_manager.validate(hmac_token) == "u2"
+
+    # an EdDSA header with an HMAC signature is rejected
+    with pytest.raises(ValueError, match="Invalid session token signature"):
+        await session_manager.validate(f"{header_b64}.{payload_b64}.{hmac_token.split('.')[2]}")
+
+def refresh_session_manager():
+    session_manager, mock_logger = session_manager_with_mocks()
+    session_manager.session_duration = 900
+    session_manager.refresh_duration = 86400
+    return session_manager, mock_logger
 
-    assert t1 not in session_manager.deactivated_sessions
-    assert t2 in session_manager.deactivated_sessions
-    mock_logger.debug.assert_called_with("Cleaning up 1 expired deactivated sessions")
\ No newline at end of file
+@pytest.mark.asyncio
+async def test_sessions_create_session_pairs_access_and_refresh():
+    session_manager, _ = session_manager_with_mocks()
+    assert list(session_manager.create_session("u1")) == ["jwt_token"]
+
+    session_manager, _ = refresh_session_manager()
+    tokens = session_manager.create_session("u1")
+    access, refresh = session_manager._claims(tokens["jwt_token"]), session_manager._claims(tokens["refresh_token"])
+
+    assert access["exp"] - access["iat"] == 900
+    assert refresh["exp"] - refresh["iat"] == 86400
+    assert refresh["typ"] == "refresh" and refresh["sid"] == access["jti"]
+
+    assert await session_manager.validate(tokens["jwt_token"]) == "u1"
+    with pytest.raises(ValueError, match="Invalid session token type"):
+        await session_manager.validate(tokens["refresh_token"])
+    with pytest.raises(ValueError, match="Invalid refresh token"):
+        await session_manager.refresh(tokens["jwt_token"])
+
+@pytest.mark.asyncio
+async def test_sessions_refresh_rotates_and_detects_reuse():
+    session_manager, mock_logger = refresh_session_manager()
+    first = session_manager.create_session("u1")
+
+    with patch("src.helpers.sessions.time.time", return_value=time.time() + 1):
+        second = await session_manager.refresh(first["refresh_token"])
+    assert await session_manager.validate(second["jwt_token"]) == "u1"
+
+    # the spent refresh token coming back means it leaked: every session of the user ends
+    with patch("src.helpers.sessions.time.time", return_value=time.time() + 2):
+        with pytest.raises(ValueError, match="Refresh token has already been used"):
+            await session_manager.refresh(first["refresh_token"])
+    mock_logger.warning.assert_called_once_with("Refresh token reused, invalidating all sessions for user")
+    with pytest.raises(ValueError, match="Session token has been deactivated"):
+        await session_manager.refresh(second["refresh_token"])
+
+@pytest.mark.asyncio
+async def test_sessions_logout_ends_refresh_token():
+    session_manager, _ = refresh_session_manager()
+    tokens = session_manager.create_session("u1")
+
+    await session_manager.invalidate(tokens["jwt_token"])
+
+    # the revocation of the access token outlives it, until its refresh token expires
+    refresh = session_manager._claims(tokens["refresh_token"])
+    assert session_manager.revocations.revoked[refresh["sid"]] == refresh["exp"]
+    with pytest.raises(ValueError, match="Session token has been deactivated"):
+        await session_manager.refresh(tokens["refresh_token"])
@@ -0,0 +1,40 @@
+from src.helpers.settings import Settings, get_settings
+
+from unittest.mock import patch
+import pytest
+
+CONFIG = {"plaid": {"CLIENT_ID": "cid"}, "session": {"SECRET_KEY": "k"}, "db": {"URI": "uri", "ENSURE_INDEXES": False}}
+
+@pytest.fixture(autouse=True)
+def clear_settings_cache():
+    get_settings.cache_clear()
+    yield
+    get_settings.cache_clear()
+
+def test_settings_parsed_once_per_env():
+    with patch("src.helpers.settings.Env", return_value=CONFIG) as mock_env:
+        settings = get_settings("prod")
+
+        assert get_settings("prod") is settings
+        mock_env.assert_called_once_with("prod")
+        assert settings.env == "prod"
+        assert settings['db'] is settings.db == CONFIG['db']
+        assert settings.plaid == CONFIG['plaid']
+        assert settings.ensure_indexes is False
+        assert (settings.log_file, settings.log_backup) == ("app.logs", False)
+
+def test_settings_env_defaults_to_app_env(monkeypatch):
+    with patch("src.helpers.settings.Env", return_value={**CONFIG, "db": {}}) as mock_env:
+        monkeypatch.delenv("APP_ENV", raising=False)
+        assert get_settings().env == "sandbox"
+        assert get_settings().ensure_indexes is True
+
+        get_settings.cache_clear()
+        monkeypatch.setenv("APP_ENV", "prod")
+        assert get_settings().env == "prod"
+        mock_env.assert_called_with("prod")
+
+def test_settings_are_frozen():
+    settings = Settings(env="sandbox", plaid={}, session={}, db={})
+    with pytest.raises(AttributeError):
+        settings.env = "prod"
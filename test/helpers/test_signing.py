@@ -0,0 +1,51 @@
+from src.helpers.signing import Ed25519Verifier, ed25519_header, load_private_key, load_public_key, public_jwk, _b64, _canonical_json
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+from cryptography.hazmat.primitives.asymmetric.ec import generate_private_key, SECP256R1
+import pytest
+import time
+
+def signed_token(key, kid, claims):
+    header_b64 = ed25519_header(kid)
+    payload_b64 = _b64(_canonical_json(claims))
+    return f"{header_b64}.{payload_b64}.{_b64(key.sign(f'{header_b64}.{payload_b64}'.encode()))}"
+
+def test_signing_verifier_checks_signature_and_expiry():
+    key = Ed25519PrivateKey.generate()
+    verifier = Ed25519Verifier({"k1": key.public_key()})
+    claims = {"id": "u1", "iat": int(time.time()), "exp": int(time.time()) + 60}
+
+    assert verifier.verify(signed_token(key, "k1", claims)) == claims
+
+    with pytest.raises(ValueError, match="Invalid session token signature"):
+        verifier.verify(signed_token(Ed25519PrivateKey.generate(), "k1", claims))
+    with pytest.raises(ValueError, match="Invalid session token signature"):
+        verifier.verify(signed_token(key, "unknown", claims))
+    with pytest.raises(ValueError, match="Invalid session token format"):
+        verifier.verify("not-a-token")
+    with pytest.raises(ValueError, match="Session token has expired"):
+        verifier.verify(signed_token(key, "k1", {**claims, "exp": 1}))
+
+def test_signing_jwks_round_trip():
+    key = Ed25519PrivateKey.generate()
+    jwk = public_jwk("k1", key.public_key())
+
+    assert jwk["kty"] == "OKP" and jwk["crv"] == "Ed25519" and jwk["kid"] == "k1"
+    verifier = Ed25519Verifier.from_jwks({"keys": [jwk]})
+    assert verifier.jwks() == {"keys": [jwk]}
+
+def test_signing_load_keys(tmp_path):
+    key = Ed25519PrivateKey.generate()
+    private_path = tmp_path / "key.pem"
+    private_path.write_bytes(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()))
+    public_path = tmp_path / "key.pub"
+    public_path.write_bytes(key.public_key().public_bytes(serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo))
+
+    assert load_private_key(str(private_path)).public_key() == key.public_key()
+    assert load_public_key(str(public_path)) == key.public_key()
+
+    other = generate_private_key(SECP256R1())
+    private_path.write_bytes(other.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()))
+    with pytest.raises(ValueError, match="Session signing key must be an Ed25519 private key"):
+        load_private_key(str(private_path))
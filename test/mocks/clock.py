@@ -0,0 +1,9 @@
+# Stand-in for time.monotonic / time.time, tests move now by hand. With a step every call advances it first.
+class FakeClock:
+    def __init__(self, now: float = 0.0, step: float = 0.0):
+        self.now = now
+        self.step = step
+
+    def __call__(self):
+        self.now += self.step
+        return self.now
@@ -14,9 +14,11 @@ UUID4_RE = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-4[0-9a-f]{3}-[89ab][0-9a-f]{3}-
 def client_and_mocks():
     client = TestClient(app)
 
-    account_db = MagicMock()
-    item_db = MagicMock()
+    account_db = AsyncMock()
+    item_db = AsyncMock()
     session_manager = MagicMock()
+    session_manager.validate = AsyncMock()
+    session_manager.invalidate = AsyncMock()
     plaid = MagicMock()
     logger = MagicMock()
 
@@ -150,20 +152,32 @@ def test_router_account_login_success(client_and_mocks):
 
     user_id = str(uuid.uuid4())
     account_db.validate_credentials.return_value = {"user_id": user_id, "user": "lu"}
-    session_manager.create.return_value = "sess-token"
+    session_manager.create_session.return_value = {"jwt_token": "sess-token", "refresh_token": "refresh-token"}
     plaid.create_link_token.return_value = "link-token"
 
     payload = {"username": "lu", "password": "pw"}
     resp = client.post("/account/login", json=payload, headers=_headers())
 
     assert resp.status_code == 200
-    assert resp.json() == {"jwt_token": "sess-token", "link_token": "link-token"}
+    assert resp.json() == {"jwt_token": "sess-token", "refresh_token": "refresh-token", "link_token": "link-token"}
 
     plaid.create_link_token.assert_awaited_once_with(user_id)
-    session_manager.create.assert_called_once_with(user_id)
+    session_manager.create_session.assert_called_once_with(user_id)
     # initial login debug
     c["logger"].debug.assert_any_call("Login Attempt", user="lu", path='/login', route='/account')
 
+def test_router_account_login_without_refresh_tokens(client_and_mocks):
+    c = client_and_mocks
+    c["account_db"].validate_credentials.return_value = {"user_id": "u1", "user": "lu"}
+    c["session_manager"].create_session.return_value = {"jwt_token": "sess-token"}
+    c["plaid"].create_link_token.return_value = "link-token"
+
+    resp = c["client"].post("/account/login", json={"username": "lu", "password": "pw"}, headers=_headers())
+
+    # the response model leaves out the refresh token that was never set
+    assert resp.status_code == 200
+    assert resp.content == b'{"jwt_token":"sess-token","link_token":"link-token"}'
+
 def test_router_account_login_invalid_credentials(client_and_mocks):
     c = client_and_mocks
     client = c["client"]
@@ -209,7 +223,7 @@ def test_router_account_logout_valid_session(client_and_mocks):
 
     resp = client.get("/account/logout", headers=headers)
     assert resp.status_code == 204
-    session_manager.invalidate.assert_called_once_with(token)
+    session_manager.invalidate.assert_awaited_once_with(token)
     logger.debug.assert_any_call("Logging Out", path='/logout', route='/account')
 
 
@@ -247,4 +261,73 @@ def test_router_account_logout_invalid_scheme(client_and_mocks):
     resp = client.get("/account/logout", headers=headers)
     assert resp.status_code == 400
     assert resp.json() == {"error": "Invalid Authorization header scheme (must be Bearer)"}
-    logger.debug.assert_any_call("Authorization header has invalid scheme", path='/account/logout', method='GET')
\ No newline at end of file
+    logger.debug.assert_any_call("Authorization header has invalid scheme", path='/account/logout', method='GET')
+
+
+def test_router_account_logout_all(client_and_mocks):
+    c = client_and_mocks
+    client = c["client"]
+    session_manager = c["session_manager"]
+    logger = c["logger"]
+    session_manager.validate.return_value = "user-123"
+    session_manager.invalidate_user = AsyncMock()
+
+    headers = _headers()
+    headers["Authorization"] = "Bearer tok-123"
+    resp = client.get("/account/logout/all", headers=headers)
+
+    assert resp.status_code == 204
+    session_manager.invalidate_user.assert_awaited_once_with("user-123")
+    logger.debug.assert_any_call("Logging Out Everywhere", path='/logout/all', route='/account')
+
+
+def test_router_account_logout_all_requires_user(client_and_mocks):
+    c = client_and_mocks
+    client = c["client"]
+
+    resp = client.get("/account/logout/all", headers=_headers())
+
+    assert resp.status_code == 401
+
+
+def test_router_account_public_keys(client_and_mocks):
+    c = client_and_mocks
+    client = c["client"]
+    session_manager = c["session_manager"]
+    session_manager.public_keys.return_value = {"keys": [{"kty": "OKP", "crv": "Ed25519", "kid": "k1", "x": "abc"}]}
+
+    resp = client.get("/account/keys", headers=_headers())
+
+    assert resp.status_code == 200
+    assert resp.json() == session_manager.public_keys.return_value
+
+
+def test_router_account_refresh(client_and_mocks):
+    c = client_and_mocks
+    client = c["client"]
+    session_manager = c["session_manager"]
+    account_db = c["account_db"]
+    plaid = c["plaid"]
+    session_manager.refresh = AsyncMock(return_value={"jwt_token": "new-access", "refresh_token": "new-refresh"})
+
+    resp = client.post("/account/refresh", json={"refresh_token": "old-refresh"}, headers=_headers())
+
+    assert resp.status_code == 200
+    assert resp.json() == {"jwt_token": "new-access", "refresh_token": "new-refresh"}
+    session_manager.refresh.assert_awaited_once_with("old-refresh")
+    account_db.validate_credentials.assert_not_called()
+    plaid.create_link_token.assert_not_called()
+
+
+def test_router_account_refresh_rejected(client_and_mocks):
+    c = client_and_mocks
+    client = c["client"]
+    session_manager = c["session_manager"]
+    logger = c["logger"]
+    session_manager.refresh = AsyncMock(side_effect=ValueError("Refresh token has already been used"))
+
+    resp = client.post("/account/refresh", json={"refresh_token": "old-refresh"}, headers=_headers())
+
+    assert resp.status_code == 401
+    assert resp.json() == {"error": "Invalid or expired refresh token"}
+    logger.warning.assert_called_once_with("Token refresh rejected", exception="Refresh token has already been used", path='/refresh', route='/account')
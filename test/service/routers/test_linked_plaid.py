@@ -5,11 +5,12 @@ from unittest.mock import MagicMock, AsyncMock
 from fastapi.testclient import TestClient
 
 from src.app import app
+from src.helpers.load_shedding import TokenBucket
 
 
 @pytest.fixture(autouse=True)
 def patch_resources(monkeypatch):
-    mock_item_db = MagicMock()
+    mock_item_db = AsyncMock()
     mock_plaid = MagicMock()
     mock_plaid.items = MagicMock()
     mock_plaid.items.exchange_public_token = AsyncMock()
@@ -26,10 +27,11 @@ def patch_resources(monkeypatch):
 
     app.state.logger = mock_logger
     app.state.sessionManager = MagicMock()
-    app.state.sessionManager.validate.return_value = "user-123"
-    app.state.accountDB = MagicMock()
+    app.state.sessionManager.validate = AsyncMock(return_value="user-123")
+    app.state.accountDB = AsyncMock()
     app.state.itemDB = mock_item_db
     app.state.plaid = mock_plaid
+    app.state.rateLimiter = TokenBucket(rate=5, burst=20)
 
     yield {"item": mock_item_db, "plaid": mock_plaid, "logger": mock_logger}
 
@@ -110,6 +112,7 @@ def test_get_linked_accounts_with_items(patch_resources):
 
     assert res.status_code == 200
     assert res.json() == [{"k": "v", "id": "i1"}, {"k2": "v2", "id": "i2"}]
+    mock_item_db.get_items.assert_called_once_with("user-123", fields=["item_id", "item_data"])
 
 
 def test_delete_linked_account_success(patch_resources, monkeypatch):
@@ -125,6 +128,7 @@ def test_delete_linked_account_success(patch_resources, monkeypatch):
     res = client.put("/plaid/accounts/delete", json={"item_id": "i1", "reason": {"code": "r", "note": ""}}, headers=_hdr())
 
     assert res.status_code == 204
+    mock_item_db.get_item.assert_called_once_with("user-123", "i1", fields=["item_id", "access_token"])
     mock_plaid.items.remove.assert_called_once()
     mock_item_db.remove_item.assert_called_once_with("user-123", "i1")
 
@@ -187,7 +191,8 @@ def test_update_account_cycle_success(patch_resources, monkeypatch):
 
     assert res.status_code == 204
     mock_plaid.items.invalidate_access_token.assert_called_once()
-    mock_item_db.update_item_field.assert_called()
+    mock_item_db.get_item.assert_called_once_with("user-123", "i1", fields=["item_id", "access_token"])
+    mock_item_db.update_item_fields.assert_called_once_with("user-123", "i1", {"access_token": "new_tok"})
 
 
 def test_update_account_cycle_missing_item(patch_resources):
@@ -225,7 +230,7 @@ def test_update_account_cycle_db_update_fails(patch_resources, monkeypatch):
     mock_item_db.get_item.return_value = {"access_token": "enc_tok"}
     monkeypatch.setattr("src.routers.linked_plaid.decrypt", lambda x: x)
     mock_plaid.items.invalidate_access_token.return_value = "new_tok"
-    mock_item_db.update_item_field.side_effect = Exception("db fail")
+    mock_item_db.update_item_fields.side_effect = Exception("db fail")
 
     client = TestClient(app)
     res = client.put("/plaid/accounts/update", json={"item_id": "i1"}, headers=_hdr())
@@ -236,21 +241,22 @@ def test_update_account_cycle_db_update_fails(patch_resources, monkeypatch):
 
 def test_update_account_item_data_success(patch_resources):
     mock_item_db = patch_resources["item"]
-    mock_item_db.get_item.return_value = {"item_data": {"k": "v"}}
 
     client = TestClient(app)
-    res = client.put("/plaid/accounts/update", json={"item_id": "i1", "item_data": {"new": "val"}}, headers=_hdr())
+    res = client.put("/plaid/accounts/update", json={"item_id": "i1", "item_data": {"nickname": "n", "institution_name": "Bank"}}, headers=_hdr())
 
     assert res.status_code == 204
-    mock_item_db.update_item_field.assert_called_once()
+    # only the provided sub-fields are written, without reading the item first
+    mock_item_db.get_item.assert_not_called()
+    mock_item_db.update_item_fields.assert_called_once_with("user-123", "i1", {"item_data.nickname": "n", "item_data.institution_name": "Bank"})
 
 
 def test_update_account_item_data_missing_item(patch_resources):
     mock_item_db = patch_resources["item"]
-    mock_item_db.get_item.side_effect = Exception("no item")
+    mock_item_db.update_item_fields.side_effect = ValueError("Item not found")
 
     client = TestClient(app)
-    res = client.put("/plaid/accounts/update", json={"item_id": "i1", "item_data": {"new": "val"}}, headers=_hdr())
+    res = client.put("/plaid/accounts/update", json={"item_id": "i1", "item_data": {"nickname": "n"}}, headers=_hdr())
 
     assert res.status_code == 400
     assert res.json() == {"error": "Could not find item_id for user"}
@@ -258,11 +264,38 @@ def test_update_account_item_data_missing_item(patch_resources):
 
 def test_update_account_item_data_db_update_fails(patch_resources):
     mock_item_db = patch_resources["item"]
-    mock_item_db.get_item.return_value = {"item_data": {"k": "v"}}
-    mock_item_db.update_item_field.side_effect = Exception("db fail")
+    mock_item_db.update_item_fields.side_effect = Exception("db fail")
 
     client = TestClient(app)
-    res = client.put("/plaid/accounts/update", json={"item_id": "i1", "item_data": {"new": "val"}}, headers=_hdr())
+    res = client.put("/plaid/accounts/update", json={"item_id": "i1", "item_data": {"nickname": "n"}}, headers=_hdr())
 
     assert res.status_code == 500
     assert res.json() == {"error": "Failed to update access token in item db"}
+
+
+def test_get_linked_accounts_keeps_only_stored_fields(patch_resources):
+    mock_item_db = patch_resources["item"]
+    mock_item_db.get_items.return_value = [
+        {"item_id": "i1", "item_data": {"products": ["auth"], "institution_name": "Bank", "extra": 1}}
+    ]
+
+    client = TestClient(app)
+    res = client.get("/plaid/accounts/get", headers=_hdr())
+
+    assert res.status_code == 200
+    assert res.content == b'[{"id":"i1","products":["auth"],"institution_name":"Bank","extra":1}]'
+
+
+def test_plaid_routes_rate_limited_per_user(patch_resources):
+    mock_item_db = patch_resources["item"]
+    mock_item_db.get_items.return_value = []
+    app.state.rateLimiter = TokenBucket(rate=0.01, burst=1)
+
+    client = TestClient(app)
+    first = client.get("/plaid/accounts/get", headers=_hdr())
+    second = client.get("/plaid/accounts/get", headers=_hdr())
+
+    assert first.status_code == 204
+    assert second.status_code == 429
+    assert second.json() == {"detail": {"error": "Too many requests"}}
+    assert second.headers["retry-after"] == "100"
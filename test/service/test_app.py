@@ -3,9 +3,13 @@ import pytest
 from types import SimpleNamespace
 from unittest.mock import MagicMock, AsyncMock
 
+from fastapi.datastructures import DefaultPlaceholder
 from fastapi.testclient import TestClient
 import src.app as app_module
 from src.app import app, lifespan
+from src.db.cached_item_db import CachedItemDB
+from src.helpers.cache import LRUCache
+from src.helpers.metrics import MetricsRegistry
 
 
 @pytest.fixture(autouse=True)
@@ -24,6 +28,7 @@ def patch_resources(monkeypatch):
     mock_plaid = MagicMock()
     mock_plaid.close = AsyncMock()
     mock_session_manager = MagicMock()
+    mock_session_manager.validate = AsyncMock()
 
     # We don't patch constructors here; tests use explicit `app.state` values.
     # ensure the imported app has the expected state even if lifespan isn't run
@@ -71,24 +76,23 @@ def test_app_middleware_valid_uuid_echoes_header():
     assert response.headers.get("request-id") == rid
 
 
-def test_app_middleware_invalid_authorization_scheme_returns_400():
+def test_app_public_route_ignores_invalid_authorization_scheme():
     client = TestClient(app)
     rid = str(uuid.uuid4())
-    # send Authorization with wrong scheme
+    # public routes never resolve the user, so a bad scheme is not looked at
     response = client.get("/ping", headers={"request-id": rid, "Authorization": "Token abc"})
-    assert response.status_code == 400
-    assert response.json() == {"error": "Invalid Authorization header scheme (must be Bearer)"}
+    assert response.status_code == 200
+    client.app.state.sessionManager.validate.assert_not_called()
 
 
-def test_app_middleware_invalid_token_returns_401():
+def test_app_public_route_skips_token_validation():
     client = TestClient(app)
     rid = str(uuid.uuid4())
-    # make session manager validate raise an exception to simulate invalid token
     client.app.state.sessionManager.validate.side_effect = Exception("bad token")
 
     response = client.get("/ping", headers={"request-id": rid, "Authorization": "Bearer badtoken"})
-    assert response.status_code == 401
-    assert response.json() == {"error": "Invalid or expired token"}
+    assert response.status_code == 200
+    client.app.state.sessionManager.validate.assert_not_called()
 
 
 def test_app_middleware_valid_bearer_sets_user_and_echoes_request_id():
@@ -111,29 +115,109 @@ async def test_app_lifespan_sets_and_closes_resources(monkeypatch):
         def debug(self, *a, **k):
             pass
     # reuse MagicMock / AsyncMock pattern from fixture
-    mock_account_db = MagicMock()
-    mock_item_db = MagicMock()
+    mock_account_db = AsyncMock()
+    mock_item_db = AsyncMock()
     mock_plaid = MagicMock()
     mock_plaid.close = AsyncMock()
-    mock_session_manager = MagicMock()
+    mock_session_manager = AsyncMock()
+    mock_session_manager.start_cleanup = MagicMock()
+    mock_session_manager.cache_stats = MagicMock(return_value={"validated": {"size": 3, "hits": 7, "misses": 1, "evictions": 0, "expirations": 2}})
 
     monkeypatch.setattr(app_module, "config_logger", lambda *a, **k: None)
     monkeypatch.setattr(app_module, "get_struct_logger", lambda *a, **k: DummyLogger())
-    monkeypatch.setattr(app_module, "AccountDB", lambda env, logger: mock_account_db)
-    monkeypatch.setattr(app_module, "ItemDB", lambda env, logger: mock_item_db)
+    monkeypatch.setattr(app_module, "build_account_db", lambda env, logger: mock_account_db)
+    monkeypatch.setattr(app_module, "build_item_db", lambda env, logger: mock_item_db)
     monkeypatch.setattr(app_module, "Plaid", lambda env, logger: mock_plaid)
-    monkeypatch.setattr(app_module, "SessionManager", lambda env, logger: mock_session_manager)
+    monkeypatch.setattr(app_module, "SessionManager", lambda env, logger, revocations: mock_session_manager)
+    monkeypatch.setattr(app_module, "build_revocation_db", lambda env, logger: MagicMock())
+    mock_idempotency_db = AsyncMock()
+    monkeypatch.setattr(app_module, "build_idempotency_db", lambda env, logger: mock_idempotency_db)
+    mock_index_manager = AsyncMock()
+    mock_index_manager.ensure_indexes.return_value = {"accounts": [], "items": []}
+    monkeypatch.setattr(app_module, "build_index_manager", lambda env, logger: mock_index_manager)
 
     test_app = SimpleNamespace()
-    test_app.state = SimpleNamespace()
+    test_app.state = SimpleNamespace(metrics=MetricsRegistry())
 
     async with lifespan(test_app):
         assert test_app.state.sessionManager is mock_session_manager
         assert test_app.state.accountDB is mock_account_db
         assert test_app.state.itemDB is mock_item_db
         assert test_app.state.plaid is mock_plaid
+        assert test_app.state.idempotencyDB is mock_idempotency_db
+        # the session caches are read on every scrape, the item db has no read cache here
+        rendered = test_app.state.metrics.render()
+        assert 'cache_entries{cache="sessions_validated"} 3' in rendered
+        assert 'cache_hits_total{cache="sessions_validated"} 7' in rendered
+        assert 'cache="items"' not in rendered
 
     # after context exit resources should be closed/awaited
-    mock_account_db.close.assert_called()
-    mock_item_db.close.assert_called()
-    mock_plaid.close.assert_awaited()
\ No newline at end of file
+    mock_session_manager.start_cleanup.assert_called_once()
+    mock_session_manager.close.assert_awaited()
+    mock_account_db.close.assert_awaited()
+    mock_item_db.close.assert_awaited()
+    mock_plaid.close.assert_awaited()
+    mock_idempotency_db.close.assert_awaited()
+    mock_index_manager.ensure_indexes.assert_awaited_once()
+    mock_index_manager.close.assert_awaited_once()
+    assert set(test_app.state.startup_timings) == {"logger", "indexes", "sessions", "databases", "plaid"}
+
+
+@pytest.mark.asyncio
+async def test_app_lifespan_uses_app_settings(monkeypatch):
+    logger = MagicMock()
+    monkeypatch.setattr(app_module, "config_logger", MagicMock())
+    monkeypatch.setattr(app_module, "get_struct_logger", lambda *a, **k: logger)
+    builders = {name: MagicMock(return_value=AsyncMock()) for name in ("build_account_db", "build_item_db", "build_idempotency_db", "build_revocation_db")}
+    for name, builder in builders.items():
+        monkeypatch.setattr(app_module, name, builder)
+    session_manager = AsyncMock()
+    session_manager.start_cleanup = MagicMock()
+    session_factory = MagicMock(return_value=session_manager)
+    monkeypatch.setattr(app_module, "SessionManager", session_factory)
+    plaid_factory = MagicMock(return_value=AsyncMock())
+    monkeypatch.setattr(app_module, "Plaid", plaid_factory)
+    build_index_manager = MagicMock()
+    monkeypatch.setattr(app_module, "build_index_manager", build_index_manager)
+
+    settings = app_module.Settings(env="prod", plaid={}, session={}, db={}, log_file=None, ensure_indexes=False)
+    test_app = app_module.create_app(settings)
+
+    async with lifespan(test_app):
+        assert test_app.state.settings is settings
+
+    app_module.config_logger.assert_called_once_with("uvicorn.error", file_name=None, backup=False)
+    # every component is built from the settings passed in, not from its env read again
+    assert session_factory.call_args[0][0] is settings
+    assert plaid_factory.call_args[0][0] is settings
+    for builder in builders.values():
+        assert builder.call_args[0][0] is settings
+    build_index_manager.assert_not_called()
+    assert "indexes" not in test_app.state.startup_timings
+    assert logger.info.call_args_list[-1][0] == ("Startup complete",)
+
+def test_app_keeps_default_response_class():
+    # with a response class set, response_model routes lose pydantic's direct to bytes serialization
+    assert isinstance(app.router.default_response_class, DefaultPlaceholder)
+    assert isinstance(app_module.create_app().router.default_response_class, DefaultPlaceholder)
+
+def test_app_cache_stats_include_the_item_read_cache():
+    state = SimpleNamespace(sessionManager=MagicMock(), itemDB=CachedItemDB.__new__(CachedItemDB))
+    state.sessionManager.cache_stats.return_value = {"validated": {"size": 1}, "not_revoked": {"size": 2}}
+    state.itemDB.cache = LRUCache(10, 60)
+
+    stats = app_module._cache_stats(state)
+
+    assert stats["sessions_validated"] == {"size": 1}
+    assert stats["sessions_not_revoked"] == {"size": 2}
+    assert stats["items"] == state.itemDB.cache.stats()
+
+def test_app_metrics_endpoint_needs_no_request_id():
+    client = TestClient(app)
+    client.get("/ping", headers={"request-id": str(uuid.uuid4())})
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert 'route="/ping",status="200"' in response.text
+    assert 'concurrency_active{group="/plaid"} 0' in response.text
+    assert 'concurrency_shed_total{group="/account/login"} 0' in response.text